@@ -0,0 +1,69 @@
+"""
+Schémas Arrow explicites des fichiers Parquet déposés sur le stage.
+
+Les types suivent le DDL de table_schemas.py (DATE -> date32, NUMBER(p,s) -> decimal128,
+BOOLEAN -> bool) : COPY n'a plus de conversion à faire côté serveur. Les colonnes à
+faible cardinalité sont encodées en dictionnaire dans le Parquet.
+"""
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from table_schemas import ALL_TABLES, type_info
+
+# Colonnes à faible cardinalité : encodage dictionnaire dans le Parquet
+DICTIONARY_COLUMNS = {
+    'CATEGORY', 'SUBCATEGORY', 'BRAND', 'MATERIAL', 'COLOR', 'SEGMENT', 'GENDER',
+    'CHANNEL', 'PREFERRED_CHANNEL', 'COUNTRY', 'CITY', 'STATUS', 'SPECIALTY',
+    'PAYMENT_TERMS', 'DISCOUNT_TYPE', 'REASON', 'CONDITION', 'REFUND_METHOD',
+}
+
+
+def arrow_type(col_type):
+    family, precision, scale = type_info(col_type)
+    if family == 'bool':
+        return pa.bool_()
+    if family == 'date':
+        return pa.date32()
+    if family == 'decimal':
+        return pa.decimal128(precision, scale)
+    if family == 'int':
+        return pa.int64()
+    return pa.string()
+
+
+def arrow_schema(table_name, columns):
+    types = dict(ALL_TABLES[table_name])
+    return pa.schema([
+        pa.field(column, arrow_type(types[column]), nullable='NOT NULL' not in types[column].upper())
+        for column in columns
+    ])
+
+
+def _to_array(values, field):
+    """Construire une colonne typée à partir des valeurs JSON (chaînes ISO, floats, ...)"""
+    if pa.types.is_date32(field.type):
+        return pa.array(values, pa.string()).cast(field.type)
+    if pa.types.is_decimal(field.type):
+        return pa.array(values, pa.float64()).cast(field.type)
+    return pa.array(values, field.type)
+
+
+def rows_to_table(rows, table_name, columns):
+    """Lot de tuples (ordre de columns) -> table Arrow au schéma de la table cible"""
+    schema = arrow_schema(table_name, columns)
+    if not rows:
+        return schema.empty_table()
+    arrays = [_to_array(list(values), field) for values, field in zip(zip(*rows), schema)]
+    return pa.Table.from_arrays(arrays, schema=schema)
+
+
+def write_parquet(table, path, row_group_size=None):
+    """Écrire un fichier Parquet avec dictionnaire sur les colonnes à faible cardinalité"""
+    dictionary_columns = [name for name in table.column_names if name in DICTIONARY_COLUMNS]
+    pq.write_table(
+        table, path,
+        use_dictionary=dictionary_columns,
+        compression='SNAPPY',
+        row_group_size=row_group_size
+    )
@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+"""
+Benchmark du générateur de données, entité par entité.
+
+Pour chaque entité et chaque taille, la boucle de generate_entity (générateur,
+_process_record, json.dumps) est exécutée sans écriture disque : débit en
+records/s et en octets NDJSON/s, puis pic mémoire Python (tracemalloc, passe
+séparée pour ne pas fausser le chronométrage). Faker est initialisé avec une
+graine fixe : deux runs produisent les mêmes records.
+
+--profile ajoute une passe cProfile par cas : fonctions les plus coûteuses, temps
+propre cumulé par provider Faker, et fichier .prof (snakeviz, pstats).
+--compare BASELINE.json compare les débits à un run précédent (--output) et
+sort en code 1 au-delà de --max-regression.
+
+Usage: python3 bench_generator.py [--entities sales customers] [--sizes 1000 10000] [--profile]
+"""
+
+import io
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import tempfile
+import datetime
+import tracemalloc
+import contextlib
+from pathlib import Path
+
+from data_generator import ENTITIES, GenerationConfig
+
+DEFAULT_PROFILE_DIR = os.path.join('profiles', 'generator')
+
+
+def make_generator(entity, size, output_dir, seed):
+    from data_generator import DataGenerator
+
+    config = GenerationConfig(output_dir=Path(output_dir), **{entity: size})
+    # Les ranges d'IDs affichées à l'initialisation ne sont pas le sujet du benchmark
+    with contextlib.redirect_stdout(io.StringIO()):
+        generator = DataGenerator(config)
+    generator.fake.seed_instance(seed)
+    return generator
+
+
+def generate(generator, entity):
+    """Boucle de generate_entity sans le fichier : retourne (records, octets NDJSON)"""
+    records = size = 0
+    for record in getattr(generator, f"generate_{entity}")():
+        size += len((json.dumps(generator._process_record(record)) + '\n').encode())
+        records += 1
+    return records, size
+
+
+def faker_providers(stats, top):
+    """Temps propre cumulé par provider Faker (faker/providers/<provider>/...)"""
+    totals = {}
+    for (filename, _, _), (_, _, tottime, _, _) in stats.stats.items():
+        parts = Path(filename).parts
+        if 'faker' in parts and 'providers' in parts:
+            index = parts.index('providers')
+            provider = parts[index + 1] if index + 1 < len(parts) - 1 else 'base'
+            totals[provider] = totals.get(provider, 0.0) + tottime
+    return sorted(totals.items(), key=lambda item: -item[1])[:top]
+
+
+def profile_case(entity, size, output_dir, seed, profile_dir, top):
+    import cProfile
+    import pstats
+
+    generator = make_generator(entity, size, output_dir, seed)
+    profiler = cProfile.Profile()
+    profiler.runcall(generate, generator, entity)
+
+    os.makedirs(profile_dir, exist_ok=True)
+    path = os.path.join(profile_dir, f"{entity}-{size}.prof")
+    profiler.dump_stats(path)
+
+    report = io.StringIO()
+    stats = pstats.Stats(profiler, stream=report)
+    stats.sort_stats('tottime').print_stats(top)
+    print(f"\n🔬 {entity} ({size}) : {top} fonctions les plus coûteuses (temps propre) -> {path}")
+    # En-tête pstats inutile ici : seul le tableau des fonctions est conservé
+    lines = report.getvalue().splitlines()
+    start = next((i for i, line in enumerate(lines) if line.lstrip().startswith('ncalls')), 0)
+    print('\n'.join(line for line in lines[start:] if line.strip()))
+    providers = faker_providers(stats, top)
+    if providers:
+        print("   Providers Faker : " + ", ".join(f"{name} {seconds:.3f}s" for name, seconds in providers))
+    return {'profile': path, 'faker_providers': {name: round(seconds, 4) for name, seconds in providers}}
+
+
+def run_case(entity, size, output_dir, seed):
+    generator = make_generator(entity, size, output_dir, seed)
+    start = time.perf_counter()
+    records, size_bytes = generate(generator, entity)
+    elapsed = time.perf_counter() - start
+
+    generator = make_generator(entity, size, output_dir, seed)
+    tracemalloc.start()
+    generate(generator, entity)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        'entity': entity,
+        'size': size,
+        'records': records,
+        'seconds': round(elapsed, 3),
+        'records_per_sec': round(records / elapsed),
+        'bytes': size_bytes,
+        'bytes_per_sec': round(size_bytes / elapsed),
+        'peak_mb': round(peak / 1e6, 2),
+    }
+
+
+def compare(results, baseline_path, max_regression):
+    """Débits comparés à un run précédent ; retourne le nombre de régressions"""
+    with open(baseline_path) as f:
+        baseline = {(r['entity'], r['size']): r for r in json.load(f)['results']}
+    print(f"\n📊 Comparaison avec {baseline_path} (régression tolérée: {max_regression:.0%})")
+    regressions = 0
+    for result in results:
+        previous = baseline.get((result['entity'], result['size']))
+        if not previous:
+            continue
+        change = result['records_per_sec'] / previous['records_per_sec'] - 1
+        regressed = change < -max_regression
+        regressions += regressed
+        print(f"{'❌' if regressed else '✅'} {result['entity']:<11} {result['size']:>8} "
+              f"{previous['records_per_sec']:>10} -> {result['records_per_sec']:>10} rec/s ({change:+.1%})")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark du générateur de données par entité')
+    parser.add_argument('--entities', choices=list(ENTITIES), nargs='+', default=list(ENTITIES), help='Entités mesurées')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000], help='Records générés par cas')
+    parser.add_argument('--seed', type=int, default=42, help='Graine Faker (runs comparables)')
+    parser.add_argument('--profile', action='store_true', help='Passe cProfile par cas (fonctions et providers Faker)')
+    parser.add_argument('--profile-dir', type=str, default=DEFAULT_PROFILE_DIR, help='Répertoire des fichiers .prof')
+    parser.add_argument('--top', type=int, default=15, help='Fonctions affichées par profil')
+    parser.add_argument('--output', type=str, help='Écrire les résultats en JSON (référence pour --compare)')
+    parser.add_argument('--compare', type=str, metavar='BASELINE', help='Comparer à un JSON écrit par --output')
+    parser.add_argument('--max-regression', type=float, default=0.2, help='Baisse de débit tolérée par --compare')
+    args = parser.parse_args()
+
+    print(f"⏱️  Générateur : {len(args.entities)} entité(s) x tailles {args.sizes}, graine {args.seed}")
+    print(f"{'entité':<11} {'records':>8} {'rec/s':>10} {'Mo/s':>7} {'pic Mo':>7}")
+    print("-" * 47)
+
+    results = []
+    with tempfile.TemporaryDirectory() as output_dir:
+        for size in args.sizes:
+            for entity in args.entities:
+                result = run_case(entity, size, output_dir, args.seed)
+                print(f"{entity:<11} {result['records']:>8} {result['records_per_sec']:>10} "
+                      f"{result['bytes_per_sec'] / 1e6:>7.2f} {result['peak_mb']:>7.2f}")
+                results.append(result)
+        if args.profile:
+            for result in results:
+                result.update(profile_case(result['entity'], result['size'], output_dir, args.seed,
+                                           args.profile_dir, args.top))
+
+    if args.output:
+        from importlib.metadata import version
+
+        with open(args.output, 'w') as f:
+            json.dump({
+                'generated_at': datetime.datetime.now().isoformat(timespec='seconds'),
+                'python': platform.python_version(),
+                'faker': version('faker'),
+                'seed': args.seed,
+                'results': results,
+            }, f, indent=2)
+        print(f"\n💾 Résultats: {args.output}")
+
+    if args.compare and compare(results, args.compare, args.max_regression):
+        print("\n❌ Débit du générateur en régression")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Benchmark des chemins d'INSERT Snowflake : binding client (%s) contre server (?).
+
+Pour chaque binding et chaque taille de batch, les mêmes lignes SALES_DATA
+synthétiques sont insérées dans une table temporaire ; on mesure le débit
+(lignes/s), le temps médian par batch et le pic mémoire Python côté client
+(tracemalloc). En binding server, --commit-every regroupe les batches par
+transaction explicite. Nécessite une connexion Snowflake (.env).
+
+Usage: python3 bench_insert.py [--rows 50000] [--batch-sizes 100 1000 10000] [--commit-every 1 10]
+"""
+
+import json
+import time
+import argparse
+import datetime
+import statistics
+import tracemalloc
+from decimal import Decimal
+
+from dotenv import load_dotenv
+
+from snowflake_config import BINDINGS
+from table_schemas import insert_columns
+
+load_dotenv()
+
+BENCH_TABLE = 'BENCH_INSERT_SALES'
+
+
+def sales_rows(count):
+    """Lignes SALES_DATA déterministes (mêmes types que l'ingester direct)"""
+    channels = ['Online VIP', 'Boutique', 'Showroom privé', 'Téléphone']
+    day = datetime.date(2024, 1, 1)
+    for i in range(count):
+        quantity = i % 5 + 1
+        price = Decimal(100 + i % 900) + Decimal('0.99')
+        yield (
+            f"S{i:08d}", (day + datetime.timedelta(days=i % 365)).isoformat(), f"C{i % 10000 + 1}",
+            f"P{i % 5000 + 1}", f"Produit vintage {i % 5000}", quantity, price, price * quantity,
+            channels[i % len(channels)], f"ST{i % 20 + 1}", 'France'
+        )
+
+
+def run_case(sf, rows, batch_size):
+    """Insérer rows par batches de batch_size ; retourne les mesures du cas"""
+    columns = insert_columns('SALES_DATA')
+    sf.execute_query(f"CREATE OR REPLACE TEMPORARY TABLE {BENCH_TABLE} LIKE SALES_DATA")
+    query = f"INSERT INTO {BENCH_TABLE} ({', '.join(columns)}) VALUES ({', '.join([sf.placeholder] * len(columns))})"
+
+    batch_times = []
+    tracemalloc.start()
+    start = time.perf_counter()
+    for offset in range(0, len(rows), batch_size):
+        batch_start = time.perf_counter()
+        sf.execute_batch(query, rows[offset:offset + batch_size])
+        batch_times.append(time.perf_counter() - batch_start)
+    sf.commit()
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    loaded = sf.execute_query(f"SELECT COUNT(*) FROM {BENCH_TABLE}")[0][0]
+    if loaded != len(rows):
+        raise RuntimeError(f"{BENCH_TABLE}: {loaded} lignes chargées, {len(rows)} attendues")
+    return {
+        'rows': len(rows),
+        'seconds': round(elapsed, 3),
+        'rows_per_sec': round(len(rows) / elapsed),
+        'batch_ms_median': round(statistics.median(batch_times) * 1000, 1),
+        'peak_mb': round(peak / 1e6, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark INSERT Snowflake: binding client vs server')
+    parser.add_argument('--rows', type=int, default=50_000, help='Lignes insérées par cas')
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=[100, 1000, 10000], help='Tailles de batch comparées')
+    parser.add_argument('--commit-every', type=int, nargs='+', default=[1, 10],
+                        help='Binding server: batches par transaction (une série de cas par valeur)')
+    parser.add_argument('--bindings', choices=BINDINGS, nargs='+', default=BINDINGS, help='Chemins comparés')
+    parser.add_argument('--output', type=str, help='Écrire les résultats en JSON')
+    args = parser.parse_args()
+
+    from sinks import SnowflakeSink
+    from snowflake_config import SnowflakeConnection, new_run_tag
+
+    rows = list(sales_rows(args.rows))
+    run_tag = new_run_tag('bench-insert')
+    print(f"⏱️  {args.rows} lignes SALES_DATA par cas, QUERY_TAG {run_tag}")
+    print(f"{'binding':<8} {'commit':>6} {'batch':>7} {'lignes/s':>10} {'ms/batch':>9} {'pic Mo':>7}")
+    print("-" * 52)
+
+    results = []
+    for binding in args.bindings:
+        for commit_every in (args.commit_every if binding == 'server' else [1]):
+            # Le paramstyle est fixé à la connexion : une connexion par configuration
+            with SnowflakeSink(SnowflakeConnection(query_tag=run_tag, binding=binding, commit_every=commit_every)) as sink:
+                sink.use_context()
+                for batch_size in args.batch_sizes:
+                    result = run_case(sink.sf, rows, batch_size)
+                    result.update(binding=binding, commit_every=commit_every, batch_size=batch_size)
+                    results.append(result)
+                    print(f"{binding:<8} {commit_every:>6} {batch_size:>7} {result['rows_per_sec']:>10} "
+                          f"{result['batch_ms_median']:>9} {result['peak_mb']:>7}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'run_tag': run_tag, 'table': 'SALES_DATA', 'results': results}, f, indent=2)
+        print(f"\n💾 Résultats: {args.output}")
+    print(f"🏷️  Profil du run: python3 snowflake_check_data.py --profile-run {run_tag}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Budget de temps de démarrage des CLI (appelées en boucle par l'ordonnanceur).
+
+Chaque commande (--help ou run sans fichier) est lancée plusieurs fois dans un
+process neuf ; la médiane doit rester sous le budget et aucune dépendance lourde
+(pandas, pyarrow, snowflake.connector, faker, cryptography) ne doit être importée.
+Code de sortie 1 si un budget est dépassé.
+
+Usage: python3 bench_startup.py [--budget-ms 250] [--runs 5]
+"""
+
+import os
+import sys
+import time
+import argparse
+import statistics
+import subprocess
+
+# (script, arguments) : --help et runs « no-op » (aucun fichier demandé)
+CLI_RUNS = [
+    ('data_generator.py', ['--help']),
+    ('ingester_direct.py', ['--help']),
+    ('ingester_direct.py', []),
+    ('ingester_snowpipe.py', ['--help']),
+    ('ingester_snowpipe.py', []),
+    ('snowflake_check_data.py', ['--help']),
+    ('bench_insert.py', ['--help']),
+    ('bench_generator.py', ['--help']),
+]
+
+HEAVY_MODULES = ['pandas', 'pyarrow', 'snowflake.connector', 'faker', 'cryptography']
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+
+def time_command(command, runs):
+    """Médiane (ms) du temps mur de command sur runs exécutions"""
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run(command, cwd=ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+def heavy_imports(script, args):
+    """Dépendances lourdes importées par la commande (d'après python -X importtime)"""
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', script, *args],
+        cwd=ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True
+    )
+    # Lignes « import time: self [us] | cumulative | nom du module »
+    imported = {line.rsplit('|', 1)[1].strip() for line in result.stderr.splitlines()
+                if line.startswith('import time:') and line.count('|') == 2}
+    return sorted(module for module in HEAVY_MODULES if module in imported)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark du temps de démarrage des CLI')
+    parser.add_argument('--budget-ms', type=float, default=250, help='Budget par commande (médiane, ms)')
+    parser.add_argument('--runs', type=int, default=5, help='Exécutions par commande')
+    args = parser.parse_args()
+
+    baseline = time_command([sys.executable, '-c', 'pass'], args.runs)
+    print(f"⏱️  Démarrage de l'interpréteur seul: {baseline:.0f} ms (budget: {args.budget_ms:.0f} ms)")
+    print("-" * 60)
+
+    failures = 0
+    for script, script_args in CLI_RUNS:
+        label = f"{script} {' '.join(script_args) or '(sans argument)'}"
+        median = time_command([sys.executable, script, *script_args], args.runs)
+        heavy = heavy_imports(script, script_args)
+
+        ok = median <= args.budget_ms and not heavy
+        failures += not ok
+        line = f"{'✅' if ok else '❌'} {label:<45} {median:6.0f} ms"
+        if heavy:
+            line += f"  imports lourds: {', '.join(heavy)}"
+        print(line)
+
+    if failures:
+        print(f"\n❌ {failures} commande(s) hors budget")
+        sys.exit(1)
+    print("\n✅ Toutes les commandes respectent le budget")
+
+
+if __name__ == "__main__":
+    main()
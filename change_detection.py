@@ -0,0 +1,98 @@
+"""
+Détection des changements entre deux snapshots d'une table de référence.
+
+Un index local par table (clé -> hash 64 bits du contenu de la ligne, même hash
+que reconciliation.py) est conservé après chaque chargement. Le snapshot suivant
+est haché en streaming, batch Arrow par batch Arrow : seules les lignes nouvelles ou dont le
+hash a changé sont chargées, et les clés absentes du snapshot sont supprimées.
+L'index n'est remplacé qu'une fois le chargement terminé.
+"""
+
+import os
+import pickle
+from collections import Counter
+
+import pyarrow as pa
+
+from reconciliation import batch_hashes
+from table_schemas import ALL_TABLES, PRIMARY_KEYS
+
+DEFAULT_INDEX_DIR = 'data/index'
+
+
+class ChangeDetector:
+    """Compare les batches d'un snapshot à l'index du chargement précédent"""
+
+    def __init__(self, table_name, columns, sink_kind, index_dir=None):
+        index_dir = index_dir or os.getenv('INGEST_INDEX_DIR') or DEFAULT_INDEX_DIR
+        # Un index par destination : un chargement SQLite ne dit rien de l'état Snowflake
+        self.path = os.path.join(index_dir, f"{sink_kind}_{table_name}.idx")
+        self.table_name = table_name
+        self.key_columns = PRIMARY_KEYS[table_name]
+        self.key_position = columns.index(self.key_columns[0])
+        types = dict(ALL_TABLES[table_name])
+        self.col_types = [types[column] for column in columns]
+        self.previous = self._load()
+        self.current = {}
+        self.counts = Counter()
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return {}
+        with open(self.path, 'rb') as f:
+            return pickle.load(f)
+
+    @property
+    def first_load(self):
+        return not self.previous
+
+    def changed(self, table):
+        """Lignes du batch (table Arrow) nouvelles ou modifiées depuis le chargement précédent"""
+        keep = []
+        # Hash calculé sur tout le batch (kernels Arrow), seule la comparaison à l'index est par clé
+        keys = table.column(self.key_position).to_pylist()
+        for key, digest in zip(keys, batch_hashes(table, self.col_types)):
+            self.current[key] = digest
+            previous = self.previous.get(key)
+            if previous is None:
+                self.counts['inserted'] += 1
+            elif previous != digest:
+                self.counts['updated'] += 1
+            else:
+                self.counts['unchanged'] += 1
+            keep.append(previous != digest)
+        return table.filter(pa.array(keep, pa.bool_()))
+
+    def rejected(self, changed, loaded):
+        """Lignes changées mais non chargées (quarantaine) : l'index garde leur ancien état
+
+        Elles seront ainsi de nouveau comparées au prochain snapshot, et une mise à jour
+        rejetée ne fait pas passer la clé pour supprimée.
+        """
+        key_column = self.key_columns[0]
+        missing = set(changed.column(key_column).to_pylist()) - set(loaded.column(key_column).to_pylist())
+        for key in missing:
+            if key in self.previous:
+                self.current[key] = self.previous[key]
+            else:
+                self.current.pop(key, None)
+
+    def deleted_keys(self):
+        """Clés de l'index précédent absentes du snapshot (à appeler après le dernier batch)"""
+        deleted = [key for key in self.previous if key not in self.current]
+        self.counts['deleted'] = len(deleted)
+        return deleted
+
+    def save(self):
+        """Remplacer l'index par celui du snapshot chargé (écriture atomique)"""
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'wb') as f:
+            pickle.dump(self.current, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, self.path)
+
+    def report(self):
+        total = sum(self.counts[c] for c in ('inserted', 'updated', 'unchanged'))
+        print(f"🧮 Changements {self.table_name}: {self.counts['inserted']} insérées, "
+              f"{self.counts['updated']} mises à jour, {self.counts['deleted']} supprimées, "
+              f"{self.counts['unchanged']} inchangées sur {total}")
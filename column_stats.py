@@ -0,0 +1,256 @@
+"""
+Profil statistique des tables chargées : une seule requête (un seul scan) par table.
+
+Pour chaque colonne : taux de NULL, nombre de valeurs distinctes, min/max et,
+pour les colonnes numériques, percentiles. Côté Snowflake les agrégats sont
+approximatifs (APPROX_COUNT_DISTINCT, APPROX_PERCENTILE) ; côté SQLite les
+percentiles sont estimés sur un échantillon réservoir.
+
+Chaque exécution est sauvegardée dans un snapshot JSON ; chaque table est comparée à
+son profil précédent sur le même sink.
+"""
+
+import os
+import json
+import random
+import datetime
+from decimal import Decimal
+
+from table_schemas import ALL_TABLES, insert_columns, type_info
+
+# Colonnes clés suivies par défaut (les autres tables : toutes les colonnes ingérées)
+PROFILED_COLUMNS = {
+    'SALES_DATA': ['SALE_DATE', 'TOTAL_AMOUNT', 'UNIT_PRICE', 'QUANTITY', 'CHANNEL', 'STORE_ID', 'COUNTRY', 'CUSTOMER_ID'],
+    'RETURNS_DATA': ['RETURN_DATE', 'REFUND_AMOUNT', 'REASON', 'CONDITION', 'STATUS'],
+    'REVIEWS_DATA': ['REVIEW_DATE', 'RATING', 'HELPFUL_VOTES', 'VERIFIED_PURCHASE', 'PRODUCT_ID'],
+    'INVENTORY_DATA': ['CURRENT_STOCK', 'RESERVED_STOCK', 'LAST_RESTOCKED', 'STORE_ID'],
+}
+
+PERCENTILES = [0.05, 0.25, 0.5, 0.75, 0.95]
+DEFAULT_SNAPSHOT_DIR = 'profiles'
+RESERVOIR_SIZE = 10000
+
+
+class _ReservoirPercentile:
+    """Agrégat SQLite : percentile estimé sur un échantillon réservoir de taille bornée"""
+
+    def __init__(self):
+        self.sample = []
+        self.seen = 0
+        self.quantile = None
+        self.random = random.Random(42)
+
+    def step(self, value, quantile):
+        if value is None:
+            return
+        self.quantile = quantile
+        self.seen += 1
+        if len(self.sample) < RESERVOIR_SIZE:
+            self.sample.append(value)
+        else:
+            slot = self.random.randrange(self.seen)
+            if slot < RESERVOIR_SIZE:
+                self.sample[slot] = value
+
+    def finalize(self):
+        if not self.sample:
+            return None
+        ordered = sorted(self.sample)
+        return ordered[min(len(ordered) - 1, int(self.quantile * len(ordered)))]
+
+
+def _column_expressions(sink, column, col_type):
+    """Expressions d'agrégat d'une colonne, dans l'ordre des statistiques produites"""
+    family = type_info(col_type)[0]
+    numeric = family in ('int', 'decimal')
+    if sink.kind == 'sqlite':
+        expressions = [
+            f"SUM(CASE WHEN {column} IS NULL THEN 1 ELSE 0 END)",
+            f"COUNT(DISTINCT {column})",
+            f"MIN({column})",
+            f"MAX({column})",
+        ]
+        if numeric:
+            expressions += [f"approx_percentile({column}, {q})" for q in PERCENTILES]
+    else:
+        expressions = [
+            f"COUNT_IF({column} IS NULL)",
+            f"APPROX_COUNT_DISTINCT({column})",
+            f"MIN({column})",
+            f"MAX({column})",
+        ]
+        if numeric:
+            expressions += [f"APPROX_PERCENTILE({column}, {q})" for q in PERCENTILES]
+    return expressions, numeric
+
+
+def _json_value(value):
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, (datetime.date, datetime.datetime)):
+        return value.isoformat()
+    return value
+
+
+def profile_table(sink, table_name, columns=None):
+    """Statistiques de toutes les colonnes d'une table en une seule requête"""
+    columns = columns or PROFILED_COLUMNS.get(table_name) or insert_columns(table_name)
+    types = dict(ALL_TABLES[table_name])
+
+    select = ["COUNT(*)"]
+    layout = []
+    for column in columns:
+        expressions, numeric = _column_expressions(sink, column, types[column])
+        layout.append((column, numeric, len(select), len(expressions)))
+        select += expressions
+
+    if sink.kind == 'sqlite':
+        sink.connection.create_aggregate('approx_percentile', 2, _ReservoirPercentile)
+    row = sink.query(f"SELECT {', '.join(select)} FROM {table_name}")[0]
+
+    total = row[0] or 0
+    stats = {}
+    for column, numeric, offset, width in layout:
+        values = [_json_value(value) for value in row[offset:offset + width]]
+        nulls, distinct, minimum, maximum = values[:4]
+        stats[column] = {
+            'null_rate': (nulls or 0) / total if total else 0.0,
+            'distinct': distinct,
+            'min': minimum,
+            'max': maximum,
+        }
+        if numeric:
+            stats[column]['percentiles'] = {f"p{int(q * 100)}": v for q, v in zip(PERCENTILES, values[4:])}
+    return {'rows': total, 'columns': stats}
+
+
+def _snapshots(snapshot_dir):
+    """Snapshots sauvegardés, du plus récent au plus ancien"""
+    if not os.path.isdir(snapshot_dir):
+        return []
+    snapshots = []
+    for name in os.listdir(snapshot_dir):
+        if name.startswith('profile_') and name.endswith('.json'):
+            with open(os.path.join(snapshot_dir, name), 'r') as f:
+                snapshots.append((name, json.load(f)))
+    # created_at à la microseconde ; le nom départage deux snapshots du même instant
+    snapshots.sort(key=lambda item: (item[1]['created_at'], item[0]), reverse=True)
+    return [snapshot for _, snapshot in snapshots]
+
+
+def latest_snapshot(snapshot_dir, sink_kind, tables):
+    """Référence de comparaison : pour chaque table, son profil le plus récent sur le même sink
+
+    Un run limité à quelques tables ne masque pas les autres : chaque table est comparée au
+    dernier snapshot qui la contient. Retourne None si aucune table n'a de profil antérieur.
+    """
+    baseline = {'tables': {}, 'created_at': {}}
+    for snapshot in _snapshots(snapshot_dir):
+        if snapshot.get('sink') != sink_kind:
+            continue
+        for table_name in tables:
+            if table_name in snapshot['tables'] and table_name not in baseline['tables']:
+                baseline['tables'][table_name] = snapshot['tables'][table_name]
+                baseline['created_at'][table_name] = snapshot['created_at']
+        if len(baseline['tables']) == len(tables):
+            break
+    return baseline if baseline['tables'] else None
+
+
+def save_snapshot(snapshot, snapshot_dir):
+    os.makedirs(snapshot_dir, exist_ok=True)
+    stamp = snapshot['created_at'].replace(':', '').replace('-', '').replace('.', '')
+    suffix = 0
+    while True:
+        # Création exclusive : deux runs au même instant n'écrasent pas le snapshot de l'autre
+        name = f"profile_{snapshot['sink']}_{stamp}{f'_{suffix}' if suffix else ''}.json"
+        path = os.path.join(snapshot_dir, name)
+        try:
+            with open(path, 'x') as f:
+                json.dump(snapshot, f, indent=2)
+            return path
+        except FileExistsError:
+            suffix += 1
+
+
+def _relative_change(old, new):
+    if not isinstance(old, (int, float)) or not isinstance(new, (int, float)) or isinstance(old, bool):
+        return None
+    if old == 0:
+        return None if new == 0 else float('inf')
+    return (new - old) / abs(old)
+
+
+def diff_snapshots(previous, current, threshold=0.05):
+    """Écarts notables entre deux snapshots : [(table, colonne, statistique, avant, après)]"""
+    changes = []
+    for table_name, table_stats in current['tables'].items():
+        old_table = previous['tables'].get(table_name)
+        if old_table is None:
+            changes.append((table_name, None, 'nouvelle table', None, table_stats['rows']))
+            continue
+        if old_table['rows'] != table_stats['rows']:
+            changes.append((table_name, None, 'rows', old_table['rows'], table_stats['rows']))
+
+        for column, stats in table_stats['columns'].items():
+            old = old_table['columns'].get(column)
+            if old is None:
+                continue
+            if abs(stats['null_rate'] - old['null_rate']) >= threshold / 5:
+                changes.append((table_name, column, 'null_rate', old['null_rate'], stats['null_rate']))
+            change = _relative_change(old['distinct'], stats['distinct'])
+            if change is not None and abs(change) >= threshold:
+                changes.append((table_name, column, 'distinct', old['distinct'], stats['distinct']))
+            for bound in ('min', 'max'):
+                if old[bound] != stats[bound]:
+                    changes.append((table_name, column, bound, old[bound], stats[bound]))
+            for name, value in stats.get('percentiles', {}).items():
+                change = _relative_change(old.get('percentiles', {}).get(name), value)
+                if change is not None and abs(change) >= threshold:
+                    changes.append((table_name, column, name, old['percentiles'][name], value))
+    return changes
+
+
+def profile_tables(sink, tables=None, columns=None, snapshot_dir=DEFAULT_SNAPSHOT_DIR):
+    """Profiler les tables, sauvegarder le snapshot et afficher l'écart avec le précédent"""
+    print("📐 PROFIL STATISTIQUE DES TABLES")
+    print("="*60)
+
+    tables = list(tables or ALL_TABLES)
+    previous = latest_snapshot(snapshot_dir, sink.kind, tables)
+    snapshot = {
+        'created_at': datetime.datetime.now().isoformat(timespec='microseconds'),
+        'sink': sink.kind,
+        'tables': {},
+    }
+
+    for table_name in tables:
+        try:
+            table_stats = profile_table(sink, table_name, columns)
+        except Exception as table_error:
+            print(f"  ⚠️  {table_name}: ERREUR - {table_error}")
+            continue
+        snapshot['tables'][table_name] = table_stats
+
+        print(f"\n📊 {table_name}: {table_stats['rows']} lignes")
+        for column, stats in table_stats['columns'].items():
+            line = (f"  {column:<20} null {stats['null_rate']:6.1%}  distinct ~{stats['distinct']}  "
+                    f"min {stats['min']}  max {stats['max']}")
+            if 'percentiles' in stats:
+                line += "  " + " ".join(f"{k}={v}" for k, v in stats['percentiles'].items())
+            print(line)
+
+    path = save_snapshot(snapshot, snapshot_dir)
+    print(f"\n💾 Snapshot sauvegardé: {path}")
+
+    if previous:
+        changes = diff_snapshots(previous, snapshot)
+        since = sorted(set(previous['created_at'].values()))
+        print(f"\n🔀 ÉCARTS DEPUIS LE(S) SNAPSHOT(S) {sink.kind} DU {', '.join(since)}:")
+        print("-" * 40)
+        if not changes:
+            print("  Aucun écart notable")
+        for table_name, column, stat, old, new in changes:
+            target = f"{table_name}.{column}" if column else table_name
+            print(f"  {target} {stat}: {old} → {new}")
+    return snapshot
@@ -0,0 +1,82 @@
+"""
+Lecture des fichiers d'entrée colonnaires (Parquet, Arrow IPC) par memory mapping.
+
+Les fichiers Arrow IPC sont projetés en mémoire : les record batches pointent
+directement dans le fichier mappé, c'est le cache de pages de l'OS qui bufferise.
+Chaque record batch est découpé sans copie (slice) en unités de chargement de
+batch_size lignes. Un Parquet déjà au schéma de la table cible peut être déposé
+tel quel sur le stage, sans décodage ni réencodage.
+"""
+
+import os
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+# Extension -> format
+COLUMNAR_FORMATS = {
+    '.parquet': 'parquet',
+    '.pq': 'parquet',
+    '.arrow': 'ipc',
+    '.feather': 'ipc',
+    '.ipc': 'ipc',
+}
+
+
+def input_format(path):
+    """'parquet', 'ipc' ou None (NDJSON) d'après l'extension du fichier"""
+    return COLUMNAR_FORMATS.get(os.path.splitext(path)[1].lower())
+
+
+def _ipc_batches(path):
+    with pa.memory_map(path, 'r') as source:
+        try:
+            reader = pa.ipc.open_file(source)
+        except pa.ArrowInvalid:
+            # Format stream (sans footer) : lecture séquentielle, toujours sur la projection
+            source.seek(0)
+            yield from pa.ipc.open_stream(source)
+            return
+        for i in range(reader.num_record_batches):
+            yield reader.get_batch(i)
+
+
+def _parquet_batches(path):
+    # Le Parquet est compressé et encodé : décodé row group par row group
+    parquet_file = pq.ParquetFile(path, memory_map=True)
+    for i in range(parquet_file.num_row_groups):
+        yield from parquet_file.read_row_group(i).to_batches()
+
+
+def record_batches(path):
+    """Record batches d'un fichier colonnaire, dans l'ordre du fichier"""
+    if input_format(path) == 'ipc':
+        return _ipc_batches(path)
+    return _parquet_batches(path)
+
+
+def load_units(path, batch_size):
+    """Tranches d'au plus batch_size lignes, vues sans copie sur les record batches"""
+    for batch in record_batches(path):
+        for offset in range(0, batch.num_rows, batch_size):
+            yield batch.slice(offset, batch_size)
+
+
+def parquet_matches(path, schema):
+    """True si le Parquet a exactement les colonnes et types de schema (COPY direct possible)"""
+    if input_format(path) != 'parquet':
+        return False
+    file_schema = pq.read_schema(path)
+    return [(f.name, f.type) for f in file_schema] == [(f.name, f.type) for f in schema]
+
+
+def parquet_rows(path):
+    return pq.ParquetFile(path).metadata.num_rows
+
+
+def input_rows(path):
+    """Nombre de lignes d'un fichier colonnaire, sans décoder les données"""
+    if input_format(path) == 'parquet':
+        return parquet_rows(path)
+    # Record batches projetés en mémoire : seul l'en-tête de chaque batch est lu
+    return sum(batch.num_rows for batch in _ipc_batches(path))
@@ -1,9 +1,100 @@
 import argparse
+import datetime
 import json
+import os
+import re
+import threading
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Dict, Iterator
-from faker import Faker
+from typing import Dict, Iterator, Optional
+
+# Manifest du répertoire de sortie : high-water mark (dernier ID, dernière date) par entité,
+# lu par le mode --append pour continuer les séquences sans relire les fichiers
+MANIFEST_NAME = 'manifest.json'
+
+# Entité (nom de fichier) -> (clé de range, champ ID, champ date de l'événement)
+ENTITIES = {
+    'suppliers': ('supplier', 'supplier_id', None),
+    'products': ('product', 'product_id', None),
+    'customers': ('customer', 'customer_id', None),
+    'stores': ('store', 'store_id', None),
+    'promotions': ('promotion', 'promotion_id', None),
+    'sales': ('sale', 'sale_id', 'sale_date'),
+    'returns': ('return', 'return_id', 'return_date'),
+    'reviews': ('review', 'review_id', 'review_date'),
+    'inventory': ('inventory', 'inventory_id', 'last_restocked'),
+}
+
+ID_BASES = {
+    'supplier': 1, 'customer': 1001, 'product': 2001, 'store': 3001, 'sale': 100001,
+    'promotion': 4001, 'return': 5001, 'review': 6001, 'inventory': 7001,
+}
+
+# Comptes par défaut d'une génération complète ; en mode --append, 0 sauf demande explicite
+DEFAULT_COUNTS = {'promotions': 10, 'returns': 20, 'reviews': 50, 'inventory': 50}
+
+_manifest_lock = threading.Lock()
+
+
+def load_manifest(output_dir: Path) -> Optional[Dict]:
+    path = Path(output_dir) / MANIFEST_NAME
+    if not path.exists():
+        return None
+    with open(path, 'r') as f:
+        return json.load(f)
+
+
+def build_manifest(output_dir: Path) -> Dict:
+    """Manifest reconstruit par un scan unique des fichiers existants (données sans manifest)"""
+    manifest = {'entities': {}}
+    for entity, (_, id_field, date_field) in ENTITIES.items():
+        path = Path(output_dir) / f"{entity}.json"
+        if not path.exists():
+            continue
+        last_id, last_date, records = 0, None, 0
+        with open(path, 'r') as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                records += 1
+                last_id = max(last_id, int(re.search(r'(\d+)$', record[id_field]).group(1)))
+                if date_field and record.get(date_field):
+                    last_date = max(last_date or record[date_field], record[date_field])
+        manifest['entities'][entity] = {
+            'last_id': last_id, 'last_date': last_date, 'records': records, 'files': [path.name],
+        }
+    return manifest
+
+
+def save_manifest(output_dir: Path, manifest: Dict) -> None:
+    """Écriture atomique : un manifest n'est jamais lu à moitié écrit"""
+    manifest['updated_at'] = datetime.datetime.now().strftime('%Y-%m-%dT%H:%M:%S')
+    path = Path(output_dir) / MANIFEST_NAME
+    tmp_path = path.with_suffix('.json.tmp')
+    with open(tmp_path, 'w') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def record_generation(output_dir: Path, entity: str, entry: Dict, append: bool) -> None:
+    """Mettre à jour l'entrée d'une entité dans le manifest
+
+    Relu sous verrou : l'orchestrateur génère plusieurs entités en parallèle.
+    """
+    with _manifest_lock:
+        manifest = load_manifest(output_dir) or {'entities': {}}
+        previous = manifest['entities'].get(entity)
+        if append and previous:
+            entry = {
+                'last_id': max(previous['last_id'], entry['last_id']),
+                'last_date': max(filter(None, [previous.get('last_date'), entry['last_date']]), default=None),
+                'records': previous['records'] + entry['records'],
+                'files': previous['files'] + [f for f in entry['files'] if f not in previous['files']],
+            }
+        manifest['entities'][entity] = entry
+        save_manifest(output_dir, manifest)
+
 
 @dataclass
 class GenerationConfig:
@@ -17,10 +108,16 @@ class GenerationConfig:
     reviews: int = 50
     inventory: int = 50
     output_dir: Path = Path("data")
+    # append : continuer le dataset existant (IDs et dates après le high-water mark du manifest)
+    append: bool = False
+    # Mode append : jours couverts par le delta, à partir du lendemain de la dernière date
+    days: int = 1
+    # Mode append : 'part' = nouveau fichier <entité>.<n>.json, 'file' = ajout à <entité>.json
+    delta_output: str = 'part'
     
     def __post_init__(self):
-        # Auto-calcul des ratios 
-        if self.suppliers == 0:
+        # Auto-calcul des ratios (un delta n'ajoute des fournisseurs que sur demande)
+        if self.suppliers == 0 and not self.append:
             self.suppliers = max(3, self.products // 20)  
         
         self.output_dir.mkdir(exist_ok=True)
@@ -28,8 +125,12 @@ class GenerationConfig:
 class DataGenerator:
  
     def __init__(self, config: GenerationConfig):
+        # Faker est long à importer : seulement une fois les arguments validés
+        from faker import Faker
+
         self.config = config
         self.fake = Faker()
+        self.manifest = None
         
         # 🔑 ID RANGES 
         self.ranges = {
@@ -43,11 +144,51 @@ class DataGenerator:
             'review': (6001, max(6001, 6001 + config.reviews - 1)),
             'inventory': (7001, max(7001, 7001 + config.inventory - 1))
         }
+        # Références croisées : tous les IDs existants (identiques aux ranges hors mode append)
+        self.reference_ranges = dict(self.ranges)
+        
+        if config.append:
+            self._continue_ranges()
+            return
         
         print(f"🎯 ID Ranges configurés pour cohérence parfaite:")
         for entity, (start, end) in self.ranges.items():
             print(f"   {entity.title()}: {start}-{end} ({end-start+1} items)")
     
+    def _continue_ranges(self) -> None:
+        """Mode append : nouveaux IDs après le dernier ID connu de chaque entité"""
+        self.manifest = load_manifest(self.config.output_dir)
+        if self.manifest is None:
+            print(f"🔎 Pas de {MANIFEST_NAME} dans {self.config.output_dir} : scan unique des fichiers existants")
+            self.manifest = build_manifest(self.config.output_dir)
+            with _manifest_lock:
+                save_manifest(self.config.output_dir, self.manifest)
+        
+        print(f"➕ Mode append : continuation du dataset de {self.config.output_dir}")
+        if self.config.products and not self.config.suppliers and not self.manifest['entities'].get('suppliers'):
+            # Produits sans aucun fournisseur existant à référencer : on en génère, comme un run complet
+            self.config.suppliers = max(3, self.config.products // 20)
+            print(f"⚠️  Aucun fournisseur dans {self.config.output_dir} : {self.config.suppliers} fournisseurs générés")
+        for entity, (key, _, _) in ENTITIES.items():
+            base = ID_BASES[key]
+            state = self.manifest['entities'].get(entity)
+            last_id = state['last_id'] if state else base - 1
+            count = getattr(self.config, entity)
+            self.ranges[key] = (last_id + 1, last_id + count)
+            self.reference_ranges[key] = (base, max(base, last_id + count))
+            if count:
+                since = f", après le {state['last_date']}" if state and state.get('last_date') else ""
+                print(f"   {key.title()}: {last_id + 1}-{last_id + count} ({count} items{since})")
+    
+    def date_window(self, entity: str, start, end):
+        """Bornes des dates d'événement : en mode append, les jours qui suivent la dernière date"""
+        state = self.manifest['entities'].get(entity) if self.manifest else None
+        if not state or not state.get('last_date'):
+            return start, end
+        first_day = datetime.date.fromisoformat(state['last_date']) + datetime.timedelta(days=1)
+        # Borne de fin exclue par Faker.date_between entre deux dates
+        return first_day, first_day + datetime.timedelta(days=max(1, self.config.days))
+    
     def id_range_iterator(self, entity: str) -> Iterator[int]:
         """Générateur d'IDs séquentiels pour un type d'entité"""
         start, end = self.ranges[entity]
@@ -56,7 +197,7 @@ class DataGenerator:
     
     def random_id_from_range(self, entity: str) -> int:
         """ID aléatoire dans une range (pour références croisées)"""
-        start, end = self.ranges[entity]
+        start, end = self.reference_ranges[entity]
         return self.fake.random_int(min=start, max=end)
 
     # =================== GÉNÉRATEURS COMPATIBLES ===================
@@ -108,7 +249,7 @@ class DataGenerator:
         vintage_sizes = ['XS', 'S', 'M', 'L', 'XL', '34', '36', '38', '40', '42', '44']
         
         # Distribution équitable des suppliers
-        supplier_cycle = list(range(*self.ranges['supplier']))
+        supplier_cycle = list(range(*self.reference_ranges['supplier']))
         
         for i, product_id in enumerate(self.id_range_iterator('product')):
             supplier_id = supplier_cycle[i % len(supplier_cycle)]
@@ -226,8 +367,10 @@ class DataGenerator:
         vintage_brands = ['Chanel', 'Dior', 'Yves Saint Laurent', 'Hermès', 'Prada', 'Gucci', 'Versace', 'Valentino']
         vintage_categories = ['Robe', 'Veste', 'Pantalon', 'Jupe', 'Chemise', 'Manteau', 'Blouse', 'Accessoire']
         
+        date_start, date_end = self.date_window('sales', '-2y', 'today')
+        
         for sale_id in self.id_range_iterator('sale'):
-            sale_date = self.fake.date_between('-2y', 'today')
+            sale_date = self.fake.date_between(date_start, date_end)
             quantity = self.fake.random_int(1, 3)
             unit_price = round(self.fake.random.uniform(200, 2500), 2)  
             discount_percent = self.fake.random.uniform(0, 15)
@@ -265,21 +408,19 @@ class DataGenerator:
             }
 
     def generate_returns(self) -> Iterator[Dict]:
-        real_sale_range = (100001, 200000)    
-        real_product_range = (2001, 6000)     
-        real_customer_range = (1001, 11000)   
+        date_start, date_end = self.date_window('returns', '-6m', 'today')
         
         for return_id in self.id_range_iterator('return'):
-            sale_id = f"S{self.fake.random_int(real_sale_range[0], real_sale_range[1])}"
-            product_id = f"P{self.fake.random_int(real_product_range[0], real_product_range[1])}"
-            customer_id = f"C{self.fake.random_int(real_customer_range[0], real_customer_range[1])}"  
+            sale_id = f"S{self.random_id_from_range('sale')}"
+            product_id = f"P{self.random_id_from_range('product')}"
+            customer_id = f"C{self.random_id_from_range('customer')}"
             
             yield {
                 "return_id": f"R{return_id}",
                 "sale_id": sale_id,
                 "customer_id": customer_id,
                 "product_id": product_id,
-                "return_date": self.fake.date_between(start_date='-6m', end_date='today').isoformat(),
+                "return_date": self.fake.date_between(start_date=date_start, end_date=date_end).isoformat(),
                 "reason": self.fake.random_element([
                     "Defective", "Wrong Size", "Changed Mind", "Damaged in Transit", 
                     "Not as Described", "Quality Issues"
@@ -310,20 +451,19 @@ class DataGenerator:
             "Superbe qualité", "Authentique", "Collection parfaite", "Top qualité"
         ]
         
-        real_product_range = (2001, 6000)    
-        real_customer_range = (1001, 11000)  
+        date_start, date_end = self.date_window('reviews', '-6m', 'today')
         
         for review_id in self.id_range_iterator('review'):
             rating = self.fake.random_int(3, 5)  
             
             yield {
                 "review_id": f"REV{review_id}",
-                "product_id": f"P{self.fake.random_int(real_product_range[0], real_product_range[1])}",
-                "customer_id": f"C{self.fake.random_int(real_customer_range[0], real_customer_range[1])}",
+                "product_id": f"P{self.random_id_from_range('product')}",
+                "customer_id": f"C{self.random_id_from_range('customer')}",
                 "rating": rating,
                 "title": self.fake.random_element(review_titles),
                 "comment": self.fake.random_element(review_comments),
-                "review_date": self.fake.date_between(start_date='-6m', end_date='today').isoformat(),
+                "review_date": self.fake.date_between(start_date=date_start, end_date=date_end).isoformat(),
                 "verified_purchase": self.fake.random_element([True, True, True, False]),  
                 "helpful_votes": self.fake.random_int(0, 15),
                 "status": "Published"  
@@ -331,8 +471,7 @@ class DataGenerator:
     
     def generate_inventory(self) -> Iterator[Dict]:
         """Génère des données d'inventaire pour les produits - Compatible ingester_direct"""
-        real_product_range = (2001, 6000)  
-        real_store_range = (3001, 3020)    
+        date_start, date_end = self.date_window('inventory', '-3m', 'today')
         
         for inventory_id in self.id_range_iterator('inventory'):
             current_stock = self.fake.random_int(0, 100)
@@ -342,13 +481,13 @@ class DataGenerator:
             
             yield {
                 "inventory_id": f"INV{inventory_id}",
-                "product_id": f"P{self.fake.random_int(real_product_range[0], real_product_range[1])}",
-                "store_id": f"ST{self.fake.random_int(real_store_range[0], real_store_range[1])}",
+                "product_id": f"P{self.random_id_from_range('product')}",
+                "store_id": f"ST{self.random_id_from_range('store')}",
                 "current_stock": current_stock,
                 "reserved_stock": reserved_stock,
                 "reorder_level": reorder_level,
                 "max_stock_level": max_stock_level,
-                "last_restocked": self.fake.date_between(start_date='-3m', end_date='today').isoformat(),
+                "last_restocked": self.fake.date_between(start_date=date_start, end_date=date_end).isoformat(),
                 "next_delivery_date": self.fake.date_between(start_date='today', end_date='+30d').isoformat(),
                 "warehouse_location": f"A{self.fake.random_int(1,10)}-{self.fake.random_int(1,20)}-{self.fake.random_int(1,50)}"
             }
@@ -417,14 +556,34 @@ class DataGenerator:
         if count == 0:
             print(f"⏭️ Skipping {entity_name} (count=0)")
             return
+        
+        file_mode = 'w'
+        if self.config.append:
+            if self.config.delta_output == 'file':
+                file_mode = 'a'
+            else:
+                state = self.manifest['entities'].get(entity_name)
+                part = len(state['files']) if state else 0
+                output_file = self.config.output_dir / f"{entity_name}.{part:04d}.json"
             
         print(f"🔄 Generating {count} {entity_name}...")
         
-        with open(output_file, 'w') as f:
+        key, _, date_field = ENTITIES[entity_name]
+        last_date = None
+        with open(output_file, file_mode) as f:
             for record in generators[entity_name]():
                 processed_record = self._process_record(record)
+                if date_field:
+                    last_date = max(last_date or processed_record[date_field], processed_record[date_field])
                 f.write(json.dumps(processed_record) + '\n')
         
+        record_generation(self.config.output_dir, entity_name, {
+            'last_id': self.ranges[key][1],
+            'last_date': last_date,
+            'records': count,
+            'files': [output_file.name],
+        }, append=self.config.append)
+        
         print(f"✅ Generated {output_file} ({count:,} records)")
     
     def _process_record(self, record: Dict) -> Dict:
@@ -458,13 +617,25 @@ def main():
     parser.add_argument('--customers', type=int, default=0, help='Nombre de clients à générer')
     parser.add_argument('--suppliers', type=int, default=0, help='Nombre de fournisseurs à générer')
     parser.add_argument('--stores', type=int, default=0, help='Nombre de magasins à générer')
-    parser.add_argument('--promotions', type=int, default=10, help='Nombre de promotions à générer')
-    parser.add_argument('--returns', type=int, default=20, help='Nombre de retours à générer')
-    parser.add_argument('--reviews', type=int, default=50, help='Nombre d\'avis à générer')
-    parser.add_argument('--inventory', type=int, default=50, help='Nombre d\'inventaires à générer')
+    parser.add_argument('--promotions', type=int, help='Nombre de promotions à générer (défaut: 10)')
+    parser.add_argument('--returns', type=int, help='Nombre de retours à générer (défaut: 20)')
+    parser.add_argument('--reviews', type=int, help='Nombre d\'avis à générer (défaut: 50)')
+    parser.add_argument('--inventory', type=int, help='Nombre d\'inventaires à générer (défaut: 50)')
+    
+    # Mode incrémental
+    parser.add_argument('--append', action='store_true',
+                        help='Continuer le dataset existant (IDs et dates après le dernier run, d\'après data/manifest.json)')
+    parser.add_argument('--days', type=int, default=1, help='Mode append: jours couverts par le delta')
+    parser.add_argument('--delta-output', choices=['part', 'file'], default='part',
+                        help='Mode append: nouveau fichier <entité>.<n>.json (part) ou ajout à <entité>.json (file)')
     
     args = parser.parse_args()
     
+    # Un delta ne génère que les entités demandées
+    for entity, default in DEFAULT_COUNTS.items():
+        if getattr(args, entity) is None:
+            setattr(args, entity, 0 if args.append else default)
+    
     # Configuration
     config = GenerationConfig(
         sales=args.sales,
@@ -475,7 +646,10 @@ def main():
         promotions=args.promotions,
         returns=args.returns,
         reviews=args.reviews,
-        inventory=args.inventory
+        inventory=args.inventory,
+        append=args.append,
+        days=args.days,
+        delta_output=args.delta_output
     )
     
     generator = DataGenerator(config)
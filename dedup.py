@@ -0,0 +1,176 @@
+"""
+Déduplication à mémoire bornée des tuples d'insertion par clé primaire.
+
+Une clé renvoyée plusieurs fois par l'amont (même SALE_ID dans le run) n'est
+chargée qu'une fois : première occurrence, dernière, ou plus grande valeur d'une
+colonne de version (à égalité, la dernière). Tant que les clés distinctes tiennent
+dans max_rows, tout se fait en mémoire. Au-delà, les lignes sont réparties sur
+disque en partitions par hash de la clé (pickle séquentiel) : chaque partition est
+dédupliquée seule, et re-partitionnée avec un autre hash si elle dépasse encore
+le budget. Les lignes conservées ressortent dans l'ordre du fichier source
+(external_sort sur leur position), sans jamais plus de max_rows lignes en mémoire.
+"""
+
+import os
+import pickle
+import tempfile
+
+from external_sort import external_sort
+from table_schemas import PRIMARY_KEYS
+
+KEEP_POLICIES = ['first', 'last', 'version']
+PARTITIONS = 16
+# Au-delà, une partition est dédupliquée telle quelle (clés en collision sur chaque hash)
+MAX_DEPTH = 6
+
+
+def _read_entries(path):
+    with open(path, 'rb') as f:
+        while True:
+            try:
+                yield pickle.load(f)
+            except EOFError:
+                return
+
+
+class Deduplicator:
+    """Écarte les doublons de clé primaire d'un flux de tuples d'insertion"""
+
+    def __init__(self, table_name, columns, keep='first', version_column=None, max_rows=100_000, temp_dir=None):
+        self.table_name = table_name
+        self.key_columns = PRIMARY_KEYS[table_name]
+        positions = [columns.index(column) for column in self.key_columns]
+        self.key = (lambda row: row[positions[0]]) if len(positions) == 1 else \
+            (lambda row: tuple(row[i] for i in positions))
+        if version_column and version_column not in columns:
+            print(f"⚠️  {table_name}: colonne de version {version_column} absente, dernière occurrence conservée")
+            keep, version_column = 'last', None
+        self.keep = 'version' if version_column else keep
+        self.version_column = version_column
+        self.version_position = columns.index(version_column) if version_column else None
+        self.max_rows = max_rows
+        self.temp_dir = temp_dir
+        self.input_rows = 0
+        self.output_rows = 0
+        self.partition_files = 0
+        self._paths = []
+
+    def _rank(self, seq, row):
+        """Rang d'une occurrence : la plus grande l'emporte"""
+        if self.keep == 'first':
+            return -seq
+        if self.keep == 'last':
+            return seq
+        version = row[self.version_position]
+        # Une version NULL perd contre toute version renseignée
+        return (version is not None, version, seq)
+
+    def _offer(self, winners, seq, row):
+        key = self.key(row)
+        rank = self._rank(seq, row)
+        current = winners.get(key)
+        if current is None or rank > current[0]:
+            winners[key] = (rank, seq, row)
+
+    def _open_partitions(self, depth):
+        paths, files = [], []
+        for _ in range(PARTITIONS):
+            fd, path = tempfile.mkstemp(prefix=f'dedup_{depth}_', suffix='.pkl', dir=self.temp_dir)
+            self._paths.append(path)
+            paths.append(path)
+            files.append(os.fdopen(fd, 'wb'))
+        self.partition_files += PARTITIONS
+        return paths, files
+
+    def _write(self, files, entry, depth):
+        # Sel = profondeur : une partition re-découpée ne retombe pas sur un seul fichier
+        index = hash((depth, self.key(entry[1]))) % PARTITIONS
+        pickle.dump(entry, files[index], protocol=pickle.HIGHEST_PROTOCOL)
+
+    def _partition(self, entries, depth):
+        """Répartir des (position, tuple) sur PARTITIONS fichiers par hash de la clé"""
+        paths, files = self._open_partitions(depth)
+        try:
+            for entry in entries:
+                self._write(files, entry, depth)
+        finally:
+            for f in files:
+                f.close()
+        return paths
+
+    def _resolve(self, paths, depth, budget):
+        """(position, tuple) conservés de chaque partition"""
+        for path in paths:
+            winners = {}
+            overflow = False
+            entries = _read_entries(path)
+            for seq, row in entries:
+                self._offer(winners, seq, row)
+                if len(winners) > budget and depth < MAX_DEPTH:
+                    overflow = True
+                    break
+            entries.close()
+            if overflow:
+                winners = {}
+                yield from self._resolve(self._partition(_read_entries(path), depth + 1), depth + 1, budget)
+            else:
+                # popitem : la mémoire libérée ici passe au tri qui consomme ces lignes
+                while winners:
+                    _, (_, seq, row) = winners.popitem()
+                    yield seq, row
+            os.unlink(path)
+
+    def rows(self, source):
+        """Itérer source sans doublon de clé, dans l'ordre source des lignes conservées"""
+        winners = {}
+        partitions = files = None
+        try:
+            for seq, row in enumerate(source):
+                self.input_rows += 1
+                if files is not None:
+                    self._write(files, (seq, row), 0)
+                    continue
+                self._offer(winners, seq, row)
+                if len(winners) >= self.max_rows:
+                    # Budget atteint : les gagnants courants et le reste du flux partent sur disque
+                    print(f"💽 {self.table_name}: plus de {self.max_rows} clés distinctes, déduplication sur disque")
+                    partitions, files = self._open_partitions(0)
+                    for _, kept_seq, kept_row in winners.values():
+                        self._write(files, (kept_seq, kept_row), 0)
+                    winners = {}
+
+            if files is None:
+                kept = sorted(winners.values(), key=lambda winner: winner[1])
+                winners = {}
+                for _, _, row in kept:
+                    self.output_rows += 1
+                    yield row
+                return
+
+            for f in files:
+                f.close()
+            # Moitié du budget pour les gagnants d'une partition, moitié pour le tri par position
+            budget = max(1, self.max_rows // 2)
+            entries = self._resolve(partitions, 0, budget)
+            for _, row in external_sort(entries, key=lambda entry: entry[0], max_rows=budget, temp_dir=self.temp_dir):
+                self.output_rows += 1
+                yield row
+        finally:
+            for f in files or []:
+                f.close()
+            for path in self._paths:
+                if os.path.exists(path):
+                    os.unlink(path)
+            self._paths = []
+
+    @property
+    def dropped(self):
+        return self.input_rows - self.output_rows
+
+    def report(self):
+        policy = {'first': 'première occurrence conservée', 'last': 'dernière occurrence conservée'}.get(
+            self.keep, f"plus grande version {self.version_column} conservée")
+        spilled = f", {self.partition_files} partitions sur disque" if self.partition_files else ""
+        print(f"🧹 {self.table_name}: {self.dropped} doublons de {', '.join(self.key_columns)} écartés "
+              f"sur {self.input_rows} lignes ({policy}{spilled})")
+
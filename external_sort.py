@@ -0,0 +1,95 @@
+"""
+Tri externe à mémoire bornée : au plus max_rows lignes sont triées en mémoire à la
+fois, chaque run trié est écrit sur disque (pickle séquentiel) puis les runs sont
+fusionnés en flux avec heapq.merge. Au-delà de max_open_runs runs, des passes
+intermédiaires fusionnent les runs par groupes pour ne jamais ouvrir plus de
+max_open_runs fichiers à la fois. Sert à charger les tables de faits dans l'ordre
+de leur clé de clustering, quelle que soit la taille du fichier source.
+"""
+
+import os
+import heapq
+import pickle
+import tempfile
+
+# Fichiers de runs ouverts au plus par fusion (bien en deçà de la limite de descripteurs)
+MAX_OPEN_RUNS = 64
+
+
+def cluster_sort_key(columns, cluster_by):
+    """Clé de tri d'un tuple d'insertion sur les colonnes de clustering (NULL en dernier)"""
+    positions = [columns.index(column) for column in cluster_by]
+
+    def key(row):
+        return tuple((row[i] is None, row[i] if row[i] is not None else '') for i in positions)
+    return key
+
+
+def _write_run(rows, temp_dir):
+    fd, path = tempfile.mkstemp(prefix='sort_run_', suffix='.pkl', dir=temp_dir)
+    with os.fdopen(fd, 'wb') as f:
+        for row in rows:
+            pickle.dump(row, f, protocol=pickle.HIGHEST_PROTOCOL)
+    return path
+
+
+def _read_run(path):
+    with open(path, 'rb') as f:
+        while True:
+            try:
+                yield pickle.load(f)
+            except EOFError:
+                return
+
+
+def external_sort(rows, key, max_rows=100_000, temp_dir=None, max_open_runs=MAX_OPEN_RUNS):
+    """Itérer rows trié par key, sans jamais garder plus de max_rows lignes en mémoire
+
+    Le tri est stable : à clé égale l'ordre du fichier source est conservé.
+    """
+    max_open_runs = max(2, max_open_runs)
+    paths = []
+    runs = []
+    chunk = []
+
+    def spill(sorted_rows):
+        path = _write_run(sorted_rows, temp_dir)
+        paths.append(path)
+        return path
+
+    try:
+        for row in rows:
+            chunk.append(row)
+            if len(chunk) >= max_rows:
+                chunk.sort(key=key)
+                runs.append(spill(chunk))
+                chunk = []
+
+        if not runs:
+            # Tout tient en mémoire : pas de fichier temporaire
+            chunk.sort(key=key)
+            yield from chunk
+            return
+
+        if chunk:
+            chunk.sort(key=key)
+            runs.append(spill(chunk))
+            chunk = []
+        while len(runs) > max_open_runs:
+            # Passe intermédiaire : runs consécutifs fusionnés par groupes, l'ordre des runs reste celui du source
+            merged = []
+            for start in range(0, len(runs), max_open_runs):
+                group = runs[start:start + max_open_runs]
+                if len(group) == 1:
+                    merged.append(group[0])
+                    continue
+                merged.append(spill(heapq.merge(*[_read_run(path) for path in group], key=key)))
+                for path in group:
+                    os.unlink(path)
+            runs = merged
+        # heapq.merge départage les égalités dans l'ordre des runs : tri stable
+        yield from heapq.merge(*[_read_run(path) for path in runs], key=key)
+    finally:
+        for path in paths:
+            if os.path.exists(path):
+                os.unlink(path)
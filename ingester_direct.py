@@ -1,126 +1,261 @@
 import json
 import sys
 import os
+import time
 import argparse
-from snowflake_config import SnowflakeConnection
+from itertools import islice
 from dotenv import load_dotenv
+from sinks import create_sink, SINK_KINDS
+from snowflake_config import new_run_tag, BINDINGS
+from table_schemas import TRANSACTIONAL_TABLES, SUMMARY_TABLES, SUMMARY_KEYS, CLUSTERING_KEYS, insert_columns
+from streaming import MicroBatchStream
+from external_sort import external_sort, cluster_sort_key
+from summaries import SalesSummary
+import shadow_tables
+from warehouse_policy import create_policy, POLICY_MODES, WAREHOUSE_SIZES
+import tracing
 
 load_dotenv()
 
+
+def sales_row(record):
+    return (
+        record['sale_id'], record['sale_date'], record['customer_id'],
+        record['product_id'], record['product_name'], record['quantity'], 
+        record['unit_price'], record['total_amount'], record['channel'],
+        record['store_id'], record['country']
+    )
+
+def returns_row(record):
+    return (
+        record['return_id'], record['sale_id'], record['customer_id'],
+        record['product_id'], record['return_date'], record['reason'],
+        record['condition'], record['refund_amount'], record['refund_method'],
+        record['processed_by'], record['status'], record.get('notes')
+    )
+
+def reviews_row(record):
+    return (
+        record['review_id'], record['product_id'], record['customer_id'],
+        record['rating'], record['title'], record.get('comment'),
+        record['review_date'], record['verified_purchase'], 
+        record['helpful_votes'], record['status']
+    )
+
+def inventory_row(record):
+    return (
+        record['inventory_id'], record['product_id'], record['store_id'],
+        record['current_stock'], record['reserved_stock'], record['reorder_level'],
+        record['max_stock_level'], record['last_restocked'], 
+        record['next_delivery_date'], record['warehouse_location']
+    )
+
+# Type de données -> (table cible, construction du tuple d'insertion)
+STREAM_TABLES = {
+    'sales': ('SALES_DATA', sales_row),
+    'returns': ('RETURNS_DATA', returns_row),
+    'reviews': ('REVIEWS_DATA', reviews_row),
+    'inventory': ('INVENTORY_DATA', inventory_row),
+}
+# Mode continu : secondes au plus entre deux ajouts des agrégats flushés à SALES_DAILY_SUMMARY
+SUMMARY_INTERVAL = 60
+
 class MultiTableIngester:
-    def __init__(self, batch_size=1000):
+    def __init__(self, batch_size=1000, sink=None, cluster_sort=False, sort_memory_rows=100_000, vectorized=False,
+                 validate=False, summary=True, reload=False, keep_versions=shadow_tables.DEFAULT_KEEP_VERSIONS,
+                 min_ratio=shadow_tables.DEFAULT_MIN_RATIO, dedup=None, dedup_version=None,
+                 dedup_memory_rows=100_000):
         self.batch_size = batch_size
-        self.sf = SnowflakeConnection()
-        
-    def setup_tables(self):
-        """Create all tables for the ingestion process"""
-        self.sf.execute_query("USE ROLE INGEST")
-        self.sf.execute_query("USE WAREHOUSE INGEST")
-        self.sf.execute_query("USE DATABASE INGEST")
-        self.sf.execute_query("USE SCHEMA INGEST")
-        
-        # Sales table
-        sales_sql = """CREATE OR REPLACE TABLE SALES_DATA (
-            SALE_ID VARCHAR(10), 
-            SALE_DATE DATE, 
-            CUSTOMER_ID VARCHAR(10),
-            PRODUCT_ID VARCHAR(10), 
-            PRODUCT_NAME VARCHAR(100), 
-            QUANTITY INTEGER, 
-            UNIT_PRICE DECIMAL(10,2), 
-            TOTAL_AMOUNT DECIMAL(10,2), 
-            CHANNEL VARCHAR(20),
-            STORE_ID VARCHAR(10),
-            COUNTRY VARCHAR(50), 
-            CREATED_AT TIMESTAMP_NTZ DEFAULT CURRENT_TIMESTAMP()
-        )"""
+        self.sink = sink or create_sink()
+        # summary : agrégats des ventes maintenus pendant l'ingestion (summaries.py)
+        self.summary = summary
+        # validate : contrôles qualité par batch Arrow (quality_checks.py), implique vectorized
+        self.validate = validate
+        # vectorized : normalisation par batch en colonnes (transforms.py) au lieu de *_row()
+        self.vectorized = vectorized or validate
+        # cluster_sort : charger les tables de faits dans l'ordre de CLUSTERING_KEYS
+        self.cluster_sort = cluster_sort
+        self.sort_memory_rows = sort_memory_rows
+        # dedup : 'first' / 'last' (ou dedup_version) pour écarter les clés primaires répétées du run (dedup.py)
+        self.dedup = 'last' if dedup_version and not dedup else dedup
+        self.dedup_version = dedup_version.upper() if dedup_version else None
+        self.dedup_memory_rows = dedup_memory_rows
+        # reload : chargement dans <TABLE>_SHADOW puis échange atomique (shadow_tables.py)
+        self.reload = reload
+        self.keep_versions = keep_versions
+        self.min_ratio = min_ratio
+        # Table logique -> lignes écrites par ce run (tables à publier en mode reload)
+        self.loaded = {}
         
-        # Returns table
-        returns_sql = """CREATE OR REPLACE TABLE RETURNS_DATA (
-            RETURN_ID VARCHAR(10),
-            SALE_ID VARCHAR(10),
-            CUSTOMER_ID VARCHAR(10),
-            PRODUCT_ID VARCHAR(10),
-            RETURN_DATE DATE,
-            REASON VARCHAR(50),
-            CONDITION VARCHAR(20),
-            REFUND_AMOUNT DECIMAL(10,2),
-            REFUND_METHOD VARCHAR(30),
-            PROCESSED_BY VARCHAR(100),
-            STATUS VARCHAR(20),
-            NOTES VARCHAR(500),
-            CREATED_AT TIMESTAMP_NTZ DEFAULT CURRENT_TIMESTAMP()
-        )"""
-        
-        # Reviews table
-        reviews_sql = """CREATE OR REPLACE TABLE REVIEWS_DATA (
-            REVIEW_ID VARCHAR(10),
-            PRODUCT_ID VARCHAR(10),
-            CUSTOMER_ID VARCHAR(10),
-            RATING INTEGER,
-            TITLE VARCHAR(100),
-            COMMENT VARCHAR(1000),
-            REVIEW_DATE DATE,
-            VERIFIED_PURCHASE BOOLEAN,
-            HELPFUL_VOTES INTEGER,
-            STATUS VARCHAR(20),
-            CREATED_AT TIMESTAMP_NTZ DEFAULT CURRENT_TIMESTAMP()
-        )"""
-        
-        # Inventory table
-        inventory_sql = """CREATE OR REPLACE TABLE INVENTORY_DATA (
-            INVENTORY_ID VARCHAR(10),
-            PRODUCT_ID VARCHAR(10),
-            STORE_ID VARCHAR(10),
-            CURRENT_STOCK INTEGER,
-            RESERVED_STOCK INTEGER,
-            REORDER_LEVEL INTEGER,
-            MAX_STOCK_LEVEL INTEGER,
-            LAST_RESTOCKED DATE,
-            NEXT_DELIVERY_DATE DATE,
-            WAREHOUSE_LOCATION VARCHAR(50),
-            CREATED_AT TIMESTAMP_NTZ DEFAULT CURRENT_TIMESTAMP()
-        )"""
+    def setup_tables(self, replace=True):
+        """Create all tables for the ingestion process (replace=False: keep existing rows)"""
+        self.sink.use_context()
 
         # Direct ingester se concentre uniquement sur les données transactionnelles
-        for sql in [sales_sql, returns_sql, reviews_sql, inventory_sql]:
-            self.sf.execute_query(sql)
+        for table_name, columns in TRANSACTIONAL_TABLES.items():
+            cluster_by = CLUSTERING_KEYS.get(table_name) if self.cluster_sort else None
+            self._create_table(table_name, columns, replace, cluster_by=cluster_by)
+        # Jamais recréée : chaque run y ajoute ses agrégats (merge additif). Un rechargement
+        # complet (--reload) la reconstruit dans sa table fantôme, publiée avec SALES_DATA.
+        if self.summary:
+            for table_name, columns in SUMMARY_TABLES.items():
+                self._create_table(table_name, columns, False, primary_key=SUMMARY_KEYS[table_name])
+
+    def _create_table(self, table_name, columns, replace, **options):
+        if not self.reload:
+            self.sink.create_table(table_name, columns, replace=replace, **options)
+            return
+        # La table lue par les utilisateurs n'est pas touchée : seule la fantôme repart de zéro
+        self.sink.create_table(table_name, columns, replace=False, **options)
+        self.sink.create_table(shadow_tables.shadow_name(table_name), columns, replace=True, **options)
+
+    def target(self, table_name):
+        """Table physique où écrire les lignes de table_name"""
+        return shadow_tables.shadow_name(table_name) if self.reload else table_name
+
+    def publish_reload(self):
+        """Mode reload : valider toutes les tables fantômes chargées, puis les échanger une à une
+
+        Toutes les validations passent avant le premier échange : une table refusée
+        n'en laisse pas d'autres publiées à moitié (ex. SALES_DATA sans sa synthèse).
+        """
+        for table_name, rows in self.loaded.items():
+            shadow_tables.validate(self.sink, table_name, rows, self.min_ratio)
+        for table_name, rows in self.loaded.items():
+            with tracing.span('SWAP', table=table_name):
+                shadow_tables.publish(self.sink, table_name, rows, self.keep_versions, self.min_ratio)
+
+    def discard_shadows(self):
+        """Supprimer les tables fantômes restantes (non chargées, ou rechargement abandonné)"""
+        tables = list(TRANSACTIONAL_TABLES) + (list(SUMMARY_TABLES) if self.summary else [])
+        for table_name in tables:
+            shadow_tables.discard(self.sink, table_name)
+
+    def read_rows(self, filename, table_name, row_builder):
+        """Tuples d'insertion d'un fichier NDJSON, Parquet ou Arrow IPC, triés par clé de clustering si activé"""
+        from columnar_input import input_format
+
+        def rows():
+            with open(filename, 'r') as f:
+                for line in f:
+                    if line.strip():
+                        yield row_builder(json.loads(line))
+
+        def vectorized_rows():
+            from transforms import read_batches, table_rows
+
+            columns = insert_columns(table_name)
+            validator = None
+            if self.validate:
+                from quality_checks import BatchValidator
+                validator = BatchValidator(table_name, data_dir=os.path.dirname(filename) or '.')
+
+            def prepare(table):
+                return table_rows(validator.filter(table) if validator else table)
+
+            for table in read_batches(filename, table_name, columns, self.batch_size):
+                yield from prepare(table)
+            if validator:
+                validator.report()
+
+        # Les entrées colonnaires passent toujours par le chemin vectorisé
+        source = vectorized_rows() if self.vectorized or input_format(filename) else rows()
+        if self.dedup:
+            source = self.deduplicated(source, table_name)
+        cluster_by = CLUSTERING_KEYS.get(table_name) if self.cluster_sort else None
+        if not cluster_by:
+            return source
+        print(f"↕️  Tri par {', '.join(cluster_by)} (au plus {self.sort_memory_rows} lignes en mémoire)")
+        key = cluster_sort_key(insert_columns(table_name), cluster_by)
+        return external_sort(source, key, max_rows=self.sort_memory_rows)
+
+    def deduplicated(self, source, table_name):
+        """Tuples de source sans clé primaire répétée, avant tri et insertion"""
+        from dedup import Deduplicator
+
+        deduplicator = Deduplicator(table_name, insert_columns(table_name), keep=self.dedup,
+                                    version_column=self.dedup_version, max_rows=self.dedup_memory_rows)
+        yield from deduplicator.rows(source)
+        deduplicator.report()
+
+    def stream(self, data_type, source, max_bytes=1_000_000, max_latency_ms=1000, max_pending=None, idle_exit=None,
+               summary_interval=SUMMARY_INTERVAL):
+        """Suivre un flux NDJSON (fichier en cours d'écriture ou '-' pour stdin) en micro-batches
+
+        Flush au premier seuil atteint : batch_size lignes, max_bytes octets ou max_latency_ms.
+        Seules les lignes flushées comptent dans la synthèse des ventes, ajoutée à la table
+        au plus tard summary_interval secondes après (0 : à chaque flush) et en fin de flux.
+        """
+        table_name, row_builder = STREAM_TABLES[data_type]
+        summary = SalesSummary(insert_columns(table_name)) if self.summary and table_name == 'SALES_DATA' else None
+        on_flush = None
+        if summary:
+            last_merge = time.monotonic()
+
+            def on_flush(batch):
+                nonlocal last_merge
+                summary.add(batch)
+                if time.monotonic() - last_merge >= summary_interval:
+                    summary.merge_into(self.sink)
+                    last_merge = time.monotonic()
+        stream = MicroBatchStream(
+            self.sink, table_name, insert_columns(table_name), row_builder,
+            max_rows=self.batch_size, max_bytes=max_bytes,
+            max_latency_ms=max_latency_ms, max_pending=max_pending, on_flush=on_flush
+        )
+        stats = stream.run(source, idle_exit=idle_exit)
+        if summary:
+            summary.merge_into(self.sink)
+        return stats
+    
+    def batches(self, rows):
+        """Découper rows en batches de batch_size tuples, un span par batch
+
+        Le span enfant 'parse' couvre la lecture et la normalisation des lignes du batch ;
+        le consommateur ouvre ses propres spans (INSERT) pendant que le batch est ouvert.
+        """
+        rows = iter(rows)
+        number = 0
+        while True:
+            number += 1
+            batch_span = tracing.begin(f"batch {number}", 'batch', tag=number)
+            parse_span = tracing.begin('parse')
+            batch = list(islice(rows, self.batch_size))
+            if not batch:
+                parse_span.discard()
+                batch_span.discard()
+                return
+            parse_span.end(rows=len(batch))
+            try:
+                yield batch
+            finally:
+                batch_span.end(rows=len(batch))
+
+    def insert_batch(self, table_name, batch):
+        with tracing.span('INSERT', rows=len(batch)):
+            self.sink.append_rows(self.target(table_name), insert_columns(table_name), batch)
+        self.loaded[table_name] = self.loaded.get(table_name, 0) + len(batch)
     
     def ingest_sales_data(self, filename):
         """Ingest sales data from JSON file"""
         print(f"Ingesting sales data from {filename}...")
         
-        with open(filename, 'r') as f:
-            batch = []
-            total_inserted = 0
-            
-            for line in f:
-                if line.strip():
-                    record = json.loads(line)
-                    batch.append((
-                        record['sale_id'], record['sale_date'], record['customer_id'],
-                        record['product_id'], record['product_name'], record['quantity'], 
-                        record['unit_price'], record['total_amount'], record['channel'],
-                        record['store_id'], record['country']
-                    ))
-                    
-                    if len(batch) >= self.batch_size:
-                        self.sf.execute_batch(
-                            "INSERT INTO SALES_DATA (SALE_ID, SALE_DATE, CUSTOMER_ID, PRODUCT_ID, PRODUCT_NAME, QUANTITY, UNIT_PRICE, TOTAL_AMOUNT, CHANNEL, STORE_ID, COUNTRY) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)",
-                            batch
-                        )
-                        total_inserted += len(batch)
-                        batch = []
-                        print(f"Inserted batch: {total_inserted} sales records so far...")
-            
-            # Insert remaining records
-            if batch:
-                self.sf.execute_batch(
-                    "INSERT INTO SALES_DATA (SALE_ID, SALE_DATE, CUSTOMER_ID, PRODUCT_ID, PRODUCT_NAME, QUANTITY, UNIT_PRICE, TOTAL_AMOUNT, CHANNEL, STORE_ID, COUNTRY) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)",
-                    batch
-                )
-                total_inserted += len(batch)
+        total_inserted = 0
+        # Agrégats mis à jour au fil des batches insérés, ajoutés à la table de synthèse en fin de fichier
+        summary = SalesSummary(insert_columns('SALES_DATA')) if self.summary else None
         
+        with tracing.span('SALES_DATA', 'table', tag='SALES_DATA', file=filename):
+            for batch in self.batches(self.read_rows(filename, 'SALES_DATA', sales_row)):
+                self.insert_batch('SALES_DATA', batch)
+                if summary:
+                    summary.add(batch)
+                total_inserted += len(batch)
+                print(f"Inserted batch: {total_inserted} sales records so far...")
+            
+            if summary:
+                summary_table = summary.table_name
+                inserted, _ = summary.merge_into(self.sink, self.target(summary_table))
+                self.loaded[summary_table] = self.loaded.get(summary_table, 0) + inserted
         print(f"✓ Sales ingestion completed: {total_inserted} records")
         return total_inserted
     
@@ -128,35 +263,13 @@ class MultiTableIngester:
         """Ingest returns data from JSON file"""
         print(f"Ingesting returns data from {filename}...")
         
-        with open(filename, 'r') as f:
-            batch = []
-            total_inserted = 0
-            
-            for line in f:
-                if line.strip():
-                    record = json.loads(line)
-                    batch.append((
-                        record['return_id'], record['sale_id'], record['customer_id'],
-                        record['product_id'], record['return_date'], record['reason'],
-                        record['condition'], record['refund_amount'], record['refund_method'],
-                        record['processed_by'], record['status'], record.get('notes')
-                    ))
-                    
-                    if len(batch) >= self.batch_size:
-                        self.sf.execute_batch(
-                            "INSERT INTO RETURNS_DATA (RETURN_ID, SALE_ID, CUSTOMER_ID, PRODUCT_ID, RETURN_DATE, REASON, CONDITION, REFUND_AMOUNT, REFUND_METHOD, PROCESSED_BY, STATUS, NOTES) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)",
-                            batch
-                        )
-                        total_inserted += len(batch)
-                        batch = []
-                        print(f"Inserted batch: {total_inserted} returns records so far...")
-            
-            if batch:
-                self.sf.execute_batch(
-                    "INSERT INTO RETURNS_DATA (RETURN_ID, SALE_ID, CUSTOMER_ID, PRODUCT_ID, RETURN_DATE, REASON, CONDITION, REFUND_AMOUNT, REFUND_METHOD, PROCESSED_BY, STATUS, NOTES) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)",
-                    batch
-                )
+        total_inserted = 0
+        
+        with tracing.span('RETURNS_DATA', 'table', tag='RETURNS_DATA', file=filename):
+            for batch in self.batches(self.read_rows(filename, 'RETURNS_DATA', returns_row)):
+                self.insert_batch('RETURNS_DATA', batch)
                 total_inserted += len(batch)
+                print(f"Inserted batch: {total_inserted} returns records so far...")
         
         print(f"✓ Returns ingestion completed: {total_inserted} records")
         return total_inserted
@@ -165,35 +278,13 @@ class MultiTableIngester:
         """Ingest reviews data from JSON file"""
         print(f"Ingesting reviews data from {filename}...")
         
-        with open(filename, 'r') as f:
-            batch = []
-            total_inserted = 0
-            
-            for line in f:
-                if line.strip():
-                    record = json.loads(line)
-                    batch.append((
-                        record['review_id'], record['product_id'], record['customer_id'],
-                        record['rating'], record['title'], record.get('comment'),
-                        record['review_date'], record['verified_purchase'], 
-                        record['helpful_votes'], record['status']
-                    ))
-                    
-                    if len(batch) >= self.batch_size:
-                        self.sf.execute_batch(
-                            "INSERT INTO REVIEWS_DATA (REVIEW_ID, PRODUCT_ID, CUSTOMER_ID, RATING, TITLE, COMMENT, REVIEW_DATE, VERIFIED_PURCHASE, HELPFUL_VOTES, STATUS) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)",
-                            batch
-                        )
-                        total_inserted += len(batch)
-                        batch = []
-                        print(f"Inserted batch: {total_inserted} reviews records so far...")
-            
-            if batch:
-                self.sf.execute_batch(
-                    "INSERT INTO REVIEWS_DATA (REVIEW_ID, PRODUCT_ID, CUSTOMER_ID, RATING, TITLE, COMMENT, REVIEW_DATE, VERIFIED_PURCHASE, HELPFUL_VOTES, STATUS) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)",
-                    batch
-                )
+        total_inserted = 0
+        
+        with tracing.span('REVIEWS_DATA', 'table', tag='REVIEWS_DATA', file=filename):
+            for batch in self.batches(self.read_rows(filename, 'REVIEWS_DATA', reviews_row)):
+                self.insert_batch('REVIEWS_DATA', batch)
                 total_inserted += len(batch)
+                print(f"Inserted batch: {total_inserted} reviews records so far...")
         
         print(f"✓ Reviews ingestion completed: {total_inserted} records")
         return total_inserted
@@ -202,49 +293,122 @@ class MultiTableIngester:
         """Ingest inventory data from JSON file"""
         print(f"Ingesting inventory data from {filename}...")
         
-        with open(filename, 'r') as f:
-            batch = []
-            total_inserted = 0
-            
-            for line in f:
-                if line.strip():
-                    record = json.loads(line)
-                    batch.append((
-                        record['inventory_id'], record['product_id'], record['store_id'],
-                        record['current_stock'], record['reserved_stock'], record['reorder_level'],
-                        record['max_stock_level'], record['last_restocked'], 
-                        record['next_delivery_date'], record['warehouse_location']
-                    ))
-                    
-                    if len(batch) >= self.batch_size:
-                        self.sf.execute_batch(
-                            "INSERT INTO INVENTORY_DATA (INVENTORY_ID, PRODUCT_ID, STORE_ID, CURRENT_STOCK, RESERVED_STOCK, REORDER_LEVEL, MAX_STOCK_LEVEL, LAST_RESTOCKED, NEXT_DELIVERY_DATE, WAREHOUSE_LOCATION) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)",
-                            batch
-                        )
-                        total_inserted += len(batch)
-                        batch = []
-                        print(f"Inserted batch: {total_inserted} inventory records so far...")
-            
-            if batch:
-                self.sf.execute_batch(
-                    "INSERT INTO INVENTORY_DATA (INVENTORY_ID, PRODUCT_ID, STORE_ID, CURRENT_STOCK, RESERVED_STOCK, REORDER_LEVEL, MAX_STOCK_LEVEL, LAST_RESTOCKED, NEXT_DELIVERY_DATE, WAREHOUSE_LOCATION) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)",
-                    batch
-                )
+        total_inserted = 0
+        
+        with tracing.span('INVENTORY_DATA', 'table', tag='INVENTORY_DATA', file=filename):
+            for batch in self.batches(self.read_rows(filename, 'INVENTORY_DATA', inventory_row)):
+                self.insert_batch('INVENTORY_DATA', batch)
                 total_inserted += len(batch)
+                print(f"Inserted batch: {total_inserted} inventory records so far...")
         
         print(f"✅ Inventory ingestion completed: {total_inserted} records inserted into INVENTORY_DATA table")
         return total_inserted
 
 def main():
     parser = argparse.ArgumentParser(description='Direct Ingester for TRANSACTIONAL DATA using SQL INSERT')
-    parser.add_argument('--sales', type=str, help='Sales JSON file to ingest')
-    parser.add_argument('--returns', type=str, help='Returns JSON file to ingest')
-    parser.add_argument('--reviews', type=str, help='Reviews JSON file to ingest')
-    parser.add_argument('--inventory', type=str, help='Inventory JSON file to ingest')
+    parser.add_argument('--sales', type=str, help='Sales file to ingest (NDJSON, Parquet or Arrow IPC)')
+    parser.add_argument('--returns', type=str, help='Returns file to ingest (NDJSON, Parquet or Arrow IPC)')
+    parser.add_argument('--reviews', type=str, help='Reviews file to ingest (NDJSON, Parquet or Arrow IPC)')
+    parser.add_argument('--inventory', type=str, help='Inventory file to ingest (NDJSON, Parquet or Arrow IPC)')
     parser.add_argument('--all-transactional', action='store_true', help='Ingest all transactional data files (sales, returns, reviews, inventory)')
     parser.add_argument('--batch-size', type=int, default=1000, help='Batch size for processing')
+    parser.add_argument('--sink', choices=SINK_KINDS, help='Destination (défaut: INGEST_SINK ou snowflake)')
+    parser.add_argument('--query-tag', type=str, help='QUERY_TAG du run (défaut: généré)')
+    parser.add_argument('--cluster-sort', action='store_true', help='Trier les tables de faits par clé de clustering (CLUSTER BY dans le DDL)')
+    parser.add_argument('--sort-memory-rows', type=int, default=100_000, help='Lignes triées en mémoire au plus (au-delà: runs sur disque)')
+    parser.add_argument('--vectorized', action='store_true', help='Normaliser les records par batch en colonnes (transforms.py)')
+    parser.add_argument('--no-summary', action='store_true', help='Ne pas maintenir SALES_DAILY_SUMMARY pendant l\'ingestion des ventes')
+    parser.add_argument('--validate', action='store_true', help='Contrôles qualité par batch, violations en quarantaine/ (implique --vectorized)')
+    parser.add_argument('--dedup', choices=['first', 'last'],
+                        help='Écarter les clés primaires répétées dans le run (occurrence conservée)')
+    parser.add_argument('--dedup-version', type=str, metavar='COLUMN',
+                        help='Dédupliquer en conservant la plus grande valeur de COLUMN (ex. LAST_RESTOCKED)')
+    parser.add_argument('--dedup-memory-rows', type=int, default=100_000,
+                        help='Déduplication: clés distinctes en mémoire au plus (au-delà: partitions sur disque)')
+    parser.add_argument('--stream', choices=list(STREAM_TABLES), help='Mode continu: suivre --source en micro-batches')
+    parser.add_argument('--source', type=str, default='-', help='Mode continu: fichier NDJSON suivi, ou - pour stdin')
+    parser.add_argument('--flush-bytes', type=int, default=1_000_000, help='Mode continu: flush au-delà de B octets')
+    parser.add_argument('--flush-ms', type=int, default=1000, help='Mode continu: cible de latence (flush après T ms)')
+    parser.add_argument('--max-pending', type=int, help='Mode continu: lignes en attente avant contre-pression (défaut: 10 x batch)')
+    parser.add_argument('--idle-exit', type=float, help='Mode continu: arrêt après S secondes sans nouvelle ligne')
+    parser.add_argument('--summary-interval', type=float, default=SUMMARY_INTERVAL,
+                        help='Mode continu: secondes au plus entre deux ajouts à SALES_DAILY_SUMMARY (0: à chaque flush)')
+    
+    parser.add_argument('--binding', choices=BINDINGS,
+                        help='INSERT Snowflake: client (SQL rendu, défaut) ou server (array binding) ; défaut: INGEST_BINDING')
+    parser.add_argument('--commit-every', type=int,
+                        help='Binding server: batches par transaction explicite (défaut: INGEST_COMMIT_EVERY ou 1)')
+    parser.add_argument('--reload', action='store_true',
+                        help='Rechargement complet sans interruption: tables fantômes puis échange atomique')
+    parser.add_argument('--keep-versions', type=int, default=shadow_tables.DEFAULT_KEEP_VERSIONS,
+                        help='Mode reload: anciennes versions conservées pour --rollback')
+    parser.add_argument('--min-ratio', type=float, default=shadow_tables.DEFAULT_MIN_RATIO,
+                        help='Mode reload: refuser une table rechargée avec moins de R x les lignes en place (0: désactivé)')
+    parser.add_argument('--rollback', nargs='+', metavar='TABLE',
+                        choices=list(TRANSACTIONAL_TABLES) + list(SUMMARY_TABLES),
+                        help='Remettre en place la dernière version conservée des tables')
+    parser.add_argument('--warehouse-policy', choices=POLICY_MODES,
+                        help='Dimensionner le warehouse d\'après le volume des fichiers (défaut: INGEST_WAREHOUSE_POLICY ou off)')
+    parser.add_argument('--max-warehouse-size', choices=WAREHOUSE_SIZES, help='Taille maximale choisie par la politique')
+    parser.add_argument('--trace', nargs='?', const='', metavar='PATH',
+                        help='Tracer le run (spans table/batch/INSERT, QUERY_TAG par batch) au format Chrome Trace (défaut: traces/<tag>.json)')
     
     args = parser.parse_args()
+    run_tag = args.query_tag or new_run_tag('direct')
+    run_span = tracing.start_run(run_tag, args.trace or None) if args.trace is not None else None
+    try:
+        run_ingestion(args, run_tag)
+    finally:
+        if run_span:
+            tracing.finish_run(run_span)
+
+
+def build_ingester(args, run_tag):
+    """MultiTableIngester et son sink configurés depuis la ligne de commande"""
+    sink = create_sink(args.sink, query_tag=run_tag, binding=args.binding, commit_every=args.commit_every)
+    return MultiTableIngester(batch_size=args.batch_size, sink=sink,
+                              cluster_sort=args.cluster_sort, sort_memory_rows=args.sort_memory_rows,
+                              vectorized=args.vectorized, validate=args.validate,
+                              summary=not args.no_summary, reload=args.reload,
+                              keep_versions=args.keep_versions, min_ratio=args.min_ratio,
+                              dedup=args.dedup, dedup_version=args.dedup_version,
+                              dedup_memory_rows=args.dedup_memory_rows)
+
+
+def run_ingestion(args, run_tag):
+    if args.rollback:
+        with create_sink(args.sink, query_tag=run_tag, binding=args.binding, commit_every=args.commit_every) as sink:
+            sink.use_context()
+            for table_name in args.rollback:
+                shadow_tables.rollback(sink, table_name)
+        return
+    
+    if args.stream:
+        if args.reload:
+            print("⚠️  --reload ignoré en mode continu (les tables existantes sont complétées)")
+            args.reload = False
+        if args.dedup or args.dedup_version:
+            print("⚠️  --dedup ignoré en mode continu (ensemble des clés vues non borné)")
+            args.dedup = args.dedup_version = None
+        # Lignes insérées telles que lues, micro-batch par micro-batch
+        for option, enabled in (('--validate', args.validate), ('--vectorized', args.vectorized),
+                                ('--cluster-sort', args.cluster_sort)):
+            if enabled:
+                print(f"⚠️  {option} ignoré en mode continu (non appliqué aux micro-batches)")
+        args.validate = args.vectorized = args.cluster_sort = False
+        ingester = build_ingester(args, run_tag)
+        try:
+            # Un flux continu complète les tables existantes au lieu de les recréer
+            ingester.setup_tables(replace=False)
+            ingester.stream(args.stream, args.source, args.flush_bytes, args.flush_ms, args.max_pending, args.idle_exit,
+                           args.summary_interval)
+            print(f"🏷️  Profil du run: python3 snowflake_check_data.py --profile-run {run_tag}")
+        except Exception:
+            ingester.sink.rollback()
+            raise
+        finally:
+            ingester.sink.close()
+        return
     
     if args.all_transactional:
         # Ingérer tous les types de données transactionnelles
@@ -256,11 +420,14 @@ def main():
         }
         
         print("🔄 Direct Ingester: Traitement de toutes les données transactionnelles")
-        ingester = MultiTableIngester(batch_size=args.batch_size)
+        ingester = build_ingester(args, run_tag)
         
+        sizing = None
         try:
             ingester.setup_tables()
             print("✅ Tables setup completed")
+            sizing = create_policy(ingester.sink, args.warehouse_policy, max_size=args.max_warehouse_size).apply(
+                list(transactional_files.values()), 'all-transactional')
             
             total_records = 0
             for data_type, filepath in transactional_files.items():
@@ -276,10 +443,22 @@ def main():
                 else:
                     print(f"⚠️  Fichier manquant: {filepath}")
                     
+            if args.reload:
+                ingester.publish_reload()
             print(f"\n🎉 Total ingestion completed: {total_records} records across all transactional tables")
+            print(f"🏷️  Profil du run: python3 snowflake_check_data.py --profile-run {run_tag}")
             
+        except Exception:
+            # Batches groupés non validés annulés avant la restauration et le nettoyage (DDL = COMMIT)
+            ingester.sink.rollback()
+            raise
         finally:
-            ingester.sf.close()
+            # Taille d'origine remise même si le chargement a échoué
+            if sizing:
+                sizing.restore()
+            if args.reload:
+                ingester.discard_shadows()
+            ingester.sink.close()
         return
     
     if not any([args.sales, args.returns, args.reviews, args.inventory]):
@@ -288,11 +467,14 @@ def main():
         print("Ou utilisez --all-transactional pour traiter tous les fichiers transactionnels")
         return
     
-    ingester = MultiTableIngester(batch_size=args.batch_size)
+    ingester = build_ingester(args, run_tag)
     
+    sizing = None
     try:
         ingester.setup_tables()
         print("✅ Tables setup completed")
+        sizing = create_policy(ingester.sink, args.warehouse_policy, max_size=args.max_warehouse_size).apply(
+            [args.sales, args.returns, args.reviews, args.inventory], 'transactional')
         
         total_records = 0
         
@@ -308,10 +490,20 @@ def main():
         if args.inventory:
             total_records += ingester.ingest_inventory_data(args.inventory)
         
+        if args.reload:
+            ingester.publish_reload()
         print(f"\n🎉 Total ingestion completed: {total_records} records across transactional tables")
+        print(f"🏷️  Profil du run: python3 snowflake_check_data.py --profile-run {run_tag}")
         
+    except Exception:
+        ingester.sink.rollback()
+        raise
     finally:
-        ingester.sf.close()
+        if sizing:
+            sizing.restore()
+        if args.reload:
+            ingester.discard_shadows()
+        ingester.sink.close()
 
 if __name__ == "__main__":
     main()
@@ -2,14 +2,16 @@ import os, sys, logging
 import json
 import uuid
 import argparse
-import snowflake.connector
-import pandas as pd
-import pyarrow as pa
-import pyarrow.parquet as pq
 import tempfile
+import contextlib
 
+import tracing
 from dotenv import load_dotenv
-from cryptography.hazmat.primitives import serialization
+from sinks import create_sink, CopyWindow, SINK_KINDS
+from pipe_loader import create_pipe_loader, PipeFeed
+from snowflake_config import new_run_tag
+from warehouse_policy import create_policy, create_warehouse_control, resolve_mode, POLICY_MODES, WAREHOUSE_SIZES
+from table_schemas import REFERENCE_TABLES, PRIMARY_KEYS
 
 load_dotenv()
 
@@ -17,6 +19,10 @@ logging.basicConfig(level=logging.INFO)
 
 
 def connect_snow():
+    # Imports lourds différés : --help et les runs sans fichier n'en ont pas besoin
+    import snowflake.connector
+    from cryptography.hazmat.primitives import serialization
+
     private_key_path = os.getenv('SNOWFLAKE_PRIVATE_KEY_PATH')
     
     with open(private_key_path, 'rb') as f:
@@ -42,173 +48,40 @@ def connect_snow():
         session_parameters={'QUERY_TAG': 'py-snowpipe-sql-method'}, 
     )
 
-def setup_snowflake_objects(snow):
+def setup_snowflake_objects(sink):
     """Créer automatiquement les tables et pipes nécessaires"""
-    cursor = snow.cursor()
-    
     try:
-        create_products_table = """
-        CREATE TABLE IF NOT EXISTS PRODUCTS_DATA_SNOWPIPE (
-            PRODUCT_ID VARCHAR(20) NOT NULL,
-            NAME VARCHAR(255) NOT NULL,
-            CATEGORY VARCHAR(100),
-            SUBCATEGORY VARCHAR(100),
-            BRAND VARCHAR(100),
-            MATERIAL VARCHAR(100),
-            COLOR VARCHAR(50),
-            PRICE NUMBER(10,2),
-            COST NUMBER(10,2),
-            WEIGHT_KG NUMBER(8,2),
-            DIMENSIONS_CM VARCHAR(50),
-            SUPPLIER_ID VARCHAR(20),
-            CREATED_DATE DATE,
-            LAST_UPDATED DATE,
-            IS_ACTIVE BOOLEAN,
-            SKU VARCHAR(50),
-            PRIMARY KEY (PRODUCT_ID)
-        )
-        """
-        
-        cursor.execute(create_products_table)
-        print("✅ PRODUCTS_DATA_SNOWPIPE table created/verified")
-        
-        create_customers_table = """
-        CREATE TABLE IF NOT EXISTS CUSTOMERS_DATA_SNOWPIPE (
-            CUSTOMER_ID VARCHAR(20) NOT NULL,
-            FIRST_NAME VARCHAR(100) NOT NULL,
-            LAST_NAME VARCHAR(100) NOT NULL,
-            EMAIL VARCHAR(255),
-            PHONE VARCHAR(50),
-            DATE_OF_BIRTH DATE,
-            GENDER VARCHAR(10),
-            ADDRESS VARCHAR(500),
-            SEGMENT VARCHAR(50),
-            REGISTRATION_DATE DATE,
-            LAST_PURCHASE_DATE DATE,
-            TOTAL_ORDERS NUMBER(10,0),
-            LIFETIME_VALUE NUMBER(12,2),
-            PREFERRED_CHANNEL VARCHAR(50),
-            MARKETING_CONSENT BOOLEAN,
-            PRIMARY KEY (CUSTOMER_ID)
-        )
-        """
-        
-        cursor.execute(create_customers_table)
-        print("✅ CUSTOMERS_DATA_SNOWPIPE table created/verified")
-        
-        create_suppliers_table = """
-        CREATE TABLE IF NOT EXISTS SUPPLIERS_DATA_SNOWPIPE (
-            SUPPLIER_ID VARCHAR(20) NOT NULL,
-            NAME VARCHAR(255) NOT NULL,
-            CONTACT_PERSON VARCHAR(255),
-            EMAIL VARCHAR(255),
-            PHONE VARCHAR(50),
-            ADDRESS VARCHAR(500),
-            SPECIALTY VARCHAR(255),
-            LEAD_TIME_DAYS NUMBER(5,0),
-            MINIMUM_ORDER NUMBER(10,2),
-            PAYMENT_TERMS VARCHAR(100),
-            QUALITY_RATING NUMBER(3,2),
-            ESTABLISHED_DATE DATE,
-            IS_ACTIVE BOOLEAN,
-            PRIMARY KEY (SUPPLIER_ID)
-        )
-        """
-        
-        cursor.execute(create_suppliers_table)
-        print("✅ SUPPLIERS_DATA_SNOWPIPE table created/verified")
-        
-        create_stores_table = """
-        CREATE TABLE IF NOT EXISTS STORES_DATA_SNOWPIPE (
-            STORE_ID VARCHAR(20) NOT NULL,
-            STORE_NAME VARCHAR(255) NOT NULL,
-            MANAGER_NAME VARCHAR(255),
-            ADDRESS VARCHAR(500),
-            CITY VARCHAR(100),
-            COUNTRY VARCHAR(100),
-            PHONE VARCHAR(50),
-            EMAIL VARCHAR(255),
-            OPENING_DATE DATE,
-            STORE_SIZE_SQM NUMBER(10,2),
-            IS_ACTIVE BOOLEAN,
-            PRIMARY KEY (STORE_ID)
-        )
-        """
-        
-        cursor.execute(create_stores_table)
-        print("✅ STORES_DATA_SNOWPIPE table created/verified")
-        
-        create_promotions_table = """
-        CREATE TABLE IF NOT EXISTS PROMOTIONS_DATA_SNOWPIPE (
-            PROMOTION_ID VARCHAR(20) NOT NULL,
-            NAME VARCHAR(255) NOT NULL,
-            DESCRIPTION VARCHAR(500),
-            DISCOUNT_TYPE VARCHAR(50),
-            DISCOUNT_VALUE NUMBER(8,2),
-            START_DATE DATE,
-            END_DATE DATE,
-            MINIMUM_PURCHASE NUMBER(10,2),
-            IS_ACTIVE BOOLEAN,
-            CREATED_DATE DATE,
-            PRIMARY KEY (PROMOTION_ID)
-        )
-        """
-        
-        cursor.execute(create_promotions_table)
-        print("✅ PROMOTIONS_DATA_SNOWPIPE table created/verified")
+        for table_name, columns in REFERENCE_TABLES.items():
+            sink.create_table(table_name, columns, primary_key=PRIMARY_KEYS[table_name])
+            print(f"✅ {table_name} table created/verified")
         
         print("ℹ️ Utilisation de la méthode SQL COPY pour l'ingestion (Snowpipe alternatif)")
         
     except Exception as e:
         print(f"❌ Error setting up Snowflake objects: {e}")
         logging.error(f"Error setting up Snowflake objects: {e}")
-    finally:
-        cursor.close()
 
-def save_to_snowflake_via_sql(snow, batch, temp_dir, table_name):
+def save_to_snowflake_via_sql(sink, batch, temp_dir, table_name):
     """Méthode alternative : Upload fichier Parquet puis COPY via SQL (simule Snowpipe)"""
+    from arrow_schemas import rows_to_table, write_parquet
+
     logging.info(f'Inserting batch to {table_name} via SQL COPY (Snowpipe alternative)')
     
-    # Créer DataFrame et fichier Parquet
-    pandas_df = pd.DataFrame(batch, columns=[
+    # Créer la table Arrow typée et le fichier Parquet
+    arrow_table = rows_to_table(batch, table_name, [
         "PRODUCT_ID", "NAME", "CATEGORY", "SUBCATEGORY", "BRAND", "MATERIAL", 
         "COLOR", "PRICE", "COST", "WEIGHT_KG", "DIMENSIONS_CM", "SUPPLIER_ID",
         "CREATED_DATE", "LAST_UPDATED", "IS_ACTIVE", "SKU"
     ])
-    arrow_table = pa.Table.from_pandas(pandas_df)
     file_name = f"products_{str(uuid.uuid1())}.parquet"
     out_path = f"{temp_dir.name}/{file_name}"
     
     # Écrire le fichier Parquet
-    pq.write_table(arrow_table, out_path, use_dictionary=False, compression='SNAPPY')
+    write_parquet(arrow_table, out_path)
     
-    cursor = snow.cursor()
     try:
-        # Créer un stage temporaire
-        stage_name = f"TEMP_STAGE_{uuid.uuid4().hex[:8]}"
-        cursor.execute(f"CREATE OR REPLACE TEMPORARY STAGE {stage_name}")
-        
-        # Upload du fichier vers le stage
-        put_command = f"PUT 'file://{out_path}' @{stage_name}"
-        cursor.execute(put_command)
-        logging.info(f"File uploaded to stage {stage_name}")
-        
-        # COPY via SQL 
-        copy_command = f"""
-        COPY INTO {table_name}
-        FROM @{stage_name}/{file_name}
-        FILE_FORMAT=(TYPE='PARQUET')
-        MATCH_BY_COLUMN_NAME=CASE_SENSITIVE
-        """
-        
-        result = cursor.execute(copy_command)
-        copy_result = cursor.fetchone()
-        # Le résultat COPY peut varier, utilisons la taille du batch comme approximation
-        rows_loaded = len(batch)
-        logging.info(f"SQL COPY completed: {rows_loaded} rows loaded (estimated from batch size)")
-        
-        # Nettoyer le stage
-        cursor.execute(f"DROP STAGE {stage_name}")
+        rows_loaded = sink.load_staged_file(table_name, out_path)
+        logging.info(f"SQL COPY completed: {rows_loaded} rows loaded")
         
         return rows_loaded
         
@@ -217,19 +90,19 @@ def save_to_snowflake_via_sql(snow, batch, temp_dir, table_name):
         if os.path.exists(out_path):
             os.unlink(out_path)
 
-def process_products_sql_method(filename, batch_size):
+def process_products_sql_method(filename, batch_size, sink_kind=None, query_tag=None):
     """Process products avec la méthode SQL (alternative à Snowpipe REST)"""
     print(f"Processing products from {filename} with SQL method (Snowpipe alternative)")
     print(f"Batch size: {batch_size}")
     
-    snow = connect_snow()
+    sink = create_sink(sink_kind, connect=connect_snow, query_tag=query_tag)
     
     # Configurer automatiquement les objets Snowflake nécessaires
-    setup_snowflake_objects(snow)
+    setup_snowflake_objects(sink)
     
-    batch = []
     temp_dir = tempfile.TemporaryDirectory()
     total_processed = 0
+    batch = []
     
     try:
         with open(filename, 'r') as f:
@@ -245,14 +118,14 @@ def process_products_sql_method(filename, batch_size):
                     ))
                     
                     if len(batch) >= batch_size:
-                        rows_loaded = save_to_snowflake_via_sql(snow, batch, temp_dir, 'PRODUCTS_DATA_SNOWPIPE')
+                        rows_loaded = save_to_snowflake_via_sql(sink, batch, temp_dir, 'PRODUCTS_DATA_SNOWPIPE')
                         total_processed += rows_loaded
                         batch = []
                         print(f"Processed {total_processed} records so far...")
         
         # Process remaining records
         if batch:
-            rows_loaded = save_to_snowflake_via_sql(snow, batch, temp_dir, 'PRODUCTS_DATA_SNOWPIPE')
+            rows_loaded = save_to_snowflake_via_sql(sink, batch, temp_dir, 'PRODUCTS_DATA_SNOWPIPE')
             total_processed += rows_loaded
         
         print(f"✅ SQL Snowpipe alternative completed: {total_processed} records processed")
@@ -262,19 +135,51 @@ def process_products_sql_method(filename, batch_size):
         logging.error(f"Error during SQL processing: {e}")
     finally:
         temp_dir.cleanup()
-        snow.close()
+        sink.close()
+
+def process_any_data_type(filename, data_type, batch_size, sink_kind=None, query_tag=None, mode='append', row_group_size=None,
+                          max_in_flight=4, pipe_wait=True, pipe_timeout=600, validate=False, warehouse=None):
+    """Process any type of data with automatic table creation
+
+    mode='append' : COPY direct dans la table cible
+    mode='upsert' : COPY dans une table de staging transitoire puis un seul MERGE
+                    sur la clé naturelle (PRODUCT_ID, CUSTOMER_ID, ...) en fin de run
+    mode='delta'  : comme upsert, mais seules les lignes nouvelles ou modifiées depuis le
+                    chargement précédent (index local clé -> hash, change_detection.py)
+                    sont chargées, et les clés absentes du snapshot sont supprimées
+    mode='pipe'   : fichiers déposés sur un stage persistant et notifiés au pipe, qui
+                    les charge de façon asynchrone ; statut suivi par fichier via
+                    l'historique de chargement (pipe_wait=False : pas d'attente)
+    max_in_flight : nombre de COPY asynchrones en cours au plus pendant que le
+                    client prépare et uploade les fichiers suivants
+    validate      : contrôles qualité par batch (quality_checks.py) ; les lignes en
+                    violation partent en quarantaine au lieu d'être chargées
+    warehouse     : warehouse de la session de chargement, choisi pour tout le run par
+                    warehouse_sizing (politique select) ; None : celui de la connexion
+
+    Retourne le nombre de records traités, ou None en cas d'erreur.
+    """
+    from transforms import read_batches
+    from arrow_schemas import arrow_schema
+    from columnar_input import input_format, parquet_matches, parquet_rows
 
-def process_any_data_type(filename, data_type, batch_size):
-    """Process any type of data with automatic table creation"""
     print(f"Processing {data_type} from {filename} with SQL method (Snowpipe alternative)")
     print(f"Batch size: {batch_size}")
     
-    snow = connect_snow()
-    setup_snowflake_objects(snow)
+    sink = create_sink(sink_kind, connect=connect_snow, query_tag=query_tag)
+    if warehouse:
+        create_warehouse_control(sink).use(warehouse)
+    setup_snowflake_objects(sink)
     
-    batch = []
     temp_dir = tempfile.TemporaryDirectory()
     total_processed = 0
+    batch_number = 0
+    loader = None
+    if mode == 'pipe':
+        loader = create_pipe_loader(sink)
+        window = PipeFeed(loader, wait=pipe_wait, timeout=pipe_timeout)
+    else:
+        window = CopyWindow(sink, max_in_flight)
     
     # Mapping des colonnes par type de données
     column_mappings = {
@@ -307,136 +212,148 @@ def process_any_data_type(filename, data_type, batch_size):
     
     columns = column_mappings[data_type]
     table_name = table_names[data_type]
+    load_table = table_name
+    
+    validator = None
+    if validate:
+        from quality_checks import BatchValidator
+        validator = BatchValidator(table_name, data_dir=os.path.dirname(filename) or '.')
+    
+    detector = None
+    if mode == 'delta':
+        from change_detection import ChangeDetector
+        detector = ChangeDetector(table_name, columns, sink.kind)
     
+    def prepare(table):
+        if detector:
+            table = detector.changed(table)
+        if validator:
+            valid = validator.filter(table)
+            if detector and valid.num_rows < table.num_rows:
+                detector.rejected(table, valid)
+            table = valid
+        return table
+    
+    deletes_table = None
+    table_span = tracing.begin(table_name, 'table', tag=table_name, file=filename, mode=mode)
     try:
-        with open(filename, 'r') as f:
-            for line in f:
-                if line.strip():
-                    record = json.loads(line)
-                    
-                    # Construire le tuple selon le type de données
-                    if data_type == 'products':
-                        batch.append((
-                            record['product_id'], record['name'], record['category'],
-                            record['subcategory'], record['brand'], record['material'],
-                            record['color'], record['price'], record['cost'],
-                            record['weight_kg'], record['dimensions_cm'], record['supplier_id'],
-                            record['created_date'], record['last_updated'], record['is_active'], record['sku']
-                        ))
-                    elif data_type == 'customers':
-                        batch.append((
-                            record['customer_id'], record['first_name'], record['last_name'],
-                            record['email'], record['phone'], record['date_of_birth'],
-                            record['gender'], record['address'], record['segment'],
-                            record['registration_date'], record['last_purchase_date'],
-                            record['total_orders'], record['lifetime_value'], 
-                            record['preferred_channel'], record['marketing_consent']
-                        ))
-                    elif data_type == 'suppliers':
-                        batch.append((
-                            record['supplier_id'], record['name'], record['contact_person'],
-                            record['email'], record['phone'], record['address'],
-                            record['specialty'], record['lead_time_days'], record['minimum_order'],
-                            record['payment_terms'], record['quality_rating'],
-                            record['established_date'], record['is_active']
-                        ))
-                    elif data_type == 'stores':
-                        # Support pour les deux formats d'address (string ou dict)
-                        if isinstance(record.get('address'), str):
-                            # Si address est une string (peut être JSON), utiliser telle quelle
-                            address_str = record.get('address', '')
-                        elif isinstance(record.get('address'), dict):
-                            # Si address est un dict
-                            address_str = f"{record['address'].get('street', '')}, {record['address'].get('city', '')}, {record['address'].get('country', '')}".strip(', ')
-                        else:
-                            address_str = ''
-                        
-                        batch.append((
-                            record['store_id'], 
-                            record.get('store_name') or record.get('name', ''),  # Support des deux noms de champs
-                            record['manager_name'],
-                            address_str, 
-                            record['city'], 
-                            record['country'],
-                            record['phone'], 
-                            record['email'], 
-                            record['opening_date'],
-                            record.get('store_size_sqm') or record.get('square_meters', 0), 
-                            record['is_active']
-                        ))
-                    elif data_type == 'promotions':
-                        batch.append((
-                            record['promotion_id'], 
-                            record['name'], 
-                            record['description'],
-                            record.get('discount_type') or record.get('type', ''),  # Support des deux noms de champs
-                            record['discount_value'], 
-                            record['start_date'],
-                            record['end_date'], 
-                            record['minimum_purchase'], 
-                            record['is_active'],
-                            record.get('created_date') or record['start_date']  # Utiliser created_date si disponible, sinon start_date
-                        ))
-                    
-                    if len(batch) >= batch_size:
-                        rows_loaded = save_to_snowflake_generic(snow, batch, temp_dir, table_name, columns)
-                        total_processed += rows_loaded
-                        batch = []
-                        print(f"Processed {total_processed} {data_type} records so far...")
-        
-        # Process remaining records
-        if batch:
-            rows_loaded = save_to_snowflake_generic(snow, batch, temp_dir, table_name, columns)
-            total_processed += rows_loaded
-        
+        if mode in ('upsert', 'delta'):
+            load_table = f"{table_name}_STAGING"
+            sink.create_staging_table(load_table, table_name)
+            print(f"🔁 Mode upsert: chargement dans {load_table} puis MERGE sur {', '.join(PRIMARY_KEYS[table_name])}")
+        
+        columnar = input_format(filename)
+        if columnar == 'parquet' and not validator and not detector and parquet_matches(filename, arrow_schema(table_name, columns)):
+            # Parquet déjà au schéma cible : déposé tel quel sur le stage, sans décodage ni réencodage
+            batch_number = 1
+            with tracing.span(f"batch {batch_number}", 'batch', tag=batch_number, file=filename):
+                window.submit(load_table, os.path.abspath(filename), batch_number)
+            total_processed = parquet_rows(filename)
+            print(f"📦 {filename} déjà au schéma de {table_name}: COPY direct du fichier ({total_processed} records)")
+        else:
+            batches = read_batches(filename, table_name, columns, batch_size)
+            while True:
+                # Un span par batch : parse (lecture + normalisation + contrôles) puis encode/PUT/COPY
+                batch_span = tracing.begin(f"batch {batch_number + 1}", 'batch', tag=batch_number + 1)
+                parse_span = tracing.begin('parse')
+                arrow_table = next(batches, None)
+                if arrow_table is None:
+                    parse_span.discard()
+                    batch_span.discard()
+                    break
+                with batch_span:
+                    with parse_span:
+                        arrow_table = prepare(arrow_table)
+                    batch_number += 1
+                    total_processed += save_to_snowflake_generic(sink, arrow_table, temp_dir, table_name, columns,
+                                                                 load_table, row_group_size, window, batch_number)
+                    batch_span.args['rows'] = arrow_table.num_rows
+                print(f"Processed {total_processed} {data_type} records so far...")
+        
+        # Aucun succès annoncé tant que tous les COPY en vol ne sont pas terminés
+        with tracing.span('COPY drain'):
+            rows_loaded = window.drain()
+        if rows_loaded is not None and rows_loaded != total_processed:
+            print(f"⚠️  {total_processed} records envoyés mais {rows_loaded} lignes chargées")
+        
+        if mode in ('upsert', 'delta'):
+            with tracing.span('MERGE'):
+                inserted, updated = sink.merge_table(load_table, table_name, PRIMARY_KEYS[table_name], columns)
+            print(f"🔁 MERGE {table_name}: {inserted} insérées, {updated} mises à jour, "
+                  f"{total_processed - inserted - updated} inchangées")
+        
+        if detector:
+            deleted = detector.deleted_keys()
+            if deleted:
+                key_columns = PRIMARY_KEYS[table_name]
+                key_types = dict(REFERENCE_TABLES[table_name])
+                deletes_table = f"{table_name}_DELETES"
+                sink.create_table(deletes_table, [(key, key_types[key]) for key in key_columns], replace=True)
+                sink.append_rows(deletes_table, key_columns, [(key,) for key in deleted])
+                with tracing.span('DELETE', keys=len(deleted)):
+                    removed = sink.delete_matching(deletes_table, table_name, key_columns)
+                print(f"🗑️  {table_name}: {removed} lignes supprimées (absentes du snapshot)")
+            # L'index ne reflète le snapshot qu'une fois tous les changements appliqués
+            detector.save()
+            detector.report()
+        
+        if validator:
+            validator.report()
         print(f"✅ {data_type.title()} Snowpipe alternative completed: {total_processed} records processed")
+        return total_processed
         
     except Exception as e:
         print(f"❌ Error during {data_type} processing: {e}")
         logging.error(f"Error during {data_type} processing: {e}")
     finally:
+        for work_table in (load_table, deletes_table):
+            if work_table and work_table != table_name:
+                try:
+                    sink.drop_table(work_table)
+                except Exception as e:
+                    logging.error(f"Error dropping work table {work_table}: {e}")
+        if loader is not None:
+            loader.close()
         temp_dir.cleanup()
-        snow.close()
+        table_span.end(rows=total_processed)
+        sink.close()
 
-def save_to_snowflake_generic(snow, batch, temp_dir, table_name, columns):
-    """Version générique de sauvegarde pour tous types de données"""
-    logging.info(f'Inserting batch to {table_name} via SQL COPY (Snowpipe alternative)')
+def save_to_snowflake_generic(sink, batch, temp_dir, table_name, columns, load_table=None, row_group_size=None,
+                              window=None, batch_number=None):
+    """Version générique de sauvegarde pour tous types de données
+
+    Le Parquet suit le schéma Arrow de table_name ; load_table permet de charger
+    ce fichier dans une autre table de même structure (staging du mode upsert).
+    Avec une CopyWindow, le COPY est seulement soumis : la fonction retourne le
+    nombre de lignes envoyées et le résultat est vérifié par window.drain().
+    batch : liste de tuples, ou table Arrow déjà typée (transforms.transform_batch).
+    """
+    from arrow_schemas import rows_to_table, write_parquet
+
+    load_table = load_table or table_name
+    logging.info(f'Inserting batch to {load_table} via SQL COPY (Snowpipe alternative)')
     
-    # Créer DataFrame et fichier Parquet
-    pandas_df = pd.DataFrame(batch, columns=columns)
-    arrow_table = pa.Table.from_pandas(pandas_df)
-    file_name = f"{table_name.lower()}_{str(uuid.uuid1())}.parquet"
+    # Créer la table Arrow typée et le fichier Parquet
+    arrow_table = batch if hasattr(batch, 'schema') else rows_to_table(batch, table_name, columns)
+    if arrow_table.num_rows == 0:
+        # Batch entièrement mis en quarantaine : rien à charger
+        return 0
+    # Numéro de batch en tête : l'ordre des noms de fichiers est celui du run (MERGE du mode upsert)
+    file_name = f"{load_table.lower()}_{batch_number or 0:06d}_{str(uuid.uuid1())}.parquet"
     out_path = f"{temp_dir.name}/{file_name}"
     
     # Écrire le fichier Parquet
-    pq.write_table(arrow_table, out_path, use_dictionary=False, compression='SNAPPY')
+    with tracing.span('encode', rows=arrow_table.num_rows):
+        write_parquet(arrow_table, out_path, row_group_size)
     
-    cursor = snow.cursor()
     try:
-        # Créer un stage temporaire
-        stage_name = f"TEMP_STAGE_{uuid.uuid4().hex[:8]}"
-        cursor.execute(f"CREATE OR REPLACE TEMPORARY STAGE {stage_name}")
-        
-        # Upload du fichier vers le stage
-        put_command = f"PUT 'file://{out_path}' @{stage_name}"
-        cursor.execute(put_command)
-        logging.info(f"File uploaded to stage {stage_name}")
-        
-        # COPY via SQL (équivalent à Snowpipe)
-        copy_command = f"""
-        COPY INTO {table_name}
-        FROM @{stage_name}/{file_name}
-        FILE_FORMAT=(TYPE='PARQUET')
-        MATCH_BY_COLUMN_NAME=CASE_SENSITIVE
-        """
-        
-        result = cursor.execute(copy_command)
-        copy_result = cursor.fetchone()
-        rows_loaded = len(batch)
-        logging.info(f"SQL COPY completed: {rows_loaded} rows loaded (estimated from batch size)")
-        
-        # Nettoyer le stage
-        cursor.execute(f"DROP STAGE {stage_name}")
+        if window is not None:
+            window.submit(load_table, out_path, batch_number)
+            logging.info(f"SQL COPY submitted: batch {batch_number}, {len(batch)} rows")
+            return len(batch)
+
+        rows_loaded = sink.load_staged_file(load_table, out_path)
+        logging.info(f"SQL COPY completed: {rows_loaded} rows loaded")
         
         return rows_loaded
         
@@ -447,16 +364,60 @@ def save_to_snowflake_generic(snow, batch, temp_dir, table_name, columns):
 
 def main():
     parser = argparse.ArgumentParser(description='Snowpipe alternative for REFERENCE DATA using SQL COPY + Parquet')
-    parser.add_argument('--products', type=str, help='Products JSON file to ingest')
-    parser.add_argument('--customers', type=str, help='Customers JSON file to ingest')  
-    parser.add_argument('--suppliers', type=str, help='Suppliers JSON file to ingest')
-    parser.add_argument('--stores', type=str, help='Stores JSON file to ingest')
-    parser.add_argument('--promotions', type=str, help='Promotions JSON file to ingest')
+    parser.add_argument('--products', type=str, help='Products file to ingest (NDJSON, Parquet or Arrow IPC)')
+    parser.add_argument('--customers', type=str, help='Customers file to ingest (NDJSON, Parquet or Arrow IPC)')  
+    parser.add_argument('--suppliers', type=str, help='Suppliers file to ingest (NDJSON, Parquet or Arrow IPC)')
+    parser.add_argument('--stores', type=str, help='Stores file to ingest (NDJSON, Parquet or Arrow IPC)')
+    parser.add_argument('--promotions', type=str, help='Promotions file to ingest (NDJSON, Parquet or Arrow IPC)')
     parser.add_argument('--all-reference', action='store_true', help='Ingest all reference data files (products, customers, suppliers, stores, promotions)')
     parser.add_argument('--batch-size', type=int, default=100, help='Batch size for processing')
+    parser.add_argument('--sink', choices=SINK_KINDS, help='Destination (défaut: INGEST_SINK ou snowflake)')
+    parser.add_argument('--query-tag', type=str, help='QUERY_TAG du run (défaut: généré)')
+    parser.add_argument('--mode', choices=['append', 'upsert', 'delta', 'pipe'], default='append',
+                        help='append: COPY direct, upsert: staging + MERGE sur la clé naturelle, '
+                             'delta: upsert des seules lignes changées depuis le dernier chargement + suppressions, '
+                             'pipe: stage persistant + pipe asynchrone')
+    parser.add_argument('--row-group-size', type=int, help='Nombre de lignes par row group Parquet (défaut: pyarrow)')
+    parser.add_argument('--max-in-flight', type=int, default=4, help='COPY asynchrones en cours au plus par table (1: synchrone)')
+    parser.add_argument('--no-wait', action='store_true', help='Mode pipe: ne pas attendre le statut de chargement des fichiers')
+    parser.add_argument('--pipe-timeout', type=int, default=600, help='Mode pipe: attente maximale du chargement (secondes)')
+    parser.add_argument('--validate', action='store_true', help='Contrôles qualité par batch, violations en quarantaine/')
+    parser.add_argument('--warehouse-policy', choices=POLICY_MODES,
+                        help='Dimensionner le warehouse une fois d\'après le volume de tous les fichiers du run (défaut: INGEST_WAREHOUSE_POLICY ou off)')
+    parser.add_argument('--max-warehouse-size', choices=WAREHOUSE_SIZES, help='Taille maximale choisie par la politique')
+    parser.add_argument('--trace', nargs='?', const='', metavar='PATH',
+                        help='Tracer le run (spans table/batch/encode/PUT/COPY, QUERY_TAG par batch) au format Chrome Trace (défaut: traces/<tag>.json)')
     
     args = parser.parse_args()
-    
+    run_tag = args.query_tag or new_run_tag('snowpipe')
+    run_span = tracing.start_run(run_tag, args.trace or None) if args.trace is not None else None
+    try:
+        run_ingestion(args, run_tag)
+    finally:
+        if run_span:
+            tracing.finish_run(run_span)
+
+
+@contextlib.contextmanager
+def warehouse_sizing(paths, label, sink_kind=None, query_tag=None, policy=None, max_size=None):
+    """Dimensionner le warehouse une fois pour tous les fichiers paths, restauré en sortie de bloc
+
+    Produit le warehouse que les sessions de chargement doivent utiliser (politique
+    select), sinon None. La session qui a appliqué la politique reste ouverte jusqu'à
+    la restauration, y compris si un chargement échoue.
+    """
+    if resolve_mode(policy) == 'off':
+        yield None
+        return
+    sink = create_sink(sink_kind, connect=connect_snow, query_tag=query_tag)
+    try:
+        with create_policy(sink, policy, max_size=max_size).apply(paths, label) as sizing:
+            yield sizing.warehouse
+    finally:
+        sink.close()
+
+
+def run_ingestion(args, run_tag):
     if args.all_reference:
         # Ingérer tous les types de données de référence
         reference_files = {
@@ -468,33 +429,38 @@ def main():
         }
         
         print("🔄 Snowpipe Ingester: Traitement de toutes les données de référence")
+        files = {}
         for data_type, filepath in reference_files.items():
             if os.path.exists(filepath):
-                process_any_data_type(filepath, data_type, args.batch_size)
+                files[data_type] = filepath
             else:
                 print(f"⚠️  Fichier manquant: {filepath}")
-        return
-    
-    if not any([args.products, args.customers, args.suppliers, args.stores, args.promotions]):
-        print("❄️  SNOWPIPE INGESTER - Données de référence")
-        print("Spécifiez au moins un fichier: --products, --customers, --suppliers, --stores, --promotions")
-        print("Ou utilisez --all-reference pour traiter tous les fichiers de référence")
-        return
+    else:
+        reference_files = {
+            'products': args.products,
+            'customers': args.customers,
+            'suppliers': args.suppliers,
+            'stores': args.stores,
+            'promotions': args.promotions
+        }
+        files = {data_type: filepath for data_type, filepath in reference_files.items() if filepath}
+        if not files:
+            print("❄️  SNOWPIPE INGESTER - Données de référence")
+            print("Spécifiez au moins un fichier: --products, --customers, --suppliers, --stores, --promotions")
+            print("Ou utilisez --all-reference pour traiter tous les fichiers de référence")
+            return
     
-    if args.products:
-        process_any_data_type(args.products, 'products', args.batch_size)
+    # Options de chargement communes à toutes les entités du run
+    options = dict(batch_size=args.batch_size, sink_kind=args.sink, query_tag=run_tag, mode=args.mode,
+                   row_group_size=args.row_group_size, max_in_flight=args.max_in_flight,
+                   pipe_wait=not args.no_wait, pipe_timeout=args.pipe_timeout, validate=args.validate)
+    # Le pipe charge avec sa propre capacité : le warehouse de session n'y participe pas
+    policy = 'off' if args.mode == 'pipe' else args.warehouse_policy
+    with warehouse_sizing(list(files.values()), 'reference', args.sink, run_tag, policy, args.max_warehouse_size) as warehouse:
+        for data_type, filepath in files.items():
+            process_any_data_type(filepath, data_type, warehouse=warehouse, **options)
     
-    if args.customers:
-        process_any_data_type(args.customers, 'customers', args.batch_size)
-        
-    if args.suppliers:
-        process_any_data_type(args.suppliers, 'suppliers', args.batch_size)
-        
-    if args.stores:
-        process_any_data_type(args.stores, 'stores', args.batch_size)
-        
-    if args.promotions:
-        process_any_data_type(args.promotions, 'promotions', args.batch_size)
+    print(f"🏷️  Profil du run: python3 snowflake_check_data.py --profile-run {run_tag}")
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,339 @@
+#!/usr/bin/env python3
+"""
+Orchestrateur du pipeline complet : génération, ingestion (direct et snowpipe) et
+validation, modélisés comme un DAG de tâches par entité :
+
+    generate_products -> load_products -> validate_products
+    generate_sales    -> load_sales    -> validate_sales      (après setup_transactional)
+    ...
+
+Les branches indépendantes s'exécutent en parallèle dans la limite de --workers
+threads et de --connections connexions simultanées au sink. Une tâche en échec est
+relancée (--retries), ses descendants sont ignorés si elle échoue définitivement.
+Un résumé avec la durée de chaque tâche est écrit dans runs/.
+
+Une relance ne duplique pas de lignes : les chargements de référence passent par
+le mode upsert, et un chargement transactionnel (append) relancé repart de sa table
+vidée (reset de la tâche, exécuté avant chaque nouvelle tentative).
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import datetime
+import threading
+from dataclasses import dataclass, field
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from pathlib import Path
+from typing import Callable, List
+
+from dotenv import load_dotenv
+from sinks import create_sink, SINK_KINDS
+from snowflake_config import new_run_tag
+from table_schemas import TRANSACTIONAL_TABLES
+
+load_dotenv()
+
+REFERENCE_ENTITIES = ['products', 'customers', 'suppliers', 'stores', 'promotions']
+TRANSACTIONAL_ENTITIES = ['sales', 'returns', 'reviews', 'inventory']
+ENTITY_TABLES = {
+    **{entity: f"{entity.upper()}_DATA_SNOWPIPE" for entity in REFERENCE_ENTITIES},
+    **{entity: f"{entity.upper()}_DATA" for entity in TRANSACTIONAL_ENTITIES},
+}
+DEFAULT_SUMMARY_DIR = 'runs'
+
+
+@dataclass
+class Node:
+    name: str
+    action: Callable[[], object]
+    deps: List[str] = field(default_factory=list)
+    uses_connection: bool = False
+    # Exécuté avant chaque relance : efface ce qu'une tentative en échec a déjà écrit
+    reset: Callable[[], object] = None
+    status: str = 'pending'
+    attempts: int = 0
+    started: float = None
+    duration: float = None
+    result: object = None
+    error: str = None
+
+
+class Pipeline:
+    """DAG de tâches exécuté sous limites de workers et de connexions"""
+
+    def __init__(self, max_workers=4, max_connections=2, retries=1, retry_delay=2.0):
+        self.nodes = {}
+        self.max_workers = max_workers
+        self.connections = threading.BoundedSemaphore(max_connections)
+        self.retries = retries
+        self.retry_delay = retry_delay
+        self.started = None
+
+    def add(self, name, action, deps=None, uses_connection=False, reset=None):
+        deps = [dep for dep in (deps or []) if dep in self.nodes]
+        self.nodes[name] = Node(name, action, deps, uses_connection, reset)
+
+    @staticmethod
+    def _attempt(node, attempt):
+        if attempt > 1 and node.reset:
+            node.reset()
+        return node.action()
+
+    def _execute(self, node):
+        node.started = time.monotonic()
+        for attempt in range(1, self.retries + 2):
+            node.attempts = attempt
+            try:
+                if node.uses_connection:
+                    with self.connections:
+                        node.result = self._attempt(node, attempt)
+                else:
+                    node.result = self._attempt(node, attempt)
+                node.status = 'success'
+                break
+            except Exception as e:
+                node.error = f"{type(e).__name__}: {e}"
+                print(f"⚠️  {node.name}: tentative {attempt} en échec - {node.error}")
+                if attempt > self.retries:
+                    node.status = 'failed'
+                else:
+                    time.sleep(self.retry_delay * attempt)
+        node.duration = time.monotonic() - node.started
+        return node
+
+    def run(self):
+        self.started = time.monotonic()
+        running = {}
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='pipeline') as pool:
+            while True:
+                for node in self.nodes.values():
+                    if node.status != 'pending':
+                        continue
+                    dep_status = [self.nodes[dep].status for dep in node.deps]
+                    if any(status in ('failed', 'skipped') for status in dep_status):
+                        node.status = 'skipped'
+                        print(f"⏭️  {node.name}: ignorée (dépendance en échec)")
+                    elif all(status == 'success' for status in dep_status):
+                        node.status = 'running'
+                        print(f"▶️  {node.name}")
+                        running[pool.submit(self._execute, node)] = node
+
+                if not running:
+                    # Les skips d'un tour peuvent en débloquer d'autres
+                    if any(node.status == 'pending' for node in self.nodes.values()):
+                        continue
+                    break
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    node = running.pop(future)
+                    icon = '✅' if node.status == 'success' else '❌'
+                    print(f"{icon} {node.name} ({node.duration:.1f}s, {node.attempts} tentative(s))")
+        return all(node.status == 'success' for node in self.nodes.values())
+
+    def summary(self):
+        wall = time.monotonic() - self.started
+        busy = sum(node.duration or 0 for node in self.nodes.values())
+        return {
+            'wall_seconds': round(wall, 3),
+            'task_seconds': round(busy, 3),
+            'parallelism': round(busy / wall, 2) if wall else None,
+            'nodes': [{
+                'name': node.name,
+                'deps': node.deps,
+                'status': node.status,
+                'attempts': node.attempts,
+                'start_offset': round(node.started - self.started, 3) if node.started else None,
+                'seconds': round(node.duration, 3) if node.duration is not None else None,
+                'result': node.result if isinstance(node.result, (int, float, str, bool)) else None,
+                'error': node.error,
+            } for node in self.nodes.values()],
+        }
+
+
+# =================== TÂCHES ===================
+
+def generate_task(config_kwargs, entity):
+    def action():
+        from data_generator import DataGenerator, GenerationConfig
+
+        # Un générateur par tâche : Faker n'est pas partagé entre threads
+        config = GenerationConfig(**config_kwargs)
+        DataGenerator(config).generate_entity(entity)
+        return getattr(config, entity)
+    return action
+
+
+def setup_transactional_task(sink_kind, run_tag):
+    def action():
+        from ingester_direct import MultiTableIngester
+
+        ingester = MultiTableIngester(sink=create_sink(sink_kind, query_tag=run_tag))
+        try:
+            ingester.setup_tables()
+        finally:
+            ingester.sink.close()
+        return len(TRANSACTIONAL_TABLES)
+    return action
+
+
+def load_transactional_task(entity, path, batch_size, sink_kind, run_tag):
+    def action():
+        from ingester_direct import MultiTableIngester
+
+        ingester = MultiTableIngester(batch_size=batch_size, sink=create_sink(sink_kind, query_tag=run_tag))
+        try:
+            ingester.sink.use_context()
+            return getattr(ingester, f"ingest_{entity}_data")(path)
+        finally:
+            ingester.sink.close()
+    return action
+
+
+def reset_transactional_task(entity, sink_kind, run_tag):
+    """Avant une relance : table de l'entité recréée vide, comme après setup_transactional"""
+    def reset():
+        table_name = ENTITY_TABLES[entity]
+        sink = create_sink(sink_kind, query_tag=run_tag)
+        try:
+            sink.use_context()
+            sink.create_table(table_name, TRANSACTIONAL_TABLES[table_name], replace=True)
+        finally:
+            sink.close()
+        print(f"🧹 {table_name}: table vidée avant relance")
+    return reset
+
+
+def load_reference_task(entity, path, batch_size, sink_kind, run_tag):
+    def action():
+        from ingester_snowpipe import process_any_data_type, warehouse_sizing
+
+        # Une tâche par entité : politique INGEST_WAREHOUSE_POLICY appliquée au fichier de la tâche
+        with warehouse_sizing([path], entity, sink_kind, run_tag) as warehouse:
+            processed = process_any_data_type(path, entity, batch_size, sink_kind, run_tag, mode='upsert',
+                                              warehouse=warehouse)
+        if processed is None:
+            raise RuntimeError(f"chargement de {entity} en échec")
+        return processed
+    return action
+
+
+def validate_task(entity, path, sink_kind, run_tag):
+    def action():
+        from reconciliation import reconcile_table
+
+        sink = create_sink(sink_kind, query_tag=run_tag)
+        try:
+            sink.use_context()
+            result = reconcile_table(sink, ENTITY_TABLES[entity], path)
+        finally:
+            sink.close()
+        if not result['match']:
+            raise RuntimeError(f"{result['table']}: {result['local_rows']} lignes locales, "
+                               f"{result['table_rows']} en table, hash {result['local_hash']} != {result['table_hash']}")
+        return result['table_rows']
+    return action
+
+
+def build_pipeline(args, run_tag):
+    from data_generator import GenerationConfig
+
+    pipeline = Pipeline(args.workers, args.connections, args.retries)
+    data_dir = Path(args.data_dir)
+    config_kwargs = {entity: getattr(args, entity) for entity in REFERENCE_ENTITIES + TRANSACTIONAL_ENTITIES}
+    config_kwargs['output_dir'] = data_dir
+    # Comptes effectifs (suppliers est déduit de products s'il vaut 0)
+    config = GenerationConfig(**config_kwargs)
+    entities = [e for e in REFERENCE_ENTITIES + TRANSACTIONAL_ENTITIES if not args.entities or e in args.entities]
+
+    if any(entity in TRANSACTIONAL_ENTITIES for entity in entities):
+        pipeline.add('setup_transactional', setup_transactional_task(args.sink, run_tag), uses_connection=True)
+
+    for entity in entities:
+        path = str(data_dir / f"{entity}.json")
+        if not args.skip_generate:
+            if getattr(config, entity) == 0:
+                continue
+            pipeline.add(f"generate_{entity}", generate_task(config_kwargs, entity))
+        elif not os.path.exists(path):
+            print(f"⚠️  Fichier manquant: {path}")
+            continue
+
+        reset = None
+        if entity in TRANSACTIONAL_ENTITIES:
+            load = load_transactional_task(entity, path, args.batch_size, args.sink, run_tag)
+            # Mode append : une relance sur les lignes déjà commitées les dupliquerait
+            reset = reset_transactional_task(entity, args.sink, run_tag)
+            deps = [f"generate_{entity}", 'setup_transactional']
+        else:
+            load = load_reference_task(entity, path, args.reference_batch_size, args.sink, run_tag)
+            deps = [f"generate_{entity}"]
+        pipeline.add(f"load_{entity}", load, deps, uses_connection=True, reset=reset)
+
+        if not args.skip_validate:
+            pipeline.add(f"validate_{entity}", validate_task(entity, path, args.sink, run_tag),
+                         [f"load_{entity}"], uses_connection=True)
+    return pipeline
+
+
+def write_summary(pipeline, run_tag, summary_dir):
+    os.makedirs(summary_dir, exist_ok=True)
+    summary = {'run_tag': run_tag, 'created_at': datetime.datetime.now().isoformat(timespec='seconds'),
+               **pipeline.summary()}
+    path = os.path.join(summary_dir, f"pipeline_{run_tag}.json")
+    with open(path, 'w') as f:
+        json.dump(summary, f, indent=2)
+
+    print("\n📋 RÉSUMÉ DU PIPELINE")
+    print("=" * 60)
+    for node in summary['nodes']:
+        seconds = f"{node['seconds']:.1f}s" if node['seconds'] is not None else '-'
+        start = f"+{node['start_offset']:.1f}s" if node['start_offset'] is not None else ''
+        print(f"  {node['name']:<24} {node['status']:<8} {seconds:>8} {start:>8}  x{node['attempts']}")
+    print(f"\n⏱️  {summary['wall_seconds']:.1f}s au total, {summary['task_seconds']:.1f}s de tâches "
+          f"(parallélisme {summary['parallelism']})")
+    print(f"💾 Résumé: {path}")
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Pipeline complet génération -> ingestion -> validation (DAG par entité)')
+    parser.add_argument('--sales', type=int, default=0, help='Nombre de ventes à générer')
+    parser.add_argument('--products', type=int, default=0, help='Nombre de produits à générer')
+    parser.add_argument('--customers', type=int, default=0, help='Nombre de clients à générer')
+    parser.add_argument('--suppliers', type=int, default=0, help='Nombre de fournisseurs à générer')
+    parser.add_argument('--stores', type=int, default=0, help='Nombre de magasins à générer')
+    parser.add_argument('--promotions', type=int, default=10, help='Nombre de promotions à générer')
+    parser.add_argument('--returns', type=int, default=20, help='Nombre de retours à générer')
+    parser.add_argument('--reviews', type=int, default=50, help='Nombre d\'avis à générer')
+    parser.add_argument('--inventory', type=int, default=50, help='Nombre d\'inventaires à générer')
+    parser.add_argument('--entities', nargs='+', choices=REFERENCE_ENTITIES + TRANSACTIONAL_ENTITIES,
+                        help='Limiter le pipeline à ces entités')
+    parser.add_argument('--skip-generate', action='store_true', help='Utiliser les fichiers existants de --data-dir')
+    parser.add_argument('--skip-validate', action='store_true', help='Pas de réconciliation après chargement')
+    parser.add_argument('--data-dir', default='data', help='Répertoire des fichiers JSON')
+    parser.add_argument('--batch-size', type=int, default=10000, help='Batch des tables transactionnelles')
+    parser.add_argument('--reference-batch-size', type=int, default=2000, help='Batch des tables de référence')
+    parser.add_argument('--workers', type=int, default=4, help='Tâches exécutées en parallèle')
+    parser.add_argument('--connections', type=int, default=2, help='Connexions simultanées au sink')
+    parser.add_argument('--retries', type=int, default=1, help='Relances d\'une tâche en échec')
+    parser.add_argument('--sink', choices=SINK_KINDS, help='Destination (défaut: INGEST_SINK ou snowflake)')
+    parser.add_argument('--summary-dir', default=DEFAULT_SUMMARY_DIR, help='Répertoire des résumés de run')
+    args = parser.parse_args()
+
+    run_tag = new_run_tag('pipeline')
+    pipeline = build_pipeline(args, run_tag)
+    print(f"🧭 Pipeline {run_tag}: {len(pipeline.nodes)} tâches, {args.workers} workers, {args.connections} connexions")
+
+    ok = pipeline.run()
+    write_summary(pipeline, run_tag, args.summary_dir)
+    print(f"🏷️  Profil du run: python3 snowflake_check_data.py --profile-run {run_tag}")
+    if not ok:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,270 @@
+"""
+Mode pipe de l'ingester de référence : le client dépose les fichiers Parquet sur un
+stage persistant et notifie un loader de type Snowpipe, qui les charge de façon
+asynchrone. Le statut de chaque fichier est ensuite lu dans l'historique de chargement.
+
+Implémentations :
+    SnowflakePipeLoader : stage nommé + PIPE par table, notification par
+                          ALTER PIPE ... REFRESH (un par table), historique via COPY_HISTORY
+    LocalPipeLoader     : répertoire local comme stage, un thread charge les fichiers
+                          notifiés dans la base SQLite, historique dans un fichier JSON
+"""
+
+import os
+import json
+import time
+import queue
+import shutil
+import logging
+import threading
+
+PIPE_STAGE = 'REFERENCE_PIPE_STAGE'
+DEFAULT_STAGE_DIR = 'data/stage'
+
+# Statuts normalisés de l'historique de chargement
+PENDING = 'PENDING'
+LOADED = 'LOADED'
+FINAL_STATUSES = {LOADED, 'LOAD_FAILED', 'PARTIALLY_LOADED'}
+
+
+class PipeLoader:
+    """Interface d'un loader asynchrone alimenté par des listes de fichiers"""
+
+    poll_interval = 1.0
+
+    def stage_file(self, table_name, path):
+        """Déposer un fichier local sur le stage de la table, retourne son nom sur le stage"""
+        raise NotImplementedError
+
+    def notify(self, table_name, file_names):
+        """Signaler au loader des fichiers déposés, à charger dans table_name"""
+        raise NotImplementedError
+
+    def load_history(self, table_name, file_names):
+        """{fichier: {'status', 'rows', 'error'}} ; PENDING tant que le fichier n'est pas chargé"""
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class SnowflakePipeLoader(PipeLoader):
+    """Snowpipe : un PIPE par table sur un stage interne persistant"""
+
+    poll_interval = 5.0
+
+    def __init__(self, sf, stage_name=PIPE_STAGE, history_hours=24):
+        # sf : instance de snowflake_config.SnowflakeConnection
+        self.sf = sf
+        self.stage_name = stage_name
+        self.history_hours = history_hours
+        self.pipes = set()
+
+    def _ensure_pipe(self, table_name):
+        if table_name in self.pipes:
+            return
+        self.sf.execute_query(f"CREATE STAGE IF NOT EXISTS {self.stage_name}")
+        self.sf.execute_query(f"""
+            CREATE PIPE IF NOT EXISTS {table_name}_PIPE AS
+            COPY INTO {table_name}
+            FROM @{self.stage_name}/{table_name.lower()}/
+            FILE_FORMAT=(TYPE='PARQUET')
+            MATCH_BY_COLUMN_NAME=CASE_SENSITIVE
+        """)
+        self.pipes.add(table_name)
+
+    def stage_file(self, table_name, path):
+        self._ensure_pipe(table_name)
+        self.sf.execute_query(f"PUT 'file://{path}' @{self.stage_name}/{table_name.lower()}/ AUTO_COMPRESS=FALSE")
+        return os.path.basename(path)
+
+    def notify(self, table_name, file_names):
+        # Un seul REFRESH par table : il met en file d'attente tous les fichiers du préfixe
+        # @stage/<table>/ du pipe (sans PREFIX supplémentaire) ; ceux déjà chargés sont ignorés
+        # grâce aux métadonnées de chargement du pipe
+        self.sf.execute_query(f"ALTER PIPE {table_name}_PIPE REFRESH")
+        logging.info(f"Pipe {table_name}_PIPE notified: {len(file_names)} files")
+
+    def load_history(self, table_name, file_names):
+        rows = self.sf.execute_query(f"""
+            SELECT FILE_NAME, STATUS, ROW_COUNT, FIRST_ERROR_MESSAGE
+            FROM TABLE(information_schema.copy_history(
+                TABLE_NAME => '{table_name}',
+                START_TIME => DATEADD(hours, -{int(self.history_hours)}, CURRENT_TIMESTAMP())
+            ))
+            WHERE PIPE_NAME IS NOT NULL
+        """) or []
+        # FILE_NAME est relatif au stage : <table>/<fichier>
+        history = {os.path.basename(name): (status, row_count, error) for name, status, row_count, error in rows}
+        statuses = {}
+        for file_name in file_names:
+            if file_name not in history:
+                statuses[file_name] = {'status': PENDING, 'rows': 0, 'error': None}
+                continue
+            status, row_count, error = history[file_name]
+            # 'Loaded', 'Load failed', 'Partially loaded', 'Load in progress'
+            status = status.upper().replace(' ', '_')
+            statuses[file_name] = {
+                'status': status if status in FINAL_STATUSES else PENDING,
+                'rows': int(row_count or 0),
+                'error': error,
+            }
+        return statuses
+
+
+class LocalPipeLoader(PipeLoader):
+    """Stand-in local : stage = répertoire, loader = thread qui charge dans SQLite"""
+
+    poll_interval = 0.1
+
+    def __init__(self, sqlite_path, stage_dir=DEFAULT_STAGE_DIR):
+        self.sqlite_path = sqlite_path
+        self.stage_dir = stage_dir
+        self.history_path = os.path.join(stage_dir, 'load_history.json')
+        os.makedirs(stage_dir, exist_ok=True)
+
+        # Historique persistant : consultable par un autre process que celui qui a notifié
+        self.history = {}
+        if os.path.exists(self.history_path):
+            with open(self.history_path, 'r') as f:
+                self.history = json.load(f)
+
+        self.lock = threading.Lock()
+        self.pending = queue.Queue()
+        self.worker = threading.Thread(target=self._run, name='local-pipe', daemon=True)
+        self.worker.start()
+
+    def _table_dir(self, table_name):
+        return os.path.join(self.stage_dir, table_name.lower())
+
+    def stage_file(self, table_name, path):
+        os.makedirs(self._table_dir(table_name), exist_ok=True)
+        shutil.copy(path, self._table_dir(table_name))
+        return os.path.basename(path)
+
+    def notify(self, table_name, file_names):
+        for file_name in file_names:
+            self.pending.put((table_name, file_name))
+        logging.info(f"Local pipe for {table_name} notified: {len(file_names)} files")
+
+    def _record(self, table_name, file_name, entry):
+        with self.lock:
+            self.history[f"{table_name}/{file_name}"] = entry
+            with open(self.history_path, 'w') as f:
+                json.dump(self.history, f, indent=2)
+
+    def _run(self):
+        from sinks import SQLiteSink
+
+        # Une connexion sqlite3 ne se partage pas entre threads : le loader a la sienne
+        sink = SQLiteSink(self.sqlite_path)
+        try:
+            while True:
+                item = self.pending.get()
+                if item is None:
+                    break
+                table_name, file_name = item
+                path = os.path.join(self._table_dir(table_name), file_name)
+                with self.lock:
+                    loaded = (self.history.get(f"{table_name}/{file_name}") or {}).get('status') == LOADED
+                if loaded:
+                    # Comme Snowpipe, un fichier déjà chargé n'est pas rechargé s'il est notifié à nouveau
+                    logging.info(f"Local pipe for {table_name}: {file_name} already loaded, skipped")
+                    if os.path.exists(path):
+                        os.unlink(path)
+                    continue
+                try:
+                    rows = sink.load_staged_file(table_name, path)
+                except Exception as e:
+                    # Comme Snowpipe, un fichier en échec reste sur le stage
+                    self._record(table_name, file_name, {'status': 'LOAD_FAILED', 'rows': 0, 'error': str(e)})
+                else:
+                    os.unlink(path)
+                    self._record(table_name, file_name, {'status': LOADED, 'rows': rows, 'error': None})
+        finally:
+            sink.close()
+
+    def load_history(self, table_name, file_names):
+        with self.lock:
+            return {
+                file_name: dict(self.history.get(f"{table_name}/{file_name}")
+                                or {'status': PENDING, 'rows': 0, 'error': None})
+                for file_name in file_names
+            }
+
+    def close(self):
+        # Les fichiers déjà notifiés sont chargés avant l'arrêt du thread
+        self.pending.put(None)
+        self.worker.join()
+
+
+def create_pipe_loader(sink, stage_dir=None):
+    """Loader correspondant au sink : Snowpipe sur la même session, ou stand-in local"""
+    if sink.kind == 'snowflake':
+        return SnowflakePipeLoader(sink.sf)
+    if sink.kind == 'sqlite':
+        return LocalPipeLoader(sink.path, stage_dir or os.getenv('INGEST_STAGE_DIR') or DEFAULT_STAGE_DIR)
+    raise ValueError(f"Pas de loader pipe pour le sink '{sink.kind}'")
+
+
+class PipeFeed:
+    """Même rôle que sinks.CopyWindow, mais le chargement est délégué au pipe
+
+    submit dépose le fichier et l'ajoute à la prochaine notification (par listes de
+    files_per_notify fichiers). drain notifie le reste puis, si wait, suit le statut
+    de chaque fichier dans l'historique jusqu'à un statut final ou timeout secondes.
+    """
+
+    def __init__(self, loader, files_per_notify=10, wait=True, timeout=600):
+        self.loader = loader
+        self.files_per_notify = max(1, files_per_notify)
+        self.wait = wait
+        self.timeout = timeout
+        self.unnotified = []
+        self.files = {}  # table -> [(batch_number, fichier)]
+
+    def submit(self, table_name, path, batch_number):
+        file_name = self.loader.stage_file(table_name, path)
+        self.files.setdefault(table_name, []).append((batch_number, file_name))
+        self.unnotified.append((table_name, file_name))
+        if len(self.unnotified) >= self.files_per_notify:
+            self._notify()
+
+    def _notify(self):
+        by_table = {}
+        for table_name, file_name in self.unnotified:
+            by_table.setdefault(table_name, []).append(file_name)
+        for table_name, file_names in by_table.items():
+            self.loader.notify(table_name, file_names)
+        self.unnotified = []
+
+    def drain(self):
+        """Notifier les derniers fichiers ; retourne les lignes chargées (None si wait=False)"""
+        self._notify()
+        if not self.wait:
+            total = sum(len(files) for files in self.files.values())
+            print(f"📨 {total} fichiers notifiés au pipe (statut non attendu)")
+            return None
+
+        deadline = time.time() + self.timeout
+        rows_loaded = 0
+        failures = []
+        for table_name, files in self.files.items():
+            names = [file_name for _, file_name in files]
+            statuses = self.loader.load_history(table_name, names)
+            while any(s['status'] == PENDING for s in statuses.values()) and time.time() < deadline:
+                time.sleep(self.loader.poll_interval)
+                statuses = self.loader.load_history(table_name, names)
+
+            for batch_number, file_name in files:
+                entry = statuses[file_name]
+                rows_loaded += entry['rows']
+                if entry['status'] != LOADED:
+                    failures.append((batch_number, file_name, entry['status'], entry['error']))
+
+        if failures:
+            for batch_number, file_name, status, error in failures:
+                logging.error(f"Batch {batch_number} ({file_name}): {status} {error or ''}")
+            details = "; ".join(f"batch {number} {status}" for number, _, status, _ in failures)
+            raise RuntimeError(f"{len(failures)} fichier(s) non chargé(s) par le pipe - {details}")
+        return rows_loaded
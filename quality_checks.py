@@ -0,0 +1,227 @@
+"""
+Contrôles qualité vectorisés avant chargement.
+
+Chaque batch (table Arrow produite par transforms.transform_batch) est vérifié en
+colonnes : NOT NULL, plages de valeurs, valeurs autorisées et clés étrangères.
+Les clés étrangères sont testées contre des bitmaps sur la partie numérique des
+IDs (P2001 -> 2001 dans le bitmap du préfixe 'P'), construits une seule fois à
+partir des fichiers de référence.
+
+Les lignes en violation ne sont pas chargées : elles sont écrites dans
+quarantine/<TABLE>.json avec la liste des règles enfreintes, et comptées par règle.
+"""
+
+import os
+import re
+import json
+import datetime
+from collections import Counter
+from decimal import Decimal
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from table_schemas import ALL_TABLES
+
+DEFAULT_QUARANTINE_DIR = 'quarantine'
+
+# Colonnes obligatoires en plus de celles déclarées NOT NULL dans table_schemas.py
+NOT_NULL = {
+    'SALES_DATA': ['SALE_ID', 'SALE_DATE', 'CUSTOMER_ID', 'PRODUCT_ID', 'QUANTITY', 'TOTAL_AMOUNT'],
+    'RETURNS_DATA': ['RETURN_ID', 'SALE_ID', 'PRODUCT_ID', 'RETURN_DATE', 'REFUND_AMOUNT'],
+    'REVIEWS_DATA': ['REVIEW_ID', 'PRODUCT_ID', 'CUSTOMER_ID', 'RATING'],
+    'INVENTORY_DATA': ['INVENTORY_ID', 'PRODUCT_ID', 'STORE_ID'],
+}
+
+# (minimum, maximum) inclusifs, None = pas de borne
+RANGES = {
+    'SALES_DATA': {'QUANTITY': (1, None), 'UNIT_PRICE': (0, None), 'TOTAL_AMOUNT': (0, None)},
+    'RETURNS_DATA': {'REFUND_AMOUNT': (0, None)},
+    'REVIEWS_DATA': {'RATING': (1, 5), 'HELPFUL_VOTES': (0, None)},
+    'INVENTORY_DATA': {'CURRENT_STOCK': (0, None), 'RESERVED_STOCK': (0, None), 'REORDER_LEVEL': (0, None)},
+    'PRODUCTS_DATA_SNOWPIPE': {'PRICE': (0, None), 'COST': (0, None)},
+    'SUPPLIERS_DATA_SNOWPIPE': {'QUALITY_RATING': (0, 5), 'LEAD_TIME_DAYS': (0, None)},
+    'PROMOTIONS_DATA_SNOWPIPE': {'DISCOUNT_VALUE': (0, None)},
+}
+
+ENUMS = {
+    'SALES_DATA': {'CHANNEL': ['Online VIP', 'Boutique', 'Showroom privé', 'Téléphone']},
+    'RETURNS_DATA': {
+        'REASON': ['Defective', 'Wrong Size', 'Changed Mind', 'Damaged in Transit', 'Not as Described', 'Quality Issues'],
+        'CONDITION': ['New', 'Like New', 'Good', 'Fair', 'Poor'],
+        'REFUND_METHOD': ['Card Refund', 'Store Credit', 'Exchange'],
+        'STATUS': ['Pending', 'Approved', 'Rejected', 'Completed'],
+    },
+    'REVIEWS_DATA': {'STATUS': ['Published', 'Pending', 'Rejected']},
+}
+
+# Colonne -> entité de référence (fichier <entité>.json du répertoire de données)
+FOREIGN_KEYS = {
+    'SALES_DATA': {'CUSTOMER_ID': 'customers', 'PRODUCT_ID': 'products', 'STORE_ID': 'stores'},
+    'RETURNS_DATA': {'SALE_ID': 'sales', 'CUSTOMER_ID': 'customers', 'PRODUCT_ID': 'products'},
+    'REVIEWS_DATA': {'PRODUCT_ID': 'products', 'CUSTOMER_ID': 'customers'},
+    'INVENTORY_DATA': {'PRODUCT_ID': 'products', 'STORE_ID': 'stores'},
+    'PRODUCTS_DATA_SNOWPIPE': {'SUPPLIER_ID': 'suppliers'},
+}
+
+REFERENCE_ID_FIELDS = {
+    'customers': 'customer_id',
+    'products': 'product_id',
+    'stores': 'store_id',
+    'suppliers': 'supplier_id',
+    'sales': 'sale_id',
+}
+
+ID_PARTS = r'^(?P<prefix>[A-Za-z]*)(?P<number>\d+)$'
+
+
+class IdBitmap:
+    """Ensemble d'IDs « préfixe + nombre » : un bitmap de 1 bit par nombre et par préfixe"""
+
+    def __init__(self):
+        self.bitmaps = {}
+
+    @classmethod
+    def from_file(cls, path, field):
+        # Extraction par regex sur la ligne brute : pas de json.loads par record
+        extract = re.compile(rf'"{field}":\s*"([A-Za-z]*)(\d+)"')
+        numbers = {}
+        with open(path, 'r') as f:
+            for line in f:
+                match = extract.search(line)
+                if match:
+                    numbers.setdefault(match.group(1), []).append(int(match.group(2)))
+        ids = cls()
+        for prefix, values in numbers.items():
+            values = np.asarray(values, dtype=np.int64)
+            bits = np.zeros(int(values.max()) + 1, dtype=bool)
+            bits[values] = True
+            ids.bitmaps[prefix] = np.packbits(bits, bitorder='little')
+        return ids
+
+    def contains(self, column):
+        """Masque booléen (numpy) : True si l'ID existe ; NULL compte comme présent"""
+        result = np.zeros(len(column), dtype=bool)
+        parts = pc.extract_regex(pc.cast(column, pa.string()), ID_PARTS)
+        prefixes = pc.struct_field(parts, 'prefix')
+        numbers = pc.cast(pc.struct_field(parts, 'number'), pa.int64())
+        for prefix, packed in self.bitmaps.items():
+            selected = pc.fill_null(pc.equal(prefixes, prefix), False).to_numpy(zero_copy_only=False)
+            if not selected.any():
+                continue
+            values = numbers.to_numpy(zero_copy_only=False)[selected].astype(np.int64)
+            inside = values < len(packed) * 8
+            found = np.zeros(len(values), dtype=bool)
+            hits = values[inside]
+            found[inside] = (packed[hits >> 3] >> (hits & 7)) & 1 == 1
+            result[np.flatnonzero(selected)] = found
+        return result | pc.is_null(column).to_numpy(zero_copy_only=False)
+
+
+_reference_ids = {}
+
+
+def reference_ids(entity, data_dir='data'):
+    """Bitmap des IDs d'une entité de référence, construit une fois par process"""
+    key = (entity, data_dir)
+    if key not in _reference_ids:
+        path = os.path.join(data_dir, f"{entity}.json")
+        _reference_ids[key] = IdBitmap.from_file(path, REFERENCE_ID_FIELDS[entity]) if os.path.exists(path) else None
+    return _reference_ids[key]
+
+
+def _json_value(value):
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, (datetime.date, datetime.datetime)):
+        return value.isoformat()
+    return value
+
+
+class BatchValidator:
+    """Applique les règles d'une table à chaque batch et met les violations en quarantaine"""
+
+    def __init__(self, table_name, data_dir='data', quarantine_dir=DEFAULT_QUARANTINE_DIR):
+        self.table_name = table_name
+        self.quarantine_path = os.path.join(quarantine_dir, f"{table_name}.json")
+        self.counts = Counter()
+        self.checked = 0
+        self.quarantined = 0
+
+        declared = [name for name, col_type in ALL_TABLES[table_name] if 'NOT NULL' in col_type.upper()]
+        self.not_null = list(dict.fromkeys(declared + NOT_NULL.get(table_name, [])))
+        self.ranges = RANGES.get(table_name, {})
+        self.enums = {column: pa.array(values) for column, values in ENUMS.get(table_name, {}).items()}
+        self.foreign_keys = {}
+        for column, entity in FOREIGN_KEYS.get(table_name, {}).items():
+            ids = reference_ids(entity, data_dir)
+            if ids is None:
+                print(f"⚠️  {table_name}.{column}: fichier de référence {entity}.json absent, clé étrangère non vérifiée")
+            else:
+                self.foreign_keys[column] = (entity, ids)
+
+        os.makedirs(quarantine_dir, exist_ok=True)
+        open(self.quarantine_path, 'w').close()
+
+    def _violations(self, table):
+        """[(règle, masque numpy des lignes en violation)]"""
+        violations = []
+        names = set(table.column_names)
+        for column in self.not_null:
+            if column in names:
+                violations.append((f"{column} NOT NULL", pc.is_null(table[column]).to_numpy(zero_copy_only=False)))
+        for column, (low, high) in self.ranges.items():
+            if column not in names:
+                continue
+            values = table[column]
+            if pa.types.is_decimal(values.type):
+                values = pc.cast(values, pa.float64())
+            bad = pa.array([False] * len(table))
+            if low is not None:
+                bad = pc.or_(bad, pc.less(values, low))
+            if high is not None:
+                bad = pc.or_(bad, pc.greater(values, high))
+            bounds = f"[{low if low is not None else '-inf'}, {high if high is not None else '+inf'}]"
+            violations.append((f"{column} hors {bounds}", pc.fill_null(bad, False).to_numpy(zero_copy_only=False)))
+        for column, allowed in self.enums.items():
+            if column in names:
+                bad = pc.invert(pc.is_in(table[column], value_set=allowed, skip_nulls=True))
+                violations.append((f"{column} valeur inconnue", pc.fill_null(bad, False).to_numpy(zero_copy_only=False)))
+        for column, (entity, ids) in self.foreign_keys.items():
+            if column in names:
+                violations.append((f"{column} absent de {entity}", ~ids.contains(table[column])))
+        return violations
+
+    def filter(self, table):
+        """Table des lignes valides ; les autres partent en quarantaine"""
+        self.checked += len(table)
+        violations = self._violations(table)
+        if not violations:
+            return table
+        invalid = np.logical_or.reduce([mask for _, mask in violations])
+        if not invalid.any():
+            return table
+
+        rows = np.flatnonzero(invalid)
+        for rule, mask in violations:
+            if mask.any():
+                self.counts[rule] += int(mask.sum())
+        self.quarantined += len(rows)
+
+        # Seules les lignes rejetées repassent en Python
+        rejected = table.take(pa.array(rows)).to_pylist()
+        with open(self.quarantine_path, 'a') as f:
+            for row, index in zip(rejected, rows):
+                row = {column: _json_value(value) for column, value in row.items()}
+                row['_violations'] = [rule for rule, mask in violations if mask[index]]
+                f.write(json.dumps(row, ensure_ascii=False) + '\n')
+        return table.filter(pa.array(~invalid))
+
+    def report(self):
+        if not self.quarantined:
+            print(f"🛡️  {self.table_name}: {self.checked} lignes contrôlées, aucune violation")
+            return
+        print(f"🛡️  {self.table_name}: {self.quarantined}/{self.checked} lignes en quarantaine -> {self.quarantine_path}")
+        for rule, count in self.counts.most_common():
+            print(f"     {rule}: {count}")
@@ -0,0 +1,348 @@
+"""
+Réconciliation par hash entre les fichiers d'entrée data/*.json et les tables chargées.
+
+Pour chaque table on calcule, sur les colonnes projetées, un nombre de lignes et
+une empreinte indépendante de l'ordre : la somme des hash MD5 (64 bits) de chaque
+ligne canonisée. Le calcul est fait en une passe en streaming côté local (batches
+Arrow du lecteur des ingesters, canonisation vectorisée) et par une seule
+agrégation côté serveur ; seules ces deux valeurs transitent.
+
+En cas d'écart, la bissection par plage de clé (partie numérique de l'ID,
+ex. S100001 -> 100001) localise les lignes divergentes sans rapatrier la table :
+seules les plages fautives de `bucket_width` clés sont comparées ligne à ligne.
+"""
+
+import os
+import re
+import hashlib
+from collections import Counter, defaultdict
+from decimal import Decimal, ROUND_HALF_UP
+
+from table_schemas import ALL_TABLES, insert_columns, type_info
+
+SOURCE_FILES = {
+    'SALES_DATA': 'sales.json',
+    'RETURNS_DATA': 'returns.json',
+    'REVIEWS_DATA': 'reviews.json',
+    'INVENTORY_DATA': 'inventory.json',
+    'PRODUCTS_DATA_SNOWPIPE': 'products.json',
+    'CUSTOMERS_DATA_SNOWPIPE': 'customers.json',
+    'SUPPLIERS_DATA_SNOWPIPE': 'suppliers.json',
+    'STORES_DATA_SNOWPIPE': 'stores.json',
+    'PROMOTIONS_DATA_SNOWPIPE': 'promotions.json',
+}
+
+NULL_TOKEN = '<NULL>'
+SEPARATOR = '\x1f'
+KEY_NUMBER = re.compile(r'(\d+)$')
+LOCAL_BATCH_SIZE = 10000
+
+
+def canonical_value(value, col_type):
+    """Représentation texte d'une valeur, identique à celle produite par le SQL serveur"""
+    if value is None:
+        return NULL_TOKEN
+    family, _, scale = type_info(col_type)
+    if family == 'bool':
+        return 'true' if value else 'false'
+    if family == 'decimal':
+        return str(Decimal(str(value)).quantize(Decimal(1).scaleb(-scale), rounding=ROUND_HALF_UP))
+    if family == 'int':
+        return str(int(value))
+    if family == 'date':
+        return value.isoformat() if hasattr(value, 'isoformat') else str(value)[:10]
+    return str(value)
+
+
+def row_hash(values, col_types):
+    """Hash 64 bits d'une ligne canonisée (16 premiers caractères hexa du MD5)"""
+    canonical = SEPARATOR.join(canonical_value(v, t) for v, t in zip(values, col_types))
+    return int(hashlib.md5(canonical.encode('utf-8')).hexdigest()[:16], 16)
+
+
+def _canonical_column(column, col_type):
+    """Colonne Arrow -> chaînes canonisées (canonical_value), par kernels pyarrow.compute
+
+    Les types Arrow produits par l'ingestion (arrow_schemas.py) se castent directement au
+    format canonique ; tout autre type repasse par canonical_value, valeur par valeur.
+    """
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    family, _, scale = type_info(col_type)
+    kind = column.type
+    if ((family == 'bool' and pa.types.is_boolean(kind))
+            or (family == 'decimal' and pa.types.is_decimal(kind) and kind.scale == scale)
+            or (family == 'int' and pa.types.is_integer(kind))
+            or (family == 'date' and pa.types.is_date(kind))):
+        return pc.cast(column, pa.string())
+    if family == 'date' and pa.types.is_string(kind):
+        return pc.utf8_slice_codeunits(column, 0, 10)
+    if family == 'text' and pa.types.is_string(kind):
+        return column
+    return pa.array([None if value is None else canonical_value(value, col_type)
+                     for value in column.to_pylist()], pa.string())
+
+
+def batch_hashes(table, col_types):
+    """row_hash de chaque ligne d'une table Arrow : canonisation et concaténation vectorisées,
+    seul le MD5 de la ligne concaténée reste par ligne"""
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    if table.num_rows == 0:
+        return []
+    parts = [pc.fill_null(_canonical_column(column, col_type), NULL_TOKEN)
+             for column, col_type in zip(table.columns, col_types)]
+    joined = pc.cast(pc.binary_join_element_wise(*parts, SEPARATOR), pa.binary())
+    md5 = hashlib.md5
+    return [int.from_bytes(md5(line).digest()[:8], 'big') for line in joined.to_pylist()]
+
+
+def key_number(key):
+    match = KEY_NUMBER.search(str(key)) if key is not None else None
+    return int(match.group(1)) if match else None
+
+
+def _column_types(table_name, columns):
+    types = dict(ALL_TABLES[table_name])
+    return [types[column] for column in columns]
+
+
+# =================== CÔTÉ LOCAL ===================
+
+def _local_batches(path, table_name, columns):
+    """(numéro de clé, clé, hash) par batch, lus par le lecteur Arrow des ingesters
+
+    Les fichiers sont normalisés par transforms.py exactement comme au chargement :
+    champs alternatifs, adresses mises en forme et types cibles sont ceux de l'ingestion.
+    """
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    from transforms import read_batches
+
+    col_types = _column_types(table_name, columns)
+    for table in read_batches(path, table_name, columns, LOCAL_BATCH_SIZE):
+        keys = table.column(0)
+        # Même extraction que key_number (KEY_NUMBER), sur toute la colonne
+        digits = pc.extract_regex(pc.cast(keys, pa.string()), r'(?P<number>\d+)$')
+        numbers = pc.cast(pc.struct_field(digits, [0]), pa.int64())
+        yield numbers.to_pylist(), keys.to_pylist(), batch_hashes(table, col_types)
+
+
+def fingerprint_local(path, table_name, columns, bucket_width):
+    """Une passe en streaming : {bucket: [lignes, somme des hash]} (bucket None si clé non numérique)"""
+    buckets = defaultdict(lambda: [0, 0])
+    for numbers, _, hashes in _local_batches(path, table_name, columns):
+        for number, digest in zip(numbers, hashes):
+            bucket = buckets[number // bucket_width if number is not None else None]
+            bucket[0] += 1
+            bucket[1] += digest
+    return buckets
+
+
+def row_hashes_local(path, table_name, columns, bucket_width, wanted_buckets):
+    """Multiset (clé, hash) des lignes locales appartenant aux buckets demandés"""
+    rows = Counter()
+    for numbers, keys, hashes in _local_batches(path, table_name, columns):
+        for number, key, digest in zip(numbers, keys, hashes):
+            if number is not None and number // bucket_width in wanted_buckets:
+                rows[(key, digest)] += 1
+    return rows
+
+
+# =================== CÔTÉ SERVEUR ===================
+
+def _snowflake_value_expr(column, col_type):
+    family, precision, scale = type_info(col_type)
+    if family == 'bool':
+        expr = f"IFF({column}, 'true', 'false')"
+    elif family == 'decimal':
+        expr = f"TO_VARCHAR({column}, 'FM{'9' * max(precision - scale - 1, 0)}0.{'0' * scale}')"
+    elif family == 'int':
+        expr = f"TO_VARCHAR({column})"
+    elif family == 'date':
+        expr = f"TO_VARCHAR({column}, 'YYYY-MM-DD')"
+    else:
+        expr = column
+    return f"COALESCE({expr}, '{NULL_TOKEN}')"
+
+
+def _snowflake_hashed_rows(table_name, columns):
+    col_types = _column_types(table_name, columns)
+    parts = ", ".join(_snowflake_value_expr(c, t) for c, t in zip(columns, col_types))
+    return f"""
+        SELECT {columns[0]} AS k,
+               TRY_TO_NUMBER(REGEXP_SUBSTR({columns[0]}, '[0-9]+$')) AS kn,
+               TO_NUMBER(SUBSTR(MD5(CONCAT_WS(CHR(31), {parts})), 1, 16), 'XXXXXXXXXXXXXXXX') AS h
+        FROM {table_name}
+    """
+
+
+def _range_filter(lo, hi):
+    return "" if lo is None else f"WHERE kn BETWEEN {int(lo)} AND {int(hi)}"
+
+
+def _register_sqlite_functions(sink, table_name, columns):
+    """Les fonctions de hash SQLite sont celles du côté local : canonisation identique par construction"""
+    col_types = _column_types(table_name, columns)
+
+    class HashSum:
+        def __init__(self):
+            self.total = 0
+
+        def step(self, *values):
+            self.total += row_hash(values, col_types)
+
+        def finalize(self):
+            # Les entiers SQLite sont limités à 64 bits : la somme repasse en texte
+            return str(self.total)
+
+    sink.connection.create_function('reconcile_key_number', 1, key_number, deterministic=True)
+    sink.connection.create_function(
+        'reconcile_row_hash', len(columns),
+        lambda *values: str(row_hash(values, col_types)), deterministic=True
+    )
+    sink.connection.create_aggregate('reconcile_hash_sum', len(columns), HashSum)
+
+
+def fingerprint_server(sink, table_name, columns, lo=None, hi=None):
+    """(lignes, somme des hash, min clé, max clé) calculés par une seule agrégation serveur"""
+    if sink.kind == 'sqlite':
+        _register_sqlite_functions(sink, table_name, columns)
+        where = "" if lo is None else f"WHERE reconcile_key_number({columns[0]}) BETWEEN {int(lo)} AND {int(hi)}"
+        row = sink.query(f"""
+            SELECT COUNT(*), reconcile_hash_sum({', '.join(columns)}),
+                   MIN(reconcile_key_number({columns[0]})), MAX(reconcile_key_number({columns[0]}))
+            FROM {table_name} {where}
+        """)[0]
+    else:
+        row = sink.query(f"""
+            SELECT COUNT(*), SUM(h), MIN(kn), MAX(kn)
+            FROM ({_snowflake_hashed_rows(table_name, columns)}) {_range_filter(lo, hi)}
+        """)[0]
+    count, total, min_key, max_key = row
+    return int(count), int(total or 0), min_key, max_key
+
+
+def row_hashes_server(sink, table_name, columns, lo, hi):
+    """Multiset (clé, hash) des lignes serveur dont la clé est dans [lo, hi]"""
+    if sink.kind == 'sqlite':
+        _register_sqlite_functions(sink, table_name, columns)
+        rows = sink.query(f"""
+            SELECT {columns[0]}, reconcile_row_hash({', '.join(columns)})
+            FROM {table_name}
+            WHERE reconcile_key_number({columns[0]}) BETWEEN {int(lo)} AND {int(hi)}
+        """)
+    else:
+        rows = sink.query(f"""
+            SELECT k, h FROM ({_snowflake_hashed_rows(table_name, columns)}) {_range_filter(lo, hi)}
+        """)
+    return Counter((key, int(h)) for key, h in rows)
+
+
+# =================== RÉCONCILIATION ===================
+
+def _bisect(sink, table_name, columns, local_buckets, bucket_width, lo_bucket, hi_bucket, max_leaves):
+    """Buckets divergents dans [lo_bucket, hi_bucket], en coupant la plage en deux tant qu'elle diffère"""
+    count, total, _, _ = fingerprint_server(
+        sink, table_name, columns, lo_bucket * bucket_width, (hi_bucket + 1) * bucket_width - 1
+    )
+    local = [0, 0]
+    for bucket, (bucket_count, bucket_total) in local_buckets.items():
+        if bucket is not None and lo_bucket <= bucket <= hi_bucket:
+            local[0] += bucket_count
+            local[1] += bucket_total
+    if (count, total) == tuple(local):
+        return []
+    if lo_bucket == hi_bucket:
+        return [lo_bucket]
+
+    middle = (lo_bucket + hi_bucket) // 2
+    leaves = _bisect(sink, table_name, columns, local_buckets, bucket_width, lo_bucket, middle, max_leaves)
+    if len(leaves) < max_leaves:
+        leaves += _bisect(sink, table_name, columns, local_buckets, bucket_width, middle + 1, hi_bucket, max_leaves)
+    return leaves[:max_leaves]
+
+
+def reconcile_table(sink, table_name, path, columns=None, bisect=False, bucket_width=1024, max_leaves=20):
+    """Comparer un fichier local et une table ; avec bisect, localiser les lignes divergentes"""
+    columns = columns or insert_columns(table_name)
+    local_buckets = fingerprint_local(path, table_name, columns, bucket_width)
+    local_count = sum(bucket[0] for bucket in local_buckets.values())
+    local_total = sum(bucket[1] for bucket in local_buckets.values())
+    server_count, server_total, min_key, max_key = fingerprint_server(sink, table_name, columns)
+
+    result = {
+        'table': table_name,
+        'columns': columns,
+        'local_rows': local_count,
+        'table_rows': server_count,
+        'local_hash': f"{local_total % 2 ** 64:016x}",
+        'table_hash': f"{server_total % 2 ** 64:016x}",
+        'match': (local_count, local_total) == (server_count, server_total),
+    }
+    if result['match'] or not bisect:
+        return result
+
+    numbered = [bucket for bucket in local_buckets if bucket is not None]
+    if min_key is not None:
+        numbered += [int(min_key) // bucket_width, int(max_key) // bucket_width]
+    if not numbered:
+        return result
+    leaves = _bisect(sink, table_name, columns, local_buckets, bucket_width,
+                     min(numbered), max(numbered), max_leaves)
+
+    local_rows = row_hashes_local(path, table_name, columns, bucket_width, set(leaves))
+    server_rows = Counter()
+    for leaf in leaves:
+        server_rows += row_hashes_server(
+            sink, table_name, columns, leaf * bucket_width, (leaf + 1) * bucket_width - 1
+        )
+    missing = local_rows - server_rows
+    extra = server_rows - local_rows
+    changed = {key for key, _ in missing} & {key for key, _ in extra}
+    result['diff'] = {
+        'ranges': [(leaf * bucket_width, (leaf + 1) * bucket_width - 1) for leaf in leaves],
+        'missing_in_table': sorted({key for key, _ in missing} - changed),
+        'unexpected_in_table': sorted({key for key, _ in extra} - changed),
+        'different': sorted(changed),
+    }
+    return result
+
+
+def reconcile(sink, tables=None, data_dir='data', columns=None, bisect=False, bucket_width=1024):
+    """Réconcilier toutes les tables dont le fichier source existe et afficher le rapport"""
+    print("🧮 RÉCONCILIATION FICHIERS LOCAUX / TABLES")
+    print("="*60)
+
+    results = []
+    for table_name in tables or SOURCE_FILES:
+        path = os.path.join(data_dir, SOURCE_FILES[table_name])
+        if not os.path.exists(path):
+            print(f"  ⏭️  {table_name}: fichier manquant {path}")
+            continue
+        try:
+            result = reconcile_table(sink, table_name, path, columns, bisect, bucket_width)
+        except Exception as table_error:
+            print(f"  ⚠️  {table_name}: ERREUR - {table_error}")
+            continue
+        results.append(result)
+
+        if result['match']:
+            print(f"  ✅ {table_name}: {result['table_rows']} lignes, hash {result['table_hash']}")
+            continue
+        print(f"  ❌ {table_name}: local {result['local_rows']} lignes / {result['local_hash']} "
+              f"≠ table {result['table_rows']} lignes / {result['table_hash']}")
+        diff = result.get('diff')
+        if diff:
+            print(f"     Plages divergentes: {len(diff['ranges'])}")
+            for label, keys in [('Absentes de la table', diff['missing_in_table']),
+                                ('En trop dans la table', diff['unexpected_in_table']),
+                                ('Différentes', diff['different'])]:
+                if keys:
+                    print(f"     {label}: {len(keys)} ({', '.join(map(str, keys[:10]))}{', ...' if len(keys) > 10 else ''})")
+
+    matching = sum(1 for result in results if result['match'])
+    print(f"\n📋 {matching}/{len(results)} tables identiques")
+    return results
@@ -0,0 +1,94 @@
+"""
+Rechargements complets atomiques : table fantôme puis échange.
+
+Au lieu de CREATE OR REPLACE sur la table lue par les utilisateurs, un rechargement
+complet remplit <TABLE>_SHADOW. Une fois le nombre de lignes validé, la table
+fantôme prend la place de la table en un seul échange (ALTER TABLE ... SWAP WITH
+sur Snowflake, renommages dans une transaction sur SQLite) : les lecteurs voient
+toujours une table complète, l'ancienne ou la nouvelle.
+
+L'ancienne version est conservée sous <TABLE>__V<horodatage> (les keep_versions
+plus récentes) pour pouvoir revenir en arrière avec rollback().
+"""
+
+import datetime
+
+SHADOW_SUFFIX = '_SHADOW'
+VERSION_MARKER = '__V'
+DEFAULT_KEEP_VERSIONS = 2
+# Une table rechargée avec moins de la moitié des lignes en place n'est pas publiée
+DEFAULT_MIN_RATIO = 0.5
+
+
+def shadow_name(table_name):
+    return f"{table_name}{SHADOW_SUFFIX}"
+
+
+def versions(sink, table_name):
+    """Anciennes versions conservées, de la plus ancienne à la plus récente"""
+    return sink.list_tables(f"{table_name}{VERSION_MARKER}")
+
+
+def _version_name(sink, table_name):
+    name = f"{table_name}{VERSION_MARKER}{datetime.datetime.now():%Y%m%d%H%M%S}"
+    # Deux publications dans la même seconde : suffixe pour ne pas écraser la précédente
+    existing = set(versions(sink, table_name))
+    candidate, n = name, 1
+    while candidate in existing:
+        candidate, n = f"{name}_{n}", n + 1
+    return candidate
+
+
+def validate(sink, table_name, expected_rows, min_ratio=DEFAULT_MIN_RATIO):
+    """Vérifier la table fantôme avant échange ; retourne (lignes fantôme, lignes en place)"""
+    shadow = shadow_name(table_name)
+    shadow_rows = sink.row_count(shadow)
+    if shadow_rows != expected_rows:
+        raise RuntimeError(f"{shadow}: {shadow_rows} lignes chargées, {expected_rows} attendues")
+    live_rows = sink.row_count(table_name)
+    if min_ratio and live_rows and shadow_rows < min_ratio * live_rows:
+        raise RuntimeError(f"{shadow}: {shadow_rows} lignes contre {live_rows} en place "
+                           f"(moins de {min_ratio:.0%}), rechargement non publié")
+    return shadow_rows, live_rows
+
+
+def publish(sink, table_name, expected_rows, keep_versions=DEFAULT_KEEP_VERSIONS, min_ratio=DEFAULT_MIN_RATIO):
+    """Valider puis échanger la table fantôme avec la table en place
+
+    L'ancienne version est renommée <TABLE>__V<horodatage> ; au-delà de keep_versions,
+    les plus anciennes sont supprimées. Retourne le nom de la version conservée (ou None).
+    """
+    shadow_rows, live_rows = validate(sink, table_name, expected_rows, min_ratio)
+    sink.swap_tables(table_name, shadow_name(table_name))
+    # La table fantôme contient maintenant l'ancienne version
+    kept = None
+    if keep_versions > 0:
+        kept = _version_name(sink, table_name)
+        sink.rename_table(shadow_name(table_name), kept)
+    else:
+        sink.drop_table(shadow_name(table_name))
+    for old in versions(sink, table_name)[:-keep_versions or None]:
+        sink.drop_table(old)
+    print(f"🔀 {table_name}: {shadow_rows} lignes publiées (remplace {live_rows})"
+          + (f", ancienne version -> {kept}" if kept else ""))
+    return kept
+
+
+def discard(sink, table_name):
+    """Abandonner un rechargement : la table en place n'a pas été touchée"""
+    sink.drop_table(shadow_name(table_name))
+
+
+def rollback(sink, table_name):
+    """Remettre en place la version conservée la plus récente
+
+    Échange et non copie : la version retirée prend la place de l'ancienne, un
+    second rollback annule donc le premier.
+    """
+    kept = versions(sink, table_name)
+    if not kept:
+        raise RuntimeError(f"{table_name}: aucune version conservée")
+    sink.swap_tables(table_name, kept[-1])
+    print(f"⏪ {table_name}: version {kept[-1]} remise en place "
+          f"({sink.row_count(table_name)} lignes, la version retirée est conservée sous ce nom)")
+    return kept[-1]
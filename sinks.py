@@ -0,0 +1,547 @@
+"""
+Destinations d'ingestion (sinks) : Snowflake ou base SQLite locale.
+
+Les ingesters ne parlent plus directement à snowflake.connector : ils passent
+par un sink qui sait créer une table, ajouter des lignes, charger un fichier
+Parquet déposé localement et compter les lignes d'une table.
+
+Sélection par configuration :
+    INGEST_SINK=snowflake|sqlite      (défaut: snowflake)
+    INGEST_SQLITE_PATH=data/ingest.db (fichier utilisé par le sink sqlite)
+    INGEST_BINDING=client|server      (INSERT Snowflake: SQL rendu ou array binding)
+    INGEST_COMMIT_EVERY=N             (binding server: N batches par transaction)
+"""
+
+import os
+import time
+import uuid
+import logging
+import sqlite3
+import datetime
+from collections import deque
+from decimal import Decimal
+
+import tracing
+
+SINK_KINDS = ['snowflake', 'sqlite']
+DEFAULT_SQLITE_PATH = 'data/ingest.db'
+# Ordre de chargement des lignes d'une table de staging Snowflake (fichier du batch, ligne dans le fichier)
+LOAD_ORDER_COLUMNS = [('_LOAD_FILE', 'VARCHAR'), ('_LOAD_ROW', 'NUMBER')]
+
+
+class IngestionSink:
+    """Interface commune à toutes les destinations d'ingestion"""
+
+    kind = None
+
+    def use_context(self, role='INGEST', warehouse='INGEST', database='INGEST', schema='INGEST'):
+        """Positionner le contexte de session (sans effet hors Snowflake)"""
+
+    def create_table(self, table_name, columns, primary_key=None, replace=False, cluster_by=None):
+        """Créer une table à partir d'une liste (colonne, type Snowflake)
+
+        cluster_by : clé de clustering déclarée dans le DDL (ignorée hors Snowflake)
+        """
+        raise NotImplementedError
+
+    def append_rows(self, table_name, columns, rows):
+        """Ajouter un lot de tuples, retourne le nombre de lignes insérées"""
+        raise NotImplementedError
+
+    def load_staged_file(self, table_name, path):
+        """Charger un fichier Parquet local dans une table, retourne le nombre de lignes chargées"""
+        raise NotImplementedError
+
+    def submit_staged_file(self, table_name, path):
+        """Lancer le chargement d'un fichier Parquet sans attendre sa fin, retourne un handle
+
+        Le fichier local peut être supprimé dès le retour. Par défaut le chargement
+        est synchrone et le handle est directement le nombre de lignes chargées.
+        """
+        with tracing.span('COPY'):
+            return self.load_staged_file(table_name, path)
+
+    def wait_staged_file(self, handle):
+        """Attendre un chargement lancé par submit_staged_file, retourne les lignes chargées"""
+        return handle
+
+    def row_count(self, table_name):
+        raise NotImplementedError
+
+    def query(self, sql, params=None):
+        """Exécuter une requête de lecture et retourner toutes les lignes"""
+        raise NotImplementedError
+
+    def create_staging_table(self, staging_name, like_table):
+        """Créer (ou recréer vide) une table de staging de même structure que like_table"""
+        raise NotImplementedError
+
+    def merge_table(self, source_table, target_table, key_columns, columns):
+        """Appliquer source_table à target_table en un seul MERGE ensembliste sur key_columns
+
+        Les lignes inchangées ne sont pas réécrites ; une clé répétée dans source_table
+        prend la valeur de sa dernière occurrence chargée. Retourne (insérées, mises à jour).
+        """
+        raise NotImplementedError
+
+    def delete_matching(self, source_table, target_table, key_columns):
+        """Supprimer de target_table les lignes dont la clé figure dans source_table ; retourne le nombre supprimé"""
+        raise NotImplementedError
+
+    def merge_additive(self, source_table, target_table, key_columns, sum_columns):
+        """Ajouter les compteurs de source_table à ceux de target_table (clés comparées NULL-safe)
+
+        Une clé existante voit ses sum_columns incrémentées, une clé nouvelle est insérée.
+        Retourne (insérées, mises à jour).
+        """
+        raise NotImplementedError
+
+    def swap_tables(self, table_name, other_name):
+        """Échanger atomiquement le contenu de deux tables existantes (les lecteurs voient l'une ou l'autre)"""
+        raise NotImplementedError
+
+    def rename_table(self, table_name, new_name):
+        raise NotImplementedError
+
+    def list_tables(self, prefix):
+        """Noms des tables du schéma courant commençant par prefix"""
+        raise NotImplementedError
+
+    def drop_table(self, table_name):
+        raise NotImplementedError
+
+    def rollback(self):
+        """Annuler les écritures non encore validées (chargement en échec)"""
+        pass
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if exc_type is not None:
+            self.rollback()
+        self.close()
+
+
+class SnowflakeSink(IngestionSink):
+    """Comportement historique : INSERT executemany et PUT + COPY INTO"""
+
+    kind = 'snowflake'
+
+    def __init__(self, sf, poll_interval=0.2):
+        # sf : instance de snowflake_config.SnowflakeConnection
+        self.sf = sf
+        self.poll_interval = poll_interval
+        self.stage_name = None
+        self.staging_tables = set()
+
+    def use_context(self, role='INGEST', warehouse='INGEST', database='INGEST', schema='INGEST'):
+        self.sf.execute_query(f"USE ROLE {role}")
+        self.sf.execute_query(f"USE WAREHOUSE {warehouse}")
+        self.sf.execute_query(f"USE DATABASE {database}")
+        self.sf.execute_query(f"USE SCHEMA {schema}")
+
+    def create_table(self, table_name, columns, primary_key=None, replace=False, cluster_by=None):
+        definitions = [f"{name} {col_type}" for name, col_type in columns]
+        if primary_key:
+            definitions.append(f"PRIMARY KEY ({', '.join(primary_key)})")
+        create = "CREATE OR REPLACE TABLE" if replace else "CREATE TABLE IF NOT EXISTS"
+        body = ",\n            ".join(definitions)
+        cluster = f" CLUSTER BY ({', '.join(cluster_by)})" if cluster_by else ""
+        self.sf.execute_query(f"""{create} {table_name} (
+            {body}
+        ){cluster}""")
+
+    def append_rows(self, table_name, columns, rows):
+        placeholders = ", ".join([self.sf.placeholder] * len(columns))
+        self.sf.execute_batch(
+            f"INSERT INTO {table_name} ({', '.join(columns)}) VALUES ({placeholders})",
+            rows
+        )
+        return len(rows)
+
+    def _ensure_stage(self):
+        # Un seul stage temporaire par session : il disparaît avec elle
+        if self.stage_name is None:
+            stage_name = f"TEMP_STAGE_{uuid.uuid4().hex[:8]}"
+            self.sf.execute_query(f"CREATE OR REPLACE TEMPORARY STAGE {stage_name}")
+            self.stage_name = stage_name
+        return self.stage_name
+
+    def submit_staged_file(self, table_name, path):
+        stage_name = self._ensure_stage()
+        file_name = os.path.basename(path)
+        # QUERY_TAG de session = tag du batch en cours (tracing.py)
+        self.sf.commit()
+        self.sf.sync_query_tag()
+        cursor = self.sf.connection.cursor()
+        try:
+            # Upload du fichier vers le stage (synchrone : le fichier local est libéré au retour)
+            with tracing.span('PUT', bytes=os.path.getsize(path)):
+                cursor.execute(f"PUT 'file://{path}' @{stage_name}")
+                tracing.record_query(cursor.sfqid)
+            logging.info(f"File uploaded to stage {stage_name}")
+
+            # Staging : chaque ligne garde son fichier et son rang, pour départager les doublons au MERGE
+            load_order = ""
+            if table_name in self.staging_tables:
+                load_order = "INCLUDE_METADATA=(_LOAD_FILE=METADATA$FILENAME, _LOAD_ROW=METADATA$FILE_ROW_NUMBER)"
+            # COPY via SQL (équivalent à Snowpipe), soumis sans attendre le warehouse
+            with tracing.span('COPY submit'):
+                cursor.execute_async(f"""
+                COPY INTO {table_name}
+                FROM @{stage_name}/{file_name}
+                FILE_FORMAT=(TYPE='PARQUET')
+                MATCH_BY_COLUMN_NAME=CASE_SENSITIVE
+                {load_order}
+                PURGE=TRUE
+                """)
+                tracing.record_query(cursor.sfqid)
+            return {'query_id': cursor.sfqid, 'table': table_name, 'file': file_name}
+        finally:
+            cursor.close()
+
+    def wait_staged_file(self, handle):
+        connection = self.sf.connection
+        query_id = handle['query_id']
+        # Lève une exception si le COPY a échoué côté serveur
+        with tracing.span('COPY wait', file=handle['file'], copy_query_id=query_id):
+            while connection.is_still_running(connection.get_query_status_throw_if_error(query_id)):
+                time.sleep(self.poll_interval)
+
+        cursor = connection.cursor()
+        try:
+            cursor.get_results_from_sfqid(query_id)
+            copy_result = cursor.fetchone()
+        finally:
+            cursor.close()
+        # Résultat COPY : (file, status, rows_parsed, rows_loaded, ...)
+        if copy_result and len(copy_result) > 3:
+            if copy_result[1] != 'LOADED':
+                raise RuntimeError(f"COPY {handle['file']} -> {handle['table']}: statut {copy_result[1]} ({query_id})")
+            return int(copy_result[3])
+        return 0
+
+    def load_staged_file(self, table_name, path):
+        return self.wait_staged_file(self.submit_staged_file(table_name, path))
+
+    def row_count(self, table_name):
+        result = self.sf.execute_query(f"SELECT COUNT(*) FROM {table_name}")
+        return result[0][0] if result else 0
+
+    def query(self, sql, params=None):
+        self.sf.commit()
+        self.sf.sync_query_tag()
+        cursor = self.sf.connection.cursor()
+        try:
+            cursor.execute(sql, params)
+            return cursor.fetchall()
+        finally:
+            cursor.close()
+
+    def create_staging_table(self, staging_name, like_table):
+        self.sf.execute_query(f"CREATE OR REPLACE TRANSIENT TABLE {staging_name} LIKE {like_table}")
+        columns = ", ".join(f"{name} {col_type}" for name, col_type in LOAD_ORDER_COLUMNS)
+        self.sf.execute_query(f"ALTER TABLE {staging_name} ADD COLUMN {columns}")
+        self.staging_tables.add(staging_name)
+
+    def merge_table(self, source_table, target_table, key_columns, columns):
+        non_keys = [c for c in columns if c not in key_columns]
+        on = " AND ".join(f"t.{c} = s.{c}" for c in key_columns)
+        changed = " OR ".join(f"t.{c} IS DISTINCT FROM s.{c}" for c in non_keys)
+        update = ", ".join(f"{c} = s.{c}" for c in non_keys)
+        # Un même ID chargé deux fois dans le run : la dernière occurrence chargée l'emporte,
+        # comme l'upsert SQLite (fichiers de batch nommés dans l'ordre du run)
+        load_order = ", ".join(f"{name} DESC" for name, _ in LOAD_ORDER_COLUMNS)
+        source = f"""(SELECT * FROM {source_table}
+            QUALIFY ROW_NUMBER() OVER (PARTITION BY {', '.join(key_columns)} ORDER BY {load_order}) = 1)"""
+        result = self.sf.execute_query(f"""
+            MERGE INTO {target_table} t
+            USING {source} s
+            ON {on}
+            WHEN MATCHED AND ({changed}) THEN UPDATE SET {update}
+            WHEN NOT MATCHED THEN INSERT ({', '.join(columns)})
+                VALUES ({', '.join(f's.{c}' for c in columns)})
+        """)
+        # Résultat MERGE : (number of rows inserted, number of rows updated)
+        inserted, updated = result[0][:2] if result else (0, 0)
+        return int(inserted), int(updated)
+
+    def delete_matching(self, source_table, target_table, key_columns):
+        on = " AND ".join(f"t.{c} = s.{c}" for c in key_columns)
+        result = self.sf.execute_query(f"DELETE FROM {target_table} t USING {source_table} s WHERE {on}")
+        return int(result[0][0]) if result else 0
+
+    def merge_additive(self, source_table, target_table, key_columns, sum_columns):
+        columns = key_columns + sum_columns
+        on = " AND ".join(f"EQUAL_NULL(t.{c}, s.{c})" for c in key_columns)
+        update = ", ".join(f"{c} = t.{c} + s.{c}" for c in sum_columns)
+        result = self.sf.execute_query(f"""
+            MERGE INTO {target_table} t
+            USING {source_table} s
+            ON {on}
+            WHEN MATCHED THEN UPDATE SET {update}, UPDATED_AT = CURRENT_TIMESTAMP()
+            WHEN NOT MATCHED THEN INSERT ({', '.join(columns)})
+                VALUES ({', '.join(f's.{c}' for c in columns)})
+        """)
+        inserted, updated = result[0][:2] if result else (0, 0)
+        return int(inserted), int(updated)
+
+    def swap_tables(self, table_name, other_name):
+        # Opération de métadonnées : aucune donnée recopiée, les requêtes en cours gardent leur version
+        self.sf.execute_query(f"ALTER TABLE {table_name} SWAP WITH {other_name}")
+
+    def rename_table(self, table_name, new_name):
+        self.sf.execute_query(f"ALTER TABLE {table_name} RENAME TO {new_name}")
+
+    def list_tables(self, prefix):
+        # SHOW TABLES : le nom est la 2e colonne ; '_' est un joker de LIKE, d'où le filtre exact
+        result = self.sf.execute_query(f"SHOW TABLES LIKE '{prefix}%'")
+        return sorted(row[1] for row in result if row[1].startswith(prefix))
+
+    def drop_table(self, table_name):
+        self.sf.execute_query(f"DROP TABLE IF EXISTS {table_name}")
+        self.staging_tables.discard(table_name)
+
+    def rollback(self):
+        self.sf.rollback()
+
+    def close(self):
+        self.sf.close()
+
+
+class CopyWindow:
+    """Fenêtre bornée de chargements asynchrones vers une table
+
+    Au plus max_in_flight fichiers sont en cours de chargement : au-delà, submit
+    attend le plus ancien. Les résultats sont vérifiés dans l'ordre de soumission ;
+    un lot en échec est signalé avec son numéro, et drain() attend la fin de tous
+    les chargements avant de lever l'erreur.
+    """
+
+    def __init__(self, sink, max_in_flight=4):
+        self.sink = sink
+        self.max_in_flight = max(1, max_in_flight)
+        self.in_flight = deque()
+        self.rows_loaded = 0
+        self.failures = []
+
+    def submit(self, table_name, path, batch_number):
+        while len(self.in_flight) >= self.max_in_flight:
+            self._complete_oldest()
+        if self.failures:
+            # Inutile de continuer à produire des fichiers : on attend les COPY en vol
+            self.drain()
+        try:
+            handle = self.sink.submit_staged_file(table_name, path)
+        except Exception as e:
+            self.failures.append((batch_number, e))
+            self.drain()
+        self.in_flight.append((batch_number, handle))
+
+    def _complete_oldest(self):
+        batch_number, handle = self.in_flight.popleft()
+        try:
+            rows = self.sink.wait_staged_file(handle)
+        except Exception as e:
+            logging.error(f"Batch {batch_number} failed: {e}")
+            self.failures.append((batch_number, e))
+            return
+        logging.info(f"Batch {batch_number}: {rows} rows loaded")
+        self.rows_loaded += rows
+
+    def drain(self):
+        """Attendre tous les chargements en vol, retourne le total de lignes chargées"""
+        while self.in_flight:
+            self._complete_oldest()
+        if self.failures:
+            details = "; ".join(f"batch {number}: {error}" for number, error in self.failures)
+            raise RuntimeError(f"{len(self.failures)} batch(es) en échec - {details}")
+        return self.rows_loaded
+
+
+def _sqlite_decimal(value):
+    # Entier (DECIMAL(38,0), montants ronds) : int exact sur 64 bits là où float arrondit au-delà
+    # de 2**53 ; sinon REAL, la précision maximale d'une colonne NUMERIC SQLite
+    if value == value.to_integral_value() and -2**63 <= value < 2**63:
+        return int(value)
+    return float(value)
+
+
+# sqlite3 ne sait pas stocker nativement les Decimal et dates renvoyés par pyarrow. Conversion
+# locale au sink : un register_adapter global changerait le comportement de tout le processus
+_SQLITE_VALUES = {
+    Decimal: _sqlite_decimal,
+    datetime.date: lambda value: value.isoformat(),
+    datetime.datetime: lambda value: value.isoformat(sep=' '),
+}
+
+
+def _sqlite_row(row):
+    return tuple(_SQLITE_VALUES[type(value)](value) if type(value) in _SQLITE_VALUES else value for value in row)
+
+
+class SQLiteSink(IngestionSink):
+    """Base SQL embarquée dans un fichier local, pour les tests et l'itération rapide"""
+
+    kind = 'sqlite'
+
+    def __init__(self, path=DEFAULT_SQLITE_PATH):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.connection = sqlite3.connect(path)
+        # Ingestion en volume : pas besoin de la durabilité d'une base de production
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+
+    @staticmethod
+    def _column_type(col_type):
+        # CURRENT_TIMESTAMP() n'existe pas en SQLite, seul le mot-clé est accepté
+        return col_type.replace("CURRENT_TIMESTAMP()", "CURRENT_TIMESTAMP")
+
+    def create_table(self, table_name, columns, primary_key=None, replace=False, cluster_by=None):
+        # primary_key non déclarée : comme sur Snowflake (contrainte informative), un re-run en
+        # append accepte les doublons au lieu d'échouer sur UNIQUE ; l'upsert passe par merge_table
+        definitions = [f"{name} {self._column_type(col_type)}" for name, col_type in columns]
+        with self.connection:
+            if replace:
+                self.connection.execute(f"DROP TABLE IF EXISTS {table_name}")
+            self.connection.execute(
+                f"CREATE TABLE IF NOT EXISTS {table_name} ({', '.join(definitions)})"
+            )
+
+    def append_rows(self, table_name, columns, rows):
+        placeholders = ", ".join(["?"] * len(columns))
+        with self.connection:
+            self.connection.executemany(
+                f"INSERT INTO {table_name} ({', '.join(columns)}) VALUES ({placeholders})",
+                map(_sqlite_row, rows)
+            )
+        return len(rows)
+
+    def load_staged_file(self, table_name, path):
+        import pyarrow.parquet as pq
+
+        # Équivalent de MATCH_BY_COLUMN_NAME : on insère par nom de colonne
+        table = pq.read_table(path)
+        columns = table.column_names
+        rows = list(zip(*[table.column(name).to_pylist() for name in columns]))
+        return self.append_rows(table_name, columns, rows)
+
+    def row_count(self, table_name):
+        return self.connection.execute(f"SELECT COUNT(*) FROM {table_name}").fetchone()[0]
+
+    def query(self, sql, params=None):
+        return self.connection.execute(sql, _sqlite_row(params or ())).fetchall()
+
+    def create_staging_table(self, staging_name, like_table):
+        with self.connection:
+            self.connection.execute(f"DROP TABLE IF EXISTS {staging_name}")
+            self.connection.execute(f"CREATE TABLE {staging_name} AS SELECT * FROM {like_table} WHERE 0")
+
+    def merge_table(self, source_table, target_table, key_columns, columns):
+        non_keys = [c for c in columns if c not in key_columns]
+        keys = ', '.join(key_columns)
+        match = " AND ".join(f"{target_table}.{c} = s.{c}" for c in key_columns)
+        changed = " OR ".join(f"{target_table}.{c} IS NOT s.{c}" for c in non_keys)
+        update = ", ".join(f"{c} = s.{c}" for c in non_keys)
+        # Même ID chargé deux fois dans le run : la dernière occurrence chargée (rowid) l'emporte
+        source = f"""(SELECT * FROM {source_table}
+            WHERE rowid IN (SELECT MAX(rowid) FROM {source_table} GROUP BY {keys}))"""
+        with self.connection:
+            updated = self.connection.execute(f"""
+                UPDATE {target_table} SET {update}
+                FROM {source} s WHERE {match} AND ({changed})
+            """).rowcount
+            inserted = self.connection.execute(f"""
+                INSERT INTO {target_table} ({', '.join(columns)})
+                SELECT {', '.join(f's.{c}' for c in columns)} FROM {source} s
+                WHERE NOT EXISTS (SELECT 1 FROM {target_table} WHERE {match})
+            """).rowcount
+        return inserted, updated
+
+    def delete_matching(self, source_table, target_table, key_columns):
+        keys = ', '.join(key_columns)
+        with self.connection:
+            cursor = self.connection.execute(
+                f"DELETE FROM {target_table} WHERE ({keys}) IN (SELECT {keys} FROM {source_table})"
+            )
+        return cursor.rowcount
+
+    def merge_additive(self, source_table, target_table, key_columns, sum_columns):
+        columns = key_columns + sum_columns
+        # IS : correspondance NULL-safe des clés (une clé contenant NULL doit être incrémentée)
+        match = " AND ".join(f"{target_table}.{c} IS s.{c}" for c in key_columns)
+        update = ", ".join(f"{c} = {target_table}.{c} + s.{c}" for c in sum_columns)
+        with self.connection:
+            updated = self.connection.execute(f"""
+                UPDATE {target_table} SET {update}, UPDATED_AT = CURRENT_TIMESTAMP
+                FROM {source_table} s WHERE {match}
+            """).rowcount
+            inserted = self.connection.execute(f"""
+                INSERT INTO {target_table} ({', '.join(columns)})
+                SELECT {', '.join(f's.{c}' for c in columns)} FROM {source_table} s
+                WHERE NOT EXISTS (SELECT 1 FROM {target_table} WHERE {match})
+            """).rowcount
+        return inserted, updated
+
+    def swap_tables(self, table_name, other_name):
+        swap_name = f"{table_name}__SWAP"
+        # Trois renommages dans une seule transaction : un lecteur voit l'état avant ou après
+        # (BEGIN explicite : sqlite3 n'ouvre pas de transaction implicite avant un DDL)
+        with self.connection:
+            self.connection.execute("BEGIN IMMEDIATE")
+            self.connection.execute(f"ALTER TABLE {table_name} RENAME TO {swap_name}")
+            self.connection.execute(f"ALTER TABLE {other_name} RENAME TO {table_name}")
+            self.connection.execute(f"ALTER TABLE {swap_name} RENAME TO {other_name}")
+
+    def rename_table(self, table_name, new_name):
+        with self.connection:
+            self.connection.execute(f"ALTER TABLE {table_name} RENAME TO {new_name}")
+
+    def list_tables(self, prefix):
+        rows = self.connection.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'table' AND substr(name, 1, ?) = ?",
+            (len(prefix), prefix)
+        ).fetchall()
+        return sorted(row[0] for row in rows)
+
+    def drop_table(self, table_name):
+        with self.connection:
+            self.connection.execute(f"DROP TABLE IF EXISTS {table_name}")
+
+    def close(self):
+        self.connection.close()
+
+
+def create_sink(kind=None, connect=None, sqlite_path=None, query_tag=None, binding=None, commit_every=None):
+    """Instancier le sink configuré (argument, sinon INGEST_SINK, sinon snowflake)
+
+    connect : fonction retournant une connexion snowflake.connector déjà ouverte ;
+    à défaut, SnowflakeConnection ouvre la sienne à partir du .env
+    query_tag : QUERY_TAG de session posé sur toutes les requêtes du run
+    binding / commit_every : chemin d'INSERT Snowflake (argument, sinon INGEST_BINDING /
+    INGEST_COMMIT_EVERY, sinon client et 1) ; SQLite lie toujours ses paramètres
+    """
+    kind = (kind or os.getenv('INGEST_SINK') or 'snowflake').lower()
+
+    if kind == 'sqlite':
+        path = sqlite_path or os.getenv('INGEST_SQLITE_PATH') or DEFAULT_SQLITE_PATH
+        logging.info(f"Using local SQLite sink: {path}")
+        return SQLiteSink(path)
+
+    if kind == 'snowflake':
+        from snowflake_config import SnowflakeConnection
+        return SnowflakeSink(SnowflakeConnection(
+            connection=connect() if connect else None,
+            query_tag=query_tag,
+            binding=(binding or os.getenv('INGEST_BINDING') or 'client').lower(),
+            commit_every=commit_every or int(os.getenv('INGEST_COMMIT_EVERY') or 1)
+        ))
+
+    raise ValueError(f"Sink '{kind}' non supporté. Supportés: {SINK_KINDS}")
@@ -4,16 +4,23 @@ Script pour vérifier le contenu des tables Snowflake et diagnostiquer
 pourquoi certaines tables sont vides après l'ingestion Snowpipe
 """
 
-import snowflake.connector
 import os
+import re
+import time
+import argparse
+from collections import defaultdict
 from dotenv import load_dotenv
-from cryptography.hazmat.primitives import serialization
-from cryptography.hazmat.backends import default_backend
+from sinks import create_sink, SINK_KINDS
+from reconciliation import reconcile
+from column_stats import profile_tables, DEFAULT_SNAPSHOT_DIR
 
 load_dotenv()
 
 def load_private_key():
     """Charger la clé privée RSA"""
+    from cryptography.hazmat.primitives import serialization
+    from cryptography.hazmat.backends import default_backend
+
     with open(os.getenv('SNOWFLAKE_PRIVATE_KEY_PATH'), 'rb') as f:
         key = serialization.load_pem_private_key(
             f.read(), 
@@ -26,12 +33,13 @@ def load_private_key():
         encryption_algorithm=serialization.NoEncryption()
     )
 
-def check_snowflake_tables():
-    """Vérifier le contenu des tables Snowflake"""
-    
+def get_connection():
+    """Ouvrir une connexion Snowflake à partir du .env"""
+    import snowflake.connector
+
     private_key = load_private_key()
     
-    conn = snowflake.connector.connect(
+    return snowflake.connector.connect(
         account=os.getenv('SNOWFLAKE_ACCOUNT'),
         user=os.getenv('SNOWFLAKE_USER'),
         private_key=private_key,
@@ -39,7 +47,85 @@ def check_snowflake_tables():
         database=os.getenv('SNOWFLAKE_DATABASE'),
         schema=os.getenv('SNOWFLAKE_SCHEMA')
     )
+
+# Tables à vérifier
+TABLES_TO_CHECK = {
+    'DIRECT INGESTER (transactional)': [
+        'SALES_DATA', 'RETURNS_DATA', 'REVIEWS_DATA', 'INVENTORY_DATA'
+    ],
+    'SNOWPIPE INGESTER (reference)': [
+        'PRODUCTS_DATA_SNOWPIPE', 'CUSTOMERS_DATA_SNOWPIPE', 
+        'SUPPLIERS_DATA_SNOWPIPE', 'STORES_DATA_SNOWPIPE', 'PROMOTIONS_DATA_SNOWPIPE'
+    ]
+}
+
+def fetch_table_metadata(cursor, tables):
+    """Lignes, octets et nombre de colonnes de chaque table en une seule requête de métadonnées
+
+    information_schema.tables.row_count est exact pour les tables permanentes/transitoires ;
+    il vaut NULL pour les vues et tables externes, qui nécessitent alors un vrai COUNT(*).
+    """
+    placeholders = ", ".join(["%s"] * len(tables))
+    cursor.execute(f"""
+        SELECT t.table_name, t.table_type, t.row_count, t.bytes, COUNT(c.column_name)
+        FROM information_schema.tables t
+        LEFT JOIN information_schema.columns c
+          ON c.table_schema = t.table_schema AND c.table_name = t.table_name
+        WHERE t.table_schema = CURRENT_SCHEMA()
+          AND t.table_name IN ({placeholders})
+        GROUP BY 1, 2, 3, 4
+    """, tables)
+    
+    metadata = {}
+    for table_name, table_type, row_count, size_bytes, column_count in cursor.fetchall():
+        exact = table_type == 'BASE TABLE'
+        metadata[table_name] = {
+            'row_count': row_count if exact else None,
+            'bytes': size_bytes,
+            'columns': column_count,
+        }
+    return metadata
+
+def run_async_queries(conn, queries, timeout=60, poll_interval=0.2):
+    """Soumettre toutes les requêtes en asynchrone puis collecter leurs résultats ensemble
+
+    queries : {clé: sql}. Retourne {clé: lignes} ou {clé: Exception} en cas d'erreur
+    ou de dépassement du timeout (la requête est alors annulée).
+    """
+    submitted = {}
+    results = {}
+    for key, sql in queries.items():
+        cursor = conn.cursor()
+        try:
+            cursor.execute_async(sql)
+            submitted[key] = (cursor, cursor.sfqid, time.monotonic() + timeout)
+        except Exception as submit_error:
+            results[key] = submit_error
+            cursor.close()
+    
+    while submitted:
+        for key, (cursor, query_id, deadline) in list(submitted.items()):
+            try:
+                status = conn.get_query_status_throw_if_error(query_id)
+                if conn.is_still_running(status):
+                    if time.monotonic() < deadline:
+                        continue
+                    cursor.execute(f"SELECT SYSTEM$CANCEL_QUERY('{query_id}')")
+                    raise TimeoutError(f"timeout après {timeout}s (requête {query_id} annulée)")
+                cursor.get_results_from_sfqid(query_id)
+                results[key] = cursor.fetchall()
+            except Exception as query_error:
+                results[key] = query_error
+            cursor.close()
+            del submitted[key]
+        if submitted:
+            time.sleep(poll_interval)
+    return results
+
+def check_snowflake_tables(with_samples=False, timeout=60):
+    """Vérifier le contenu des tables Snowflake"""
     
+    conn = get_connection()
     cursor = conn.cursor()
     
     try:
@@ -52,40 +138,53 @@ def check_snowflake_tables():
         print("🔍 DIAGNOSTIC DES TABLES SNOWFLAKE")
         print("="*60)
         
-        # Tables à vérifier
-        tables_to_check = {
-            'DIRECT INGESTER (transactional)': [
-                'SALES_DATA', 'RETURNS_DATA', 'REVIEWS_DATA', 'INVENTORY_DATA'
-            ],
-            'SNOWPIPE INGESTER (reference)': [
-                'PRODUCTS_DATA_SNOWPIPE', 'CUSTOMERS_DATA_SNOWPIPE', 
-                'SUPPLIERS_DATA_SNOWPIPE', 'STORES_DATA_SNOWPIPE', 'PROMOTIONS_DATA_SNOWPIPE'
-            ]
-        }
+        tables = [table for group in TABLES_TO_CHECK.values() for table in group]
+        
+        # 1 aller-retour : comptages et tailles depuis les métadonnées (sans réveiller le warehouse)
+        metadata = fetch_table_metadata(cursor, tables)
         
-        for category, tables in tables_to_check.items():
+        # Seules les requêtes réellement nécessaires partent, toutes en asynchrone
+        pending = {}
+        for table in tables:
+            info = metadata.get(table)
+            if info and info['row_count'] is None:
+                pending[(table, 'count')] = f"SELECT COUNT(*) FROM {table}"
+            if with_samples and info and (info['row_count'] is None or info['row_count'] > 0):
+                pending[(table, 'sample')] = f"SELECT * FROM {table} LIMIT 3"
+        results = run_async_queries(conn, pending, timeout) if pending else {}
+        
+        for category, group in TABLES_TO_CHECK.items():
             print(f"\n📊 {category}:")
             print("-" * 40)
             
-            for table in tables:
-                try:
-                    # Compter les lignes
-                    cursor.execute(f"SELECT COUNT(*) FROM {table}")
-                    count_result = cursor.fetchone()
-                    row_count = count_result[0] if count_result else 0
-                    
-                    # Obtenir quelques échantillons si la table contient des données
-                    if row_count > 0:
-                        cursor.execute(f"SELECT * FROM {table} LIMIT 3")
-                        samples = cursor.fetchall()
-                        print(f"  ✅ {table}: {row_count} lignes")
-                        if samples:
-                            print(f"     Échantillon: {len(samples[0])} colonnes")
+            for table in group:
+                info = metadata.get(table)
+                if info is None:
+                    print(f"  ⚠️  {table}: ERREUR - table introuvable")
+                    continue
+                
+                row_count = info['row_count']
+                source = "métadonnées"
+                if row_count is None:
+                    count_result = results.get((table, 'count'))
+                    if isinstance(count_result, Exception):
+                        print(f"  ⚠️  {table}: ERREUR - {count_result}")
+                        continue
+                    row_count = count_result[0][0] if count_result else 0
+                    source = "COUNT(*)"
+                
+                if row_count > 0:
+                    size_mb = (info['bytes'] or 0) / (1024 * 1024)
+                    print(f"  ✅ {table}: {row_count} lignes ({size_mb:.1f} MB, {source})")
+                    samples = results.get((table, 'sample'))
+                    if isinstance(samples, Exception):
+                        print(f"     Échantillon: ERREUR - {samples}")
+                    elif samples:
+                        print(f"     Échantillon: {len(samples)} lignes, {len(samples[0])} colonnes")
                     else:
-                        print(f"  ❌ {table}: VIDE (0 lignes)")
-                        
-                except Exception as table_error:
-                    print(f"  ⚠️  {table}: ERREUR - {table_error}")
+                        print(f"     Colonnes: {info['columns']}")
+                else:
+                    print(f"  ❌ {table}: VIDE (0 lignes)")
         
         # Vérifier les stages temporaires récents
         print(f"\n🗄️ STAGES TEMPORAIRES RÉCENTS:")
@@ -139,5 +238,174 @@ def check_snowflake_tables():
         cursor.close()
         conn.close()
 
+# Types de requêtes émises par les ingesters (INSERT, PUT, COPY, upsert, DDL, transactions) ;
+# une requête manquante serait comptée à tort comme du temps client entre deux requêtes
+PROFILED_QUERY_TYPES = (
+    'INSERT', 'PUT_FILES', 'COPY', 'CREATE_TABLE', 'CREATE_TABLE_AS_SELECT',
+    'CREATE', 'DROP', 'ALTER_SESSION', 'MERGE', 'USE', 'DELETE', 'UPDATE', 'ALTER_TABLE',
+    'RENAME_TABLE', 'BEGIN_TRANSACTION', 'COMMIT', 'ROLLBACK', 'SELECT', 'SHOW'
+)
+# ALTER TABLE ... ADD COLUMN / SWAP WITH, ALTER WAREHOUSE (dimensionnement), ALTER PIPE ... REFRESH :
+# Snowflake les classe sous des types ALTER_<objet>[_<action>]
+PROFILED_QUERY_PREFIXES = ('ALTER_',)
+
+TABLE_PATTERNS = [
+    re.compile(r'\b(?:INSERT\s+INTO|COPY\s+INTO|MERGE\s+INTO|DELETE\s+FROM)\s+([A-Z0-9_."]+)', re.IGNORECASE),
+    re.compile(r'\bTABLE\s+(?:IF\s+NOT\s+EXISTS\s+)?([A-Z0-9_."]+)', re.IGNORECASE),
+    # PUT : les fichiers Parquet sont nommés <table>_<uuid>.parquet
+    re.compile(r"\bPUT\s+'file://[^']*/([A-Za-z_]+?_DATA(?:_SNOWPIPE)?)_", re.IGNORECASE),
+]
+
+def _query_table(query_text):
+    """Table ciblée par une requête d'ingestion (None pour USE, ALTER SESSION, ...)"""
+    for pattern in TABLE_PATTERNS:
+        match = pattern.search(query_text)
+        if match:
+            return match.group(1).strip('"').upper()
+    return None
+
+def fetch_run_queries(cursor, query_tag, hours=24):
+    """Récupérer toutes les requêtes d'un run à partir de son QUERY_TAG"""
+    cursor.execute(f"""
+        SELECT query_id, query_type, query_text, execution_status, start_time, end_time,
+               total_elapsed_time, queued_provisioning_time + queued_repair_time + queued_overload_time,
+               compilation_time, execution_time, rows_produced, bytes_scanned
+        FROM TABLE(information_schema.query_history(
+            end_time_range_start => DATEADD(hour, -{int(hours)}, CURRENT_TIMESTAMP()),
+            result_limit => 10000))
+        WHERE query_tag LIKE %s
+        ORDER BY start_time
+    """, (f"{query_tag}%",))
+    
+    queries = []
+    for row in cursor.fetchall():
+        if row[1] not in PROFILED_QUERY_TYPES and not row[1].startswith(PROFILED_QUERY_PREFIXES):
+            continue
+        queries.append({
+            'query_id': row[0], 'query_type': row[1], 'table': _query_table(row[2]),
+            'status': row[3], 'start_time': row[4], 'end_time': row[5],
+            'total_ms': row[6] or 0, 'queued_ms': row[7] or 0,
+            'compile_ms': row[8] or 0, 'execution_ms': row[9] or 0,
+            'rows': row[10] or 0, 'bytes': row[11] or 0,
+        })
+    return queries
+
+def summarize_run(queries):
+    """Décomposer le temps d'un run : warehouse, réseau/allers-retours et client
+
+    - warehouse : file d'attente + compilation + exécution (hors PUT)
+    - réseau    : durée des PUT + surcoût par requête (total - queued - compile - exec)
+    - client    : temps mort entre les requêtes (parsing, encodage Parquet, ...)
+    """
+    if not queries:
+        return None
+    
+    wall_ms = (max(q['end_time'] for q in queries) - min(q['start_time'] for q in queries)).total_seconds() * 1000
+    server_ms = sum(q['total_ms'] for q in queries)
+    warehouse_ms = sum(q['queued_ms'] + q['compile_ms'] + q['execution_ms']
+                       for q in queries if q['query_type'] != 'PUT_FILES')
+    network_ms = sum(q['total_ms'] for q in queries if q['query_type'] == 'PUT_FILES')
+    network_ms += sum(max(0, q['total_ms'] - q['queued_ms'] - q['compile_ms'] - q['execution_ms'])
+                      for q in queries if q['query_type'] != 'PUT_FILES')
+    client_ms = max(0.0, wall_ms - server_ms)
+    
+    per_table = defaultdict(lambda: defaultdict(float))
+    for q in queries:
+        stats = per_table[q['table'] or '(session)']
+        stats['queries'] += 1
+        stats[q['query_type']] += 1
+        stats['rows'] += q['rows'] if q['query_type'] in ('INSERT', 'COPY', 'MERGE') else 0
+        stats['bytes'] += q['bytes']
+        stats['queued_ms'] += q['queued_ms']
+        stats['compile_ms'] += q['compile_ms']
+        stats['execution_ms'] += q['execution_ms']
+        stats['total_ms'] += q['total_ms']
+    
+    breakdown = {'warehouse': warehouse_ms, 'network': network_ms, 'client': client_ms}
+    return {
+        'queries': len(queries),
+        'failed': sum(1 for q in queries if q['status'] != 'SUCCESS'),
+        'wall_ms': wall_ms,
+        'server_ms': server_ms,
+        'queued_ms': sum(q['queued_ms'] for q in queries),
+        'compile_ms': sum(q['compile_ms'] for q in queries),
+        'execution_ms': sum(q['execution_ms'] for q in queries),
+        'round_trip_overhead': (wall_ms - warehouse_ms) / wall_ms if wall_ms else 0.0,
+        'breakdown': breakdown,
+        'bound_by': max(breakdown, key=breakdown.get),
+        'per_table': per_table,
+    }
+
+def profile_ingestion_run(query_tag, hours=24):
+    """Rapport de profilage d'un run d'ingestion identifié par son QUERY_TAG"""
+    conn = get_connection()
+    cursor = conn.cursor()
+    
+    try:
+        queries = fetch_run_queries(cursor, query_tag, hours)
+        summary = summarize_run(queries)
+        
+        print(f"⏱️  PROFIL DU RUN {query_tag}")
+        print("="*60)
+        if summary is None:
+            print("  Aucune requête trouvée pour ce QUERY_TAG")
+            return None
+        
+        wall = summary['wall_ms'] or 1
+        print(f"  Requêtes: {summary['queries']} ({summary['failed']} en échec)")
+        print(f"  Durée totale: {summary['wall_ms']:.0f}ms")
+        print(f"  Serveur: file {summary['queued_ms']:.0f}ms | compilation {summary['compile_ms']:.0f}ms "
+              f"| exécution {summary['execution_ms']:.0f}ms")
+        print(f"  Surcoût allers-retours (hors warehouse): {summary['round_trip_overhead']:.1%} du temps total")
+        for part, ms in summary['breakdown'].items():
+            print(f"    {part:<10} {ms:>10.0f}ms ({ms / wall:.1%})")
+        print(f"  ➡️  Run limité par: {summary['bound_by'].upper()}")
+        
+        print(f"\n📊 PAR TABLE:")
+        print("-" * 40)
+        for table, stats in sorted(summary['per_table'].items()):
+            print(f"  {table}: {int(stats['queries'])} requêtes, {int(stats['rows'])} lignes, "
+                  f"{int(stats['bytes'])} octets, {stats['total_ms']:.0f}ms "
+                  f"(file {stats['queued_ms']:.0f} / compil {stats['compile_ms']:.0f} / exec {stats['execution_ms']:.0f})")
+        return summary
+        
+    finally:
+        cursor.close()
+        conn.close()
+
+def main():
+    parser = argparse.ArgumentParser(description='Vérification et profilage des tables Snowflake')
+    parser.add_argument('--profile-run', type=str, metavar='QUERY_TAG', help='Profiler un run d\'ingestion à partir de son QUERY_TAG')
+    parser.add_argument('--hours', type=int, default=24, help='Fenêtre de recherche dans query_history (heures)')
+    parser.add_argument('--samples', action='store_true', help='Récupérer aussi 3 lignes d\'échantillon par table (requêtes asynchrones)')
+    parser.add_argument('--timeout', type=int, default=60, help='Timeout par table des requêtes asynchrones (secondes)')
+    parser.add_argument('--reconcile', nargs='*', metavar='TABLE', help='Réconcilier data/*.json et les tables par hash (toutes si aucune table)')
+    parser.add_argument('--columns', type=str, help='Colonnes projetées pour --reconcile/--stats, séparées par des virgules (pour --reconcile la première est la clé)')
+    parser.add_argument('--bisect', action='store_true', help='Localiser les lignes divergentes par bissection sur la clé')
+    parser.add_argument('--data-dir', type=str, default='data', help='Répertoire des fichiers JSON source')
+    parser.add_argument('--stats', nargs='*', metavar='TABLE', help='Profil statistique des tables en un scan chacune (toutes si aucune table)')
+    parser.add_argument('--snapshot-dir', type=str, default=DEFAULT_SNAPSHOT_DIR, help='Répertoire des snapshots de --stats')
+    parser.add_argument('--sink', choices=SINK_KINDS, help='Destination à vérifier pour --reconcile/--stats (défaut: INGEST_SINK ou snowflake)')
+    
+    args = parser.parse_args()
+    
+    if args.profile_run:
+        profile_ingestion_run(args.profile_run, args.hours)
+        return
+    
+    columns = [c.strip().upper() for c in args.columns.split(',')] if args.columns else None
+    
+    if args.reconcile is not None:
+        with create_sink(args.sink) as sink:
+            reconcile(sink, args.reconcile or None, args.data_dir, columns, args.bisect)
+        return
+    
+    if args.stats is not None:
+        with create_sink(args.sink) as sink:
+            profile_tables(sink, args.stats or None, columns, args.snapshot_dir)
+        return
+    
+    check_snowflake_tables(with_samples=args.samples, timeout=args.timeout)
+
 if __name__ == "__main__":
-    check_snowflake_tables()
+    main()
@@ -1,15 +1,48 @@
 import os
-import snowflake.connector
-from cryptography.hazmat.primitives import serialization
-from cryptography.hazmat.backends import default_backend
+import uuid
+import datetime
+
+import tracing
+
+# client : executemany %s, chaque batch rendu côté client en un seul INSERT ... VALUES (...), (...)
+# server : executemany ?, valeurs envoyées en tableaux liés (array binding) et typées côté serveur
+BINDINGS = ['client', 'server']
+
+def new_run_tag(prefix):
+    """QUERY_TAG unique pour un run d'ingestion (retrouvé ensuite dans query_history)"""
+    timestamp = datetime.datetime.now().strftime('%Y%m%dT%H%M%S')
+    return f"ingest-{prefix}-{timestamp}-{uuid.uuid4().hex[:6]}"
 
 class SnowflakeConnection:
-    def __init__(self):
-        self.connection = None
+    def __init__(self, connection=None, query_tag=None, binding='client', commit_every=1):
+        """binding : 'client' (pyformat) ou 'server' (qmark, array binding)
+
+        commit_every : en binding server, batches regroupés par transaction explicite
+        (1 : autocommit de chaque INSERT, comportement historique)
+        """
+        if binding not in BINDINGS:
+            raise ValueError(f"Binding '{binding}' non supporté. Supportés: {BINDINGS}")
+        self.connection = connection
         self.cursor = None
-        self.connect()
+        self.query_tag = None
+        self.binding = binding
+        self.commit_every = max(1, commit_every or 1)
+        self.pending_batches = 0
+        if connection is None:
+            self.connect()
+        else:
+            # Le paramstyle est fixé à la connexion : une connexion fournie garde le sien
+            if binding == 'server' and getattr(connection, '_paramstyle', None) != 'qmark':
+                print("⚠️ Connexion fournie sans paramstyle='qmark': binding client conservé")
+                self.binding = 'client'
+            self.cursor = connection.cursor()
+        if query_tag:
+            self.set_query_tag(query_tag)
         
     def load_private_key(self, path=None, passphrase=None):
+        from cryptography.hazmat.primitives import serialization
+        from cryptography.hazmat.backends import default_backend
+
         private_key_content = os.getenv('PRIVATE_KEY')
         if private_key_content:
             try:
@@ -45,6 +78,8 @@ class SnowflakeConnection:
         raise Exception("Aucune clé privée valide trouvée dans PRIVATE_KEY ou SNOWFLAKE_PRIVATE_KEY_PATH")
     
     def connect(self):
+        import snowflake.connector
+
         private_key = self.load_private_key(
             os.getenv('SNOWFLAKE_PRIVATE_KEY_PATH'),
             os.getenv('SNOWFLAKE_PRIVATE_KEY_PASSPHRASE')
@@ -56,19 +91,68 @@ class SnowflakeConnection:
             private_key=private_key,
             warehouse=os.getenv('SNOWFLAKE_WAREHOUSE'),
             database=os.getenv('SNOWFLAKE_DATABASE'),
-            schema=os.getenv('SNOWFLAKE_SCHEMA')
+            schema=os.getenv('SNOWFLAKE_SCHEMA'),
+            paramstyle='qmark' if self.binding == 'server' else 'pyformat'
         )
         self.cursor = self.connection.cursor()
     
+    def set_query_tag(self, query_tag):
+        self.cursor.execute(f"ALTER SESSION SET QUERY_TAG = '{query_tag}'")
+        self.query_tag = query_tag
+    
+    def sync_query_tag(self):
+        """Poser le tag du span courant (run/table/batch) comme QUERY_TAG, s'il a changé"""
+        tag = tracing.current_tag()
+        if tag and tag != self.query_tag:
+            self.set_query_tag(tag)
+    
+    @property
+    def placeholder(self):
+        """Marqueur de paramètre des requêtes de execute_batch"""
+        return '?' if self.binding == 'server' else '%s'
+    
     def execute_query(self, query):
+        # Une requête hors INSERT groupés (DDL, MERGE, lecture) clôt d'abord leur transaction
+        self.commit()
+        self.sync_query_tag()
         self.cursor.execute(query)
+        tracing.record_query(self.cursor.sfqid)
         return self.cursor.fetchall()
     
     def execute_batch(self, query, data):
+        """INSERT d'un batch (marqueurs self.placeholder) ; retourne le nombre de lignes
+
+        En binding server, executemany envoie les colonnes en tableaux liés (au-delà du
+        seuil du connecteur, déposés sur un stage temporaire) au lieu d'un SQL rendu ;
+        avec commit_every > 1, les batches partagent une transaction explicite.
+        """
+        self.sync_query_tag()
+        if self.binding == 'server' and self.commit_every > 1 and not self.pending_batches:
+            self.cursor.execute("BEGIN")
         self.cursor.executemany(query, data)
-        return self.cursor.rowcount
+        tracing.record_query(self.cursor.sfqid)
+        rowcount = self.cursor.rowcount
+        if self.binding == 'server' and self.commit_every > 1:
+            self.pending_batches += 1
+            if self.pending_batches >= self.commit_every:
+                self.commit()
+        return rowcount
+    
+    def commit(self):
+        """Valider la transaction des batches en attente (sans effet hors transaction groupée)"""
+        if self.pending_batches:
+            self.cursor.execute("COMMIT")
+            self.pending_batches = 0
+    
+    def rollback(self):
+        """Annuler la transaction des batches en attente (chargement en échec)"""
+        if self.pending_batches:
+            self.cursor.execute("ROLLBACK")
+            self.pending_batches = 0
     
     def close(self):
+        if self.cursor and self.connection:
+            self.commit()
         if self.cursor:
             self.cursor.close()
         if self.connection:
@@ -78,4 +162,7 @@ class SnowflakeConnection:
         return self
     
     def __exit__(self, exc_type, exc_val, exc_tb):
+        # Sortie sur exception : les batches groupés non validés ne sont pas commités par close()
+        if exc_type is not None and self.cursor:
+            self.rollback()
         self.close()
@@ -0,0 +1,165 @@
+"""
+Ingestion en continu (micro-batches) pour les tables transactionnelles.
+
+Un thread lecteur suit un fichier NDJSON en cours d'écriture (ou stdin) et place
+les lignes dans une file bornée ; la boucle principale déclenche un flush vers le
+sink dès que le premier de ces seuils est atteint :
+    - N lignes en attente
+    - B octets en attente
+    - T millisecondes depuis l'arrivée de la plus ancienne ligne en attente
+
+La fraîcheur est donc bornée par T (plus la durée d'un flush), pas par la taille
+des fichiers. Quand le sink prend du retard, la file se remplit et le lecteur
+bloque : la contre-pression remonte jusqu'au producteur (pipe stdin plein,
+fichier lu moins vite).
+"""
+
+import sys
+import json
+import time
+import queue
+import logging
+import threading
+
+_EOF = object()
+
+
+def follow_lines(source, stop, poll_interval=0.2):
+    """Lignes complètes d'un fichier suivi comme `tail -f`, ou de stdin si source == '-'"""
+    if source == '-':
+        for line in sys.stdin:
+            if stop.is_set():
+                return
+            yield line
+        return
+
+    with open(source, 'r') as f:
+        partial = ''
+        while not stop.is_set():
+            line = f.readline()
+            if not line:
+                time.sleep(poll_interval)
+                continue
+            # Une ligne en cours d'écriture n'est émise qu'une fois terminée
+            partial += line
+            if partial.endswith('\n'):
+                yield partial
+                partial = ''
+
+
+class MicroBatchStream:
+    """Flush d'un flux NDJSON vers une table au premier seuil lignes / octets / latence"""
+
+    def __init__(self, sink, table_name, columns, row_builder, max_rows=1000, max_bytes=1_000_000,
+                 max_latency_ms=1000, max_pending=None, on_flush=None):
+        self.sink = sink
+        # on_flush(batch) : appelé avec chaque batch une fois écrit dans le sink (pas à la lecture)
+        self.on_flush = on_flush
+        self.table_name = table_name
+        self.columns = columns
+        self.row_builder = row_builder
+        self.max_rows = max_rows
+        self.max_bytes = max_bytes
+        self.max_latency = max_latency_ms / 1000
+        # File bornée entre lecteur et flush : c'est elle qui porte la contre-pression
+        self.pending = queue.Queue(maxsize=max_pending or max_rows * 10)
+        self.stop = threading.Event()
+        self.rejected = 0
+        self.backpressure_waits = 0
+        # Erreur du thread lecteur (fichier absent, illisible...), relevée par run()
+        self.reader_error = None
+        self.stats = {'flushes': 0, 'rows': 0, 'rows_trigger': 0, 'bytes_trigger': 0,
+                      'latency_trigger': 0, 'final': 0, 'max_latency_ms': 0.0}
+
+    def _read(self, source):
+        try:
+            for line in follow_lines(source, self.stop):
+                if not line.strip():
+                    continue
+                try:
+                    row = self.row_builder(json.loads(line))
+                except (ValueError, KeyError) as e:
+                    self.rejected += 1
+                    logging.error(f"Rejected line in {source}: {e}")
+                    continue
+                if self.pending.full():
+                    self.backpressure_waits += 1
+                self.pending.put((time.monotonic(), row, len(line)))
+        except Exception as e:
+            self.reader_error = e
+        finally:
+            self.pending.put(_EOF)
+
+    def _flush(self, batch, oldest, trigger):
+        self.sink.append_rows(self.table_name, self.columns, batch)
+        if self.on_flush:
+            self.on_flush(batch)
+        latency_ms = (time.monotonic() - oldest) * 1000
+        self.stats['flushes'] += 1
+        self.stats['rows'] += len(batch)
+        self.stats[trigger] += 1
+        self.stats['max_latency_ms'] = max(self.stats['max_latency_ms'], latency_ms)
+        if latency_ms > self.max_latency * 1000 * 2:
+            print(f"⚠️  {self.table_name}: flush à {latency_ms:.0f} ms, le sink ne suit pas la cible de latence")
+        logging.info(f"Flushed {len(batch)} rows to {self.table_name} ({trigger}, {latency_ms:.0f} ms)")
+
+    def run(self, source, idle_exit=None):
+        """Suivre source jusqu'à EOF de stdin, Ctrl-C, ou idle_exit secondes sans donnée"""
+        reader = threading.Thread(target=self._read, args=(source,), name='stream-reader', daemon=True)
+        reader.start()
+
+        batch, batch_bytes, oldest = [], 0, None
+        last_activity = time.monotonic()
+        print(f"📡 Streaming {source} -> {self.table_name} (flush: {self.max_rows} lignes / "
+              f"{self.max_bytes} octets / {self.max_latency * 1000:.0f} ms)")
+        try:
+            while True:
+                now = time.monotonic()
+                timeout = max(0.0, oldest + self.max_latency - now) if batch else 0.5
+                try:
+                    item = self.pending.get(timeout=timeout)
+                except queue.Empty:
+                    item = None
+
+                if item is _EOF:
+                    break
+                if item is not None:
+                    arrived, row, size = item
+                    if not batch:
+                        oldest = arrived
+                    batch.append(row)
+                    batch_bytes += size
+                    last_activity = time.monotonic()
+
+                trigger = None
+                if len(batch) >= self.max_rows:
+                    trigger = 'rows_trigger'
+                elif batch_bytes >= self.max_bytes:
+                    trigger = 'bytes_trigger'
+                elif batch and time.monotonic() - oldest >= self.max_latency:
+                    trigger = 'latency_trigger'
+                if trigger:
+                    # Buffer détaché avant l'envoi : un flush en échec n'est pas renvoyé par le finally
+                    flushing, batch, batch_bytes = batch, [], 0
+                    self._flush(flushing, oldest, trigger)
+                    oldest = None
+
+                if idle_exit and not batch and time.monotonic() - last_activity >= idle_exit:
+                    break
+        except KeyboardInterrupt:
+            print("\n⏹️  Arrêt demandé")
+        finally:
+            self.stop.set()
+            if batch:
+                self._flush(batch, oldest, 'final')
+
+        if self.reader_error is not None:
+            # Les lignes lues avant l'erreur sont flushées, mais le flux n'a pas été suivi jusqu'au bout
+            raise RuntimeError(f"Lecture de {source} interrompue: {self.reader_error}") from self.reader_error
+        stats = self.stats
+        print(f"✓ Streaming {self.table_name}: {stats['rows']} lignes en {stats['flushes']} flushes "
+              f"(lignes: {stats['rows_trigger']}, octets: {stats['bytes_trigger']}, "
+              f"latence: {stats['latency_trigger']}), latence max {stats['max_latency_ms']:.0f} ms")
+        if self.rejected or self.backpressure_waits:
+            print(f"   {self.rejected} lignes rejetées, {self.backpressure_waits} attentes de contre-pression")
+        return stats['rows']
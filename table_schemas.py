@@ -0,0 +1,217 @@
+"""
+Schémas des tables cibles partagés par les ingesters et les sinks.
+
+Chaque table est décrite par une liste ordonnée (colonne, type Snowflake) ;
+les sinks traduisent ces définitions dans leur propre dialecte SQL.
+"""
+
+import re
+
+TYPE_SCALE = re.compile(r'\(\s*(\d+)\s*,\s*(\d+)\s*\)')
+
+# Tables alimentées par ingester_direct.py (INSERT)
+TRANSACTIONAL_TABLES = {
+    'SALES_DATA': [
+        ('SALE_ID', 'VARCHAR(10)'),
+        ('SALE_DATE', 'DATE'),
+        ('CUSTOMER_ID', 'VARCHAR(10)'),
+        ('PRODUCT_ID', 'VARCHAR(10)'),
+        ('PRODUCT_NAME', 'VARCHAR(100)'),
+        ('QUANTITY', 'INTEGER'),
+        ('UNIT_PRICE', 'DECIMAL(10,2)'),
+        ('TOTAL_AMOUNT', 'DECIMAL(10,2)'),
+        ('CHANNEL', 'VARCHAR(20)'),
+        ('STORE_ID', 'VARCHAR(10)'),
+        ('COUNTRY', 'VARCHAR(50)'),
+        ('CREATED_AT', 'TIMESTAMP_NTZ DEFAULT CURRENT_TIMESTAMP()'),
+    ],
+    'RETURNS_DATA': [
+        ('RETURN_ID', 'VARCHAR(10)'),
+        ('SALE_ID', 'VARCHAR(10)'),
+        ('CUSTOMER_ID', 'VARCHAR(10)'),
+        ('PRODUCT_ID', 'VARCHAR(10)'),
+        ('RETURN_DATE', 'DATE'),
+        ('REASON', 'VARCHAR(50)'),
+        ('CONDITION', 'VARCHAR(20)'),
+        ('REFUND_AMOUNT', 'DECIMAL(10,2)'),
+        ('REFUND_METHOD', 'VARCHAR(30)'),
+        ('PROCESSED_BY', 'VARCHAR(100)'),
+        ('STATUS', 'VARCHAR(20)'),
+        ('NOTES', 'VARCHAR(500)'),
+        ('CREATED_AT', 'TIMESTAMP_NTZ DEFAULT CURRENT_TIMESTAMP()'),
+    ],
+    'REVIEWS_DATA': [
+        ('REVIEW_ID', 'VARCHAR(10)'),
+        ('PRODUCT_ID', 'VARCHAR(10)'),
+        ('CUSTOMER_ID', 'VARCHAR(10)'),
+        ('RATING', 'INTEGER'),
+        ('TITLE', 'VARCHAR(100)'),
+        ('COMMENT', 'VARCHAR(1000)'),
+        ('REVIEW_DATE', 'DATE'),
+        ('VERIFIED_PURCHASE', 'BOOLEAN'),
+        ('HELPFUL_VOTES', 'INTEGER'),
+        ('STATUS', 'VARCHAR(20)'),
+        ('CREATED_AT', 'TIMESTAMP_NTZ DEFAULT CURRENT_TIMESTAMP()'),
+    ],
+    'INVENTORY_DATA': [
+        ('INVENTORY_ID', 'VARCHAR(10)'),
+        ('PRODUCT_ID', 'VARCHAR(10)'),
+        ('STORE_ID', 'VARCHAR(10)'),
+        ('CURRENT_STOCK', 'INTEGER'),
+        ('RESERVED_STOCK', 'INTEGER'),
+        ('REORDER_LEVEL', 'INTEGER'),
+        ('MAX_STOCK_LEVEL', 'INTEGER'),
+        ('LAST_RESTOCKED', 'DATE'),
+        ('NEXT_DELIVERY_DATE', 'DATE'),
+        ('WAREHOUSE_LOCATION', 'VARCHAR(50)'),
+        ('CREATED_AT', 'TIMESTAMP_NTZ DEFAULT CURRENT_TIMESTAMP()'),
+    ],
+}
+
+# Tables alimentées par ingester_snowpipe.py (Parquet + COPY)
+REFERENCE_TABLES = {
+    'PRODUCTS_DATA_SNOWPIPE': [
+        ('PRODUCT_ID', 'VARCHAR(20) NOT NULL'),
+        ('NAME', 'VARCHAR(255) NOT NULL'),
+        ('CATEGORY', 'VARCHAR(100)'),
+        ('SUBCATEGORY', 'VARCHAR(100)'),
+        ('BRAND', 'VARCHAR(100)'),
+        ('MATERIAL', 'VARCHAR(100)'),
+        ('COLOR', 'VARCHAR(50)'),
+        ('PRICE', 'NUMBER(10,2)'),
+        ('COST', 'NUMBER(10,2)'),
+        ('WEIGHT_KG', 'NUMBER(8,2)'),
+        ('DIMENSIONS_CM', 'VARCHAR(50)'),
+        ('SUPPLIER_ID', 'VARCHAR(20)'),
+        ('CREATED_DATE', 'DATE'),
+        ('LAST_UPDATED', 'DATE'),
+        ('IS_ACTIVE', 'BOOLEAN'),
+        ('SKU', 'VARCHAR(50)'),
+    ],
+    'CUSTOMERS_DATA_SNOWPIPE': [
+        ('CUSTOMER_ID', 'VARCHAR(20) NOT NULL'),
+        ('FIRST_NAME', 'VARCHAR(100) NOT NULL'),
+        ('LAST_NAME', 'VARCHAR(100) NOT NULL'),
+        ('EMAIL', 'VARCHAR(255)'),
+        ('PHONE', 'VARCHAR(50)'),
+        ('DATE_OF_BIRTH', 'DATE'),
+        ('GENDER', 'VARCHAR(10)'),
+        ('ADDRESS', 'VARCHAR(500)'),
+        ('SEGMENT', 'VARCHAR(50)'),
+        ('REGISTRATION_DATE', 'DATE'),
+        ('LAST_PURCHASE_DATE', 'DATE'),
+        ('TOTAL_ORDERS', 'NUMBER(10,0)'),
+        ('LIFETIME_VALUE', 'NUMBER(12,2)'),
+        ('PREFERRED_CHANNEL', 'VARCHAR(50)'),
+        ('MARKETING_CONSENT', 'BOOLEAN'),
+    ],
+    'SUPPLIERS_DATA_SNOWPIPE': [
+        ('SUPPLIER_ID', 'VARCHAR(20) NOT NULL'),
+        ('NAME', 'VARCHAR(255) NOT NULL'),
+        ('CONTACT_PERSON', 'VARCHAR(255)'),
+        ('EMAIL', 'VARCHAR(255)'),
+        ('PHONE', 'VARCHAR(50)'),
+        ('ADDRESS', 'VARCHAR(500)'),
+        ('SPECIALTY', 'VARCHAR(255)'),
+        ('LEAD_TIME_DAYS', 'NUMBER(5,0)'),
+        ('MINIMUM_ORDER', 'NUMBER(10,2)'),
+        ('PAYMENT_TERMS', 'VARCHAR(100)'),
+        ('QUALITY_RATING', 'NUMBER(3,2)'),
+        ('ESTABLISHED_DATE', 'DATE'),
+        ('IS_ACTIVE', 'BOOLEAN'),
+    ],
+    'STORES_DATA_SNOWPIPE': [
+        ('STORE_ID', 'VARCHAR(20) NOT NULL'),
+        ('STORE_NAME', 'VARCHAR(255) NOT NULL'),
+        ('MANAGER_NAME', 'VARCHAR(255)'),
+        ('ADDRESS', 'VARCHAR(500)'),
+        ('CITY', 'VARCHAR(100)'),
+        ('COUNTRY', 'VARCHAR(100)'),
+        ('PHONE', 'VARCHAR(50)'),
+        ('EMAIL', 'VARCHAR(255)'),
+        ('OPENING_DATE', 'DATE'),
+        ('STORE_SIZE_SQM', 'NUMBER(10,2)'),
+        ('IS_ACTIVE', 'BOOLEAN'),
+    ],
+    'PROMOTIONS_DATA_SNOWPIPE': [
+        ('PROMOTION_ID', 'VARCHAR(20) NOT NULL'),
+        ('NAME', 'VARCHAR(255) NOT NULL'),
+        ('DESCRIPTION', 'VARCHAR(500)'),
+        ('DISCOUNT_TYPE', 'VARCHAR(50)'),
+        ('DISCOUNT_VALUE', 'NUMBER(8,2)'),
+        ('START_DATE', 'DATE'),
+        ('END_DATE', 'DATE'),
+        ('MINIMUM_PURCHASE', 'NUMBER(10,2)'),
+        ('IS_ACTIVE', 'BOOLEAN'),
+        ('CREATED_DATE', 'DATE'),
+    ],
+}
+
+PRIMARY_KEYS = {
+    'PRODUCTS_DATA_SNOWPIPE': ['PRODUCT_ID'],
+    'CUSTOMERS_DATA_SNOWPIPE': ['CUSTOMER_ID'],
+    'SUPPLIERS_DATA_SNOWPIPE': ['SUPPLIER_ID'],
+    'STORES_DATA_SNOWPIPE': ['STORE_ID'],
+    'PROMOTIONS_DATA_SNOWPIPE': ['PROMOTION_ID'],
+    # Tables de faits : clé non déclarée dans le DDL, utilisée par la déduplication (dedup.py)
+    'SALES_DATA': ['SALE_ID'],
+    'RETURNS_DATA': ['RETURN_ID'],
+    'REVIEWS_DATA': ['REVIEW_ID'],
+    'INVENTORY_DATA': ['INVENTORY_ID'],
+}
+
+# Clés de clustering des tables de faits (option --cluster-sort de ingester_direct.py) :
+# chargées dans cet ordre, les requêtes par plage de dates élaguent les micro-partitions
+CLUSTERING_KEYS = {
+    'SALES_DATA': ['SALE_DATE', 'STORE_ID'],
+    'RETURNS_DATA': ['RETURN_DATE', 'PRODUCT_ID'],
+    'REVIEWS_DATA': ['REVIEW_DATE', 'PRODUCT_ID'],
+}
+
+# Agrégats maintenus pendant l'ingestion (summaries.py) : les tableaux de bord les
+# lisent au lieu de rescanner SALES_DATA, les runs incrémentaux y ajoutent leurs compteurs
+SUMMARY_TABLES = {
+    'SALES_DAILY_SUMMARY': [
+        ('SALE_DATE', 'DATE'),
+        ('STORE_ID', 'VARCHAR(10)'),
+        ('CHANNEL', 'VARCHAR(20)'),
+        ('COUNTRY', 'VARCHAR(50)'),
+        ('SALES_COUNT', 'INTEGER'),
+        ('TOTAL_AMOUNT', 'DECIMAL(18,2)'),
+        ('TOTAL_QUANTITY', 'INTEGER'),
+        ('UPDATED_AT', 'TIMESTAMP_NTZ DEFAULT CURRENT_TIMESTAMP()'),
+    ],
+}
+
+SUMMARY_KEYS = {
+    'SALES_DAILY_SUMMARY': ['SALE_DATE', 'STORE_ID', 'CHANNEL', 'COUNTRY'],
+}
+
+ALL_TABLES = {**TRANSACTIONAL_TABLES, **REFERENCE_TABLES, **SUMMARY_TABLES}
+
+
+def table_columns(table_name):
+    """Liste (colonne, type) d'une table"""
+    return ALL_TABLES[table_name]
+
+
+def insert_columns(table_name):
+    """Colonnes alimentées par l'ingestion (les colonnes avec DEFAULT sont laissées au SGBD)"""
+    return [name for name, col_type in ALL_TABLES[table_name] if 'DEFAULT' not in col_type.upper()]
+
+
+def type_info(col_type):
+    """(famille, précision, échelle) d'un type Snowflake : bool, date, decimal, int ou text"""
+    base = col_type.split()[0].upper()
+    if base == 'BOOLEAN':
+        return 'bool', None, None
+    if base == 'DATE':
+        return 'date', None, None
+    if base.startswith(('DECIMAL', 'NUMBER', 'NUMERIC')):
+        match = TYPE_SCALE.search(base)
+        if match and int(match.group(2)) > 0:
+            return 'decimal', int(match.group(1)), int(match.group(2))
+        return 'int', None, None
+    if base.startswith(('INTEGER', 'INT', 'BIGINT')):
+        return 'int', None, None
+    return 'text', None, None
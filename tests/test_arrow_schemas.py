@@ -0,0 +1,39 @@
+"""Schémas Arrow typés et encodage dictionnaire des Parquet déposés sur le stage"""
+
+import datetime
+from decimal import Decimal
+
+import pytest
+
+pa = pytest.importorskip('pyarrow')
+import pyarrow.parquet as pq
+
+from arrow_schemas import arrow_schema, rows_to_table, write_parquet
+
+TABLE = 'SALES_DATA'
+COLUMNS = ['SALE_ID', 'SALE_DATE', 'QUANTITY', 'TOTAL_AMOUNT', 'CHANNEL']
+
+
+def test_schema_follows_table_ddl():
+    schema = arrow_schema(TABLE, COLUMNS)
+    assert [field.type for field in schema] == [
+        pa.string(), pa.date32(), pa.int64(), pa.decimal128(10, 2), pa.string()]
+    assert arrow_schema('STORES_DATA_SNOWPIPE', ['IS_ACTIVE']).field('IS_ACTIVE').type == pa.bool_()
+
+
+def test_rows_written_typed_with_dictionary_columns(tmp_path):
+    rows = [(f'S{100001 + i}', '2024-03-01', 2, 10.5 * i, 'Boutique') for i in range(20)]
+    table = rows_to_table(rows, TABLE, COLUMNS)
+    assert table.column('SALE_DATE')[0].as_py() == datetime.date(2024, 3, 1)
+    assert table.column('TOTAL_AMOUNT')[3].as_py() == Decimal('31.50')
+    assert rows_to_table([], TABLE, COLUMNS).schema == table.schema
+
+    path = tmp_path / 'sales.parquet'
+    write_parquet(table, str(path), row_group_size=8)
+    metadata = pq.ParquetFile(path).metadata
+    assert metadata.num_row_groups == 3
+    encodings = {metadata.row_group(0).column(i).path_in_schema: metadata.row_group(0).column(i).encodings
+                 for i in range(len(COLUMNS))}
+    assert any('DICTIONARY' in encoding for encoding in encodings['CHANNEL'])
+    assert not any('DICTIONARY' in encoding for encoding in encodings['SALE_ID'])
+    assert pq.read_table(path) == table
@@ -0,0 +1,32 @@
+"""Benchmark du générateur : mesure d'un cas et comparaison à une référence"""
+
+import json
+
+import pytest
+
+pytest.importorskip('faker')
+
+from bench_generator import compare, run_case
+
+
+def test_case_measures_records_and_bytes(tmp_path):
+    result = run_case('stores', 5, str(tmp_path), seed=42)
+    assert result['records'] == 5
+    assert result['bytes'] > 0 and result['peak_mb'] >= 0
+    # Aucun fichier écrit : seule la génération est mesurée
+    assert not list(tmp_path.glob('stores*.json'))
+
+
+def test_compare_counts_regressions(tmp_path, capsys):
+    baseline = tmp_path / 'baseline.json'
+    baseline.write_text(json.dumps({'results': [
+        {'entity': 'sales', 'size': 1000, 'records_per_sec': 1000},
+        {'entity': 'stores', 'size': 1000, 'records_per_sec': 1000},
+    ]}))
+    results = [
+        {'entity': 'sales', 'size': 1000, 'records_per_sec': 700},
+        {'entity': 'stores', 'size': 1000, 'records_per_sec': 900},
+        {'entity': 'products', 'size': 1000, 'records_per_sec': 10},
+    ]
+    assert compare(results, str(baseline), max_regression=0.2) == 1
+    assert '❌ sales' in capsys.readouterr().out
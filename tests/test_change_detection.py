@@ -0,0 +1,66 @@
+"""Mode delta : index clé -> hash et lignes changées entre deux snapshots"""
+
+import json
+import os
+
+import pytest
+
+pytest.importorskip('pyarrow')
+
+from change_detection import ChangeDetector
+from reconciliation import row_hash
+from table_schemas import insert_columns
+from transforms import table_rows, transform_batch
+
+TABLE = 'PRODUCTS_DATA_SNOWPIPE'
+COLUMNS = insert_columns(TABLE)
+PRODUCTS = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'products.json')
+
+
+@pytest.fixture
+def products():
+    with open(PRODUCTS) as f:
+        return [json.loads(line) for line, _ in zip(f, range(6))]
+
+
+def detector(tmp_path):
+    return ChangeDetector(TABLE, COLUMNS, 'sqlite', index_dir=str(tmp_path))
+
+
+def ids(table):
+    return table.column('PRODUCT_ID').to_pylist()
+
+
+def test_second_snapshot_keeps_only_changes(tmp_path, products):
+    first = detector(tmp_path)
+    assert first.first_load
+    batch = transform_batch(products[:5], TABLE, COLUMNS)
+    assert first.changed(batch).num_rows == 5
+    # Même hash par batch que la réconciliation ligne à ligne
+    assert list(first.current.values()) == [row_hash(row, first.col_types) for row in table_rows(batch)]
+    first.save()
+
+    products[1] = dict(products[1], name='Renamed')
+    snapshot = products[1:4] + [products[5]]
+    second = detector(tmp_path)
+    changed = second.changed(transform_batch(snapshot, TABLE, COLUMNS))
+    assert ids(changed) == [products[1]['product_id'], products[5]['product_id']]
+    assert sorted(second.deleted_keys()) == sorted([products[0]['product_id'], products[4]['product_id']])
+    assert dict(second.counts) == {'inserted': 1, 'updated': 1, 'unchanged': 2, 'deleted': 2}
+
+
+def test_rejected_rows_are_compared_again(tmp_path, products):
+    first = detector(tmp_path)
+    first.changed(transform_batch(products[:2], TABLE, COLUMNS))
+    first.save()
+
+    updated = [dict(products[0], name='Renamed'), products[1], products[2]]
+    second = detector(tmp_path)
+    changed = second.changed(transform_batch(updated, TABLE, COLUMNS))
+    # Seule la nouvelle ligne est chargée : la mise à jour rejetée garde son ancien hash
+    second.rejected(changed, changed.slice(1))
+    assert second.deleted_keys() == []
+    second.save()
+
+    third = detector(tmp_path)
+    assert ids(third.changed(transform_batch(updated, TABLE, COLUMNS))) == [products[0]['product_id']]
@@ -0,0 +1,66 @@
+"""Profil statistique : snapshots par sink et écarts entre runs"""
+
+import datetime
+import json
+
+from column_stats import diff_snapshots, latest_snapshot, profile_tables, save_snapshot
+from sinks import SQLiteSink
+from table_schemas import ALL_TABLES
+
+SUMMARY = 'SALES_DAILY_SUMMARY'
+COLUMNS = ['SALE_DATE', 'STORE_ID', 'CHANNEL', 'COUNTRY', 'SALES_COUNT', 'TOTAL_AMOUNT', 'TOTAL_QUANTITY']
+
+
+def table_stats(rows, maximum):
+    return {'rows': rows, 'columns': {'SALES_COUNT': {
+        'null_rate': 0.0, 'distinct': rows, 'min': 1, 'max': maximum, 'percentiles': {'p50': maximum / 2}}}}
+
+
+def write_snapshot(directory, created_at, sink, tables):
+    save_snapshot({'created_at': created_at, 'sink': sink, 'tables': tables}, str(directory))
+
+
+def test_snapshots_saved_in_the_same_instant_are_kept(tmp_path):
+    for _ in range(2):
+        write_snapshot(tmp_path, '2024-03-01T10:00:00.000000', 'sqlite', {SUMMARY: table_stats(1, 1)})
+    assert len(list(tmp_path.glob('profile_*.json'))) == 2
+
+
+def test_baseline_is_the_latest_profile_of_each_table_on_the_same_sink(tmp_path):
+    write_snapshot(tmp_path, '2024-03-01T10:00:00.000000', 'sqlite', {'A': table_stats(1, 1), 'B': table_stats(2, 2)})
+    write_snapshot(tmp_path, '2024-03-02T10:00:00.000000', 'sqlite', {'B': table_stats(3, 3)})
+    write_snapshot(tmp_path, '2024-03-03T10:00:00.000000', 'snowflake', {'A': table_stats(9, 9)})
+
+    baseline = latest_snapshot(str(tmp_path), 'sqlite', ['A', 'B'])
+    assert baseline['tables'] == {'A': table_stats(1, 1), 'B': table_stats(3, 3)}
+    assert baseline['created_at'] == {'A': '2024-03-01T10:00:00.000000', 'B': '2024-03-02T10:00:00.000000'}
+    assert latest_snapshot(str(tmp_path), 'snowflake', ['B']) is None
+
+
+def test_diff_reports_changed_statistics():
+    previous = {'tables': {SUMMARY: table_stats(10, 4)}}
+    assert diff_snapshots(previous, {'tables': {SUMMARY: table_stats(10, 4)}}) == []
+
+    changes = diff_snapshots(previous, {'tables': {SUMMARY: table_stats(12, 8), 'NEW': table_stats(1, 1)}})
+    assert (SUMMARY, None, 'rows', 10, 12) in changes
+    assert (SUMMARY, 'SALES_COUNT', 'max', 4, 8) in changes
+    assert (SUMMARY, 'SALES_COUNT', 'p50', 2.0, 4.0) in changes
+    assert ('NEW', None, 'nouvelle table', None, 1) in changes
+
+
+def test_profile_tables_on_sqlite(tmp_path, capsys):
+    day = datetime.date(2024, 3, 1)
+    with SQLiteSink(str(tmp_path / 'ingest.db')) as sink:
+        sink.create_table(SUMMARY, ALL_TABLES[SUMMARY])
+        sink.append_rows(SUMMARY, COLUMNS, [(day, 'ST3001', 'Online', 'France', 2, 30.5, 3)])
+        profile_tables(sink, [SUMMARY], snapshot_dir=str(tmp_path))
+        sink.append_rows(SUMMARY, COLUMNS, [(day, 'ST3002', 'Store', None, 5, 12.0, 6)])
+        snapshot = profile_tables(sink, [SUMMARY], snapshot_dir=str(tmp_path))
+
+    stats = snapshot['tables'][SUMMARY]
+    assert stats['rows'] == 2
+    assert stats['columns']['COUNTRY']['null_rate'] == 0.5
+    assert (stats['columns']['SALES_COUNT']['min'], stats['columns']['SALES_COUNT']['max']) == (2, 5)
+    assert "SALES_DAILY_SUMMARY rows: 1 → 2" in capsys.readouterr().out
+    saved = [json.loads(path.read_text()) for path in tmp_path.glob('profile_sqlite_*.json')]
+    assert len(saved) == 2
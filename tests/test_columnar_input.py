@@ -0,0 +1,55 @@
+"""Entrées colonnaires : Parquet et Arrow IPC projetés en mémoire, tranchés sans copie"""
+
+import pytest
+
+pa = pytest.importorskip('pyarrow')
+import pyarrow.parquet as pq
+
+from arrow_schemas import arrow_schema
+from columnar_input import input_format, input_rows, load_units, parquet_matches
+from table_schemas import insert_columns
+from transforms import read_batches, transform_batch
+
+TABLE = 'PROMOTIONS_DATA_SNOWPIPE'
+COLUMNS = insert_columns(TABLE)
+
+
+@pytest.fixture
+def promotions():
+    return [{'promotion_id': f'PR{n}', 'name': f'Promo {n}', 'discount_value': n + 0.5,
+             'start_date': '2024-01-10', 'is_active': n % 2 == 0} for n in range(7)]
+
+
+def write_ipc(path, table, stream=False):
+    with pa.OSFile(str(path), 'wb') as sink:
+        open_writer = pa.ipc.new_stream if stream else pa.ipc.new_file
+        with open_writer(sink, table.schema) as writer:
+            for batch in table.to_batches(max_chunksize=4):
+                writer.write_batch(batch)
+
+
+@pytest.mark.parametrize('name', ['promotions.arrow', 'promotions.ipc', 'promotions.parquet'])
+def test_columnar_units_match_json_batches(tmp_path, promotions, name):
+    path = tmp_path / name
+    raw = pa.Table.from_pylist(promotions)
+    if input_format(str(path)) == 'parquet':
+        pq.write_table(raw, path, row_group_size=4)
+    else:
+        write_ipc(path, raw, stream=name.endswith('.ipc'))
+
+    assert input_rows(str(path)) == 7
+    # Tranches de 3 lignes au plus, sans franchir les record batches (4 + 3 lignes)
+    assert [unit.num_rows for unit in load_units(str(path), 3)] == [3, 1, 3]
+    tables = list(read_batches(str(path), TABLE, COLUMNS, 3))
+    assert pa.concat_tables(tables) == transform_batch(promotions, TABLE, COLUMNS)
+
+
+def test_parquet_at_target_schema_is_detected(tmp_path, promotions):
+    typed = transform_batch(promotions, TABLE, COLUMNS)
+    pq.write_table(typed, tmp_path / 'typed.parquet')
+    pq.write_table(pa.Table.from_pylist(promotions), tmp_path / 'raw.parquet')
+
+    schema = arrow_schema(TABLE, COLUMNS)
+    assert parquet_matches(str(tmp_path / 'typed.parquet'), schema)
+    assert not parquet_matches(str(tmp_path / 'raw.parquet'), schema)
+    assert input_format(str(tmp_path / 'promotions.json')) is None
@@ -0,0 +1,49 @@
+"""Fenêtre bornée de COPY asynchrones, sur un sink factice"""
+
+import pytest
+
+from sinks import CopyWindow
+
+
+class FakeAsyncSink:
+    def __init__(self, failing=()):
+        self.failing = set(failing)
+        self.outstanding = 0
+        self.max_outstanding = 0
+        self.waited = []
+
+    def submit_staged_file(self, table_name, path):
+        self.outstanding += 1
+        self.max_outstanding = max(self.max_outstanding, self.outstanding)
+        return path
+
+    def wait_staged_file(self, handle):
+        self.outstanding -= 1
+        self.waited.append(handle)
+        if handle in self.failing:
+            raise RuntimeError(f"COPY {handle} failed")
+        return 10
+
+
+def test_window_bounds_copies_in_flight():
+    sink = FakeAsyncSink()
+    window = CopyWindow(sink, max_in_flight=2)
+    for number in range(1, 6):
+        window.submit('ITEMS', f'items_{number}.parquet', number)
+        assert sink.outstanding <= 2
+    assert window.drain() == 50
+    assert sink.max_outstanding == 2
+    # Résultats vérifiés dans l'ordre de soumission
+    assert sink.waited == [f'items_{number}.parquet' for number in range(1, 6)]
+
+
+def test_failed_copy_stops_submissions_after_in_flight_copies():
+    sink = FakeAsyncSink(failing={'items_1.parquet'})
+    window = CopyWindow(sink, max_in_flight=2)
+    window.submit('ITEMS', 'items_1.parquet', 1)
+    window.submit('ITEMS', 'items_2.parquet', 2)
+    with pytest.raises(RuntimeError, match='batch 1: COPY items_1.parquet failed'):
+        window.submit('ITEMS', 'items_3.parquet', 3)
+    # Le COPY déjà en vol est attendu, le suivant n'est jamais soumis
+    assert sink.waited == ['items_1.parquet', 'items_2.parquet']
+    assert window.rows_loaded == 10
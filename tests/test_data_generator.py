@@ -0,0 +1,41 @@
+"""Mode --append du générateur"""
+
+import json
+
+import pytest
+
+pytest.importorskip('faker')
+
+from data_generator import DataGenerator, GenerationConfig
+
+
+def read_records(directory, pattern):
+    return [json.loads(line) for path in sorted(directory.glob(pattern)) for line in path.read_text().splitlines()]
+
+
+def test_append_products_without_suppliers(tmp_path):
+    config = GenerationConfig(output_dir=tmp_path, append=True, products=10,
+                              promotions=0, returns=0, reviews=0, inventory=0)
+    DataGenerator(config).generate_all()
+
+    # Aucun fournisseur existant : le delta en génère pour que les produits aient une référence valide
+    suppliers = {record['supplier_id'] for record in read_records(tmp_path, 'suppliers*.json')}
+    products = read_records(tmp_path, 'products*.json')
+    assert len(products) == 10
+    assert suppliers and {record['supplier_id'] for record in products} <= suppliers
+
+
+def test_facts_reference_generated_ids(tmp_path):
+    config = GenerationConfig(output_dir=tmp_path, sales=30, products=15, customers=12, stores=3,
+                              promotions=0, returns=40, reviews=40, inventory=40)
+    DataGenerator(config).generate_all()
+
+    ids = {key: {record[key] for record in read_records(tmp_path, pattern)}
+           for key, pattern in [('sale_id', 'sales*.json'), ('product_id', 'products*.json'),
+                                ('customer_id', 'customers*.json'), ('store_id', 'stores*.json')]}
+    # Retours, avis et inventaire ne référencent que des IDs du dataset (pas de ranges codées en dur)
+    for pattern in ('returns*.json', 'reviews*.json', 'inventory*.json'):
+        for record in read_records(tmp_path, pattern):
+            for key, known in ids.items():
+                if key in record:
+                    assert record[key] in known, (pattern, key, record[key])
@@ -0,0 +1,50 @@
+"""Déduplication par clé primaire, en mémoire et avec partitions sur disque"""
+
+import random
+
+import pytest
+
+from dedup import Deduplicator
+
+COLUMNS = ['SALE_ID', 'POSITION', 'VERSION']
+
+
+def source(count=400, keys=90):
+    rng = random.Random(7)
+    return [(f'S{rng.randrange(keys)}', position, rng.choice([None, 1, 2, 3])) for position in range(count)]
+
+
+def expected(rows, keep):
+    winners = {}
+    for row in rows:
+        current = winners.get(row[0])
+        if keep == 'first':
+            better = current is None
+        elif keep == 'last':
+            better = True
+        else:
+            better = current is None or (row[2] is not None, row[2] or 0) >= (current[2] is not None, current[2] or 0)
+        if better:
+            winners[row[0]] = row
+    return sorted(winners.values(), key=lambda row: row[1])
+
+
+@pytest.mark.parametrize('keep', ['first', 'last', 'version'])
+@pytest.mark.parametrize('max_rows', [1000, 8])
+def test_keeps_one_row_per_key_in_source_order(tmp_path, keep, max_rows):
+    rows = source()
+    dedup = Deduplicator('SALES_DATA', COLUMNS, keep=keep, version_column='VERSION' if keep == 'version' else None,
+                         max_rows=max_rows, temp_dir=str(tmp_path))
+    assert list(dedup.rows(iter(rows))) == expected(rows, keep)
+    assert dedup.dropped == len(rows) - len(expected(rows, keep))
+
+    # Budget dépassé : déduplication sur disque, fichiers temporaires supprimés à la fin
+    assert (dedup.partition_files > 0) == (max_rows < 90)
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_missing_version_column_keeps_last(tmp_path):
+    rows = source(50, 10)
+    dedup = Deduplicator('SALES_DATA', COLUMNS[:2], version_column='UPDATED_AT', temp_dir=str(tmp_path))
+    assert dedup.keep == 'last'
+    assert list(dedup.rows(row[:2] for row in rows)) == [row[:2] for row in expected(rows, 'last')]
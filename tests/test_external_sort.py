@@ -0,0 +1,47 @@
+"""Tri externe à mémoire bornée (external_sort.py)"""
+
+import random
+
+import external_sort
+from external_sort import cluster_sort_key, external_sort as sort_rows
+
+
+def test_sorted_and_stable_across_runs(tmp_path):
+    rng = random.Random(7)
+    rows = [(rng.randrange(20), i) for i in range(1000)]
+    result = list(sort_rows(iter(rows), key=lambda row: row[0], max_rows=50, temp_dir=str(tmp_path)))
+    # Tri stable : à clé égale, l'ordre source (second champ croissant) est conservé
+    assert result == sorted(rows, key=lambda row: row[0])
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_in_memory_when_rows_fit(tmp_path):
+    assert list(sort_rows([3, 1, 2], key=lambda row: row, max_rows=10, temp_dir=str(tmp_path))) == [1, 2, 3]
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_open_runs_bounded_by_fan_in(tmp_path, monkeypatch):
+    read_run = external_sort._read_run
+    state = {'open': 0, 'max': 0}
+
+    def counting_read_run(path):
+        state['open'] += 1
+        state['max'] = max(state['max'], state['open'])
+        try:
+            yield from read_run(path)
+        finally:
+            state['open'] -= 1
+
+    monkeypatch.setattr(external_sort, '_read_run', counting_read_run)
+    rows = list(range(500, 0, -1))
+    # 100 runs de 5 lignes, fusionnés 4 par 4 en plusieurs passes
+    result = list(sort_rows(rows, key=lambda row: row, max_rows=5, temp_dir=str(tmp_path), max_open_runs=4))
+    assert result == sorted(rows)
+    assert state['max'] <= 4
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_cluster_sort_key_puts_nulls_last():
+    key = cluster_sort_key(['ID', 'DAY'], ['DAY'])
+    rows = [(1, None), (2, '2024-01-02'), (3, '2024-01-01')]
+    assert [row[0] for row in sorted(rows, key=key)] == [3, 2, 1]
@@ -0,0 +1,73 @@
+"""DAG du pipeline : relances, reset avant relance et propagation des échecs"""
+
+import sqlite3
+
+import pytest
+
+from orchestrator import Pipeline, load_transactional_task, reset_transactional_task, setup_transactional_task
+
+
+def flaky(failures, calls):
+    def action():
+        calls.append('action')
+        if calls.count('action') <= failures:
+            raise RuntimeError("panne passagère")
+        return calls.count('action')
+    return action
+
+
+def test_retry_runs_reset_before_each_new_attempt():
+    calls = []
+    pipeline = Pipeline(max_workers=1, retries=2, retry_delay=0)
+    pipeline.add('load', flaky(2, calls), reset=lambda: calls.append('reset'))
+    assert pipeline.run()
+    node = pipeline.nodes['load']
+    assert node.attempts == 3
+    assert calls == ['action', 'reset', 'action', 'reset', 'action']
+
+
+def test_failed_task_skips_descendants_only():
+    ran = []
+    pipeline = Pipeline(max_workers=2, retries=1, retry_delay=0)
+    pipeline.add('generate', lambda: ran.append('generate'))
+    pipeline.add('load', flaky(5, []), ['generate'])
+    pipeline.add('validate', lambda: ran.append('validate'), ['load'])
+    pipeline.add('report', lambda: ran.append('report'), ['validate'])
+    pipeline.add('other', lambda: ran.append('other'), ['generate'])
+
+    assert not pipeline.run()
+    statuses = {name: node.status for name, node in pipeline.nodes.items()}
+    assert statuses == {'generate': 'success', 'load': 'failed', 'validate': 'skipped',
+                        'report': 'skipped', 'other': 'success'}
+    assert pipeline.nodes['load'].attempts == 2
+    assert sorted(ran) == ['generate', 'other']
+    summary = pipeline.summary()
+    assert [node['status'] for node in summary['nodes']] == list(statuses.values())
+
+
+def test_retried_append_load_does_not_duplicate_rows(tmp_path, monkeypatch):
+    pytest.importorskip('pyarrow')
+    db_path = str(tmp_path / 'ingest.db')
+    monkeypatch.setenv('INGEST_SQLITE_PATH', db_path)
+    path = tmp_path / 'reviews.json'
+    path.write_text(''.join(
+        f'{{"review_id": "R{i}", "product_id": "P1", "customer_id": "C1", "rating": 5, "title": "t", '
+        f'"review_date": "2024-01-01", "verified_purchase": true, "helpful_votes": 0, "status": "ok"}}\n'
+        for i in range(5)))
+    setup_transactional_task('sqlite', 'test')()
+    load = load_transactional_task('reviews', str(path), 2, 'sqlite', 'test')
+    attempts = []
+
+    def interrupted_load():
+        result = load()
+        attempts.append(result)
+        if len(attempts) == 1:
+            # Première tentative : lignes commitées, puis échec avant la fin de la tâche
+            raise RuntimeError("connexion perdue")
+        return result
+
+    pipeline = Pipeline(max_workers=1, retries=1, retry_delay=0)
+    pipeline.add('load_reviews', interrupted_load, reset=reset_transactional_task('reviews', 'sqlite', 'test'))
+    assert pipeline.run()
+    with sqlite3.connect(db_path) as conn:
+        assert conn.execute("SELECT COUNT(*) FROM REVIEWS_DATA").fetchone()[0] == 5
@@ -0,0 +1,94 @@
+"""Stand-in local du mode pipe : chargement, historique et fichiers déjà chargés"""
+
+import sqlite3
+
+import pytest
+
+pa = pytest.importorskip('pyarrow')
+import pyarrow.parquet as pq
+
+from pipe_loader import LOADED, PENDING, LocalPipeLoader, PipeFeed, SnowflakePipeLoader
+from sinks import SQLiteSink
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    path = str(tmp_path / 'ingest.db')
+    with SQLiteSink(path) as sink:
+        sink.create_table('ITEMS', [('ID', 'NUMBER'), ('NAME', 'VARCHAR')])
+    return path
+
+
+def write_batch(tmp_path, name, ids):
+    path = tmp_path / name
+    pq.write_table(pa.table({'ID': ids, 'NAME': [f"item {i}" for i in ids]}), path)
+    return str(path)
+
+
+def row_count(db_path):
+    with sqlite3.connect(db_path) as conn:
+        return conn.execute("SELECT COUNT(*) FROM ITEMS").fetchone()[0]
+
+
+def test_feed_loads_files_and_records_history(tmp_path, db_path):
+    stage_dir = str(tmp_path / 'stage')
+    loader = LocalPipeLoader(db_path, stage_dir)
+    feed = PipeFeed(loader, files_per_notify=2)
+    feed.submit('ITEMS', write_batch(tmp_path, 'items_1.parquet', [1, 2, 3]), 1)
+    feed.submit('ITEMS', write_batch(tmp_path, 'items_2.parquet', [4, 5]), 2)
+    feed.submit('ITEMS', write_batch(tmp_path, 'items_3.parquet', [6]), 3)
+    assert feed.drain() == 6
+    loader.close()
+    assert row_count(db_path) == 6
+
+    # Historique persistant : relu par un autre loader sur le même stage
+    reopened = LocalPipeLoader(db_path, stage_dir)
+    history = reopened.load_history('ITEMS', ['items_1.parquet', 'items_3.parquet', 'unknown.parquet'])
+    reopened.close()
+    assert history['items_1.parquet'] == {'status': LOADED, 'rows': 3, 'error': None}
+    assert history['items_3.parquet']['rows'] == 1
+    assert history['unknown.parquet']['status'] == PENDING
+
+
+def test_loaded_file_is_not_loaded_twice(tmp_path, db_path):
+    loader = LocalPipeLoader(db_path, str(tmp_path / 'stage'))
+    path = write_batch(tmp_path, 'items_1.parquet', [1, 2])
+    file_name = loader.stage_file('ITEMS', path)
+    loader.notify('ITEMS', [file_name])
+    # Même fichier déposé et notifié une seconde fois
+    loader.stage_file('ITEMS', path)
+    loader.notify('ITEMS', [file_name])
+    loader.close()
+
+    assert row_count(db_path) == 2
+    assert loader.load_history('ITEMS', [file_name])[file_name] == {'status': LOADED, 'rows': 2, 'error': None}
+
+
+def test_failed_file_is_reported(tmp_path, db_path):
+    loader = LocalPipeLoader(db_path, str(tmp_path / 'stage'))
+    feed = PipeFeed(loader, timeout=5)
+    feed.submit('MISSING_TABLE', write_batch(tmp_path, 'items_1.parquet', [1]), 1)
+    with pytest.raises(RuntimeError, match='batch 1 LOAD_FAILED'):
+        feed.drain()
+    loader.close()
+
+
+class FakeSnowflake:
+    def __init__(self):
+        self.queries = []
+
+    def execute_query(self, query):
+        self.queries.append(' '.join(query.split()))
+        return []
+
+
+def test_snowpipe_refreshed_once_per_table(tmp_path):
+    sf = FakeSnowflake()
+    feed = PipeFeed(SnowflakePipeLoader(sf), files_per_notify=10, wait=False)
+    for number in range(1, 4):
+        feed.submit('ITEMS', str(tmp_path / f'items_{number}.parquet'), number)
+    feed.submit('OTHERS', str(tmp_path / 'others_1.parquet'), 4)
+    feed.drain()
+
+    refreshes = [query for query in sf.queries if query.startswith('ALTER PIPE')]
+    assert refreshes == ["ALTER PIPE ITEMS_PIPE REFRESH", "ALTER PIPE OTHERS_PIPE REFRESH"]
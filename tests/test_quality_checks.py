@@ -0,0 +1,60 @@
+"""Contrôles qualité vectorisés : règles, clés étrangères et quarantaine"""
+
+import json
+
+import pytest
+
+pytest.importorskip('numpy')
+pytest.importorskip('pyarrow')
+
+from quality_checks import BatchValidator, IdBitmap
+from table_schemas import insert_columns
+from transforms import transform_batch
+
+TABLE = 'REVIEWS_DATA'
+
+
+def write_ndjson(path, records):
+    path.write_text(''.join(json.dumps(record) + '\n' for record in records))
+
+
+@pytest.fixture
+def data_dir(tmp_path):
+    write_ndjson(tmp_path / 'products.json', [{'product_id': f'P{n}'} for n in (2001, 2002, 2010)])
+    write_ndjson(tmp_path / 'customers.json', [{'customer_id': f'C{n}'} for n in range(1001, 1006)])
+    return tmp_path
+
+
+def review(review_id, product_id='P2001', customer_id='C1001', rating=5, status='Published'):
+    return {'review_id': review_id, 'product_id': product_id, 'customer_id': customer_id,
+            'rating': rating, 'status': status, 'review_date': '2024-03-01'}
+
+
+def test_id_bitmap_membership(data_dir):
+    import pyarrow as pa
+
+    ids = IdBitmap.from_file(str(data_dir / 'products.json'), 'product_id')
+    column = pa.array(['P2001', 'P2003', 'P2010', 'P99999', 'C2001', None])
+    assert ids.contains(column).tolist() == [True, False, True, False, False, True]
+
+
+def test_violations_are_quarantined(data_dir, tmp_path):
+    validator = BatchValidator(TABLE, data_dir=str(data_dir), quarantine_dir=str(tmp_path / 'quarantine'))
+    batch = transform_batch([
+        review('REV1'),
+        review('REV2', rating=6),
+        review('REV3', product_id='P2003'),
+        review('REV4', customer_id=None, status='Hidden'),
+        review('REV5', product_id='P2010', customer_id='C1005'),
+    ], TABLE, insert_columns(TABLE))
+
+    valid = validator.filter(batch)
+    assert valid.column('REVIEW_ID').to_pylist() == ['REV1', 'REV5']
+    assert validator.quarantined == 3
+
+    quarantined = [json.loads(line) for line in open(validator.quarantine_path)]
+    assert {row['REVIEW_ID']: row['_violations'] for row in quarantined} == {
+        'REV2': ['RATING hors [1, 5]'],
+        'REV3': ['PRODUCT_ID absent de products'],
+        'REV4': ['CUSTOMER_ID NOT NULL', 'STATUS valeur inconnue'],
+    }
@@ -0,0 +1,55 @@
+"""Réconciliation par hash entre un fichier d'entrée et la table chargée (SQLite)"""
+
+import json
+
+import pytest
+
+pytest.importorskip('pyarrow')
+
+from reconciliation import reconcile_table
+from sinks import SQLiteSink
+from table_schemas import ALL_TABLES, insert_columns
+from transforms import read_batches, table_rows
+
+TABLE = 'STORES_DATA_SNOWPIPE'
+COLUMNS = insert_columns(TABLE)
+
+
+@pytest.fixture
+def stores(tmp_path):
+    # Champs alternatifs (name, square_meters) et adresse en objet : normalisés comme à l'ingestion
+    records = [
+        {'store_id': f'ST{3001 + i}', 'name': f'Boutique {i}', 'square_meters': 100 + i,
+         'address': {'street': f'{i} rue de Rivoli', 'city': 'Paris', 'country': 'France'}}
+        for i in range(8)
+    ]
+    path = tmp_path / 'stores.json'
+    path.write_text(''.join(json.dumps(record) + '\n' for record in records))
+    return str(path)
+
+
+@pytest.fixture
+def sink(tmp_path, stores):
+    with SQLiteSink(str(tmp_path / 'ingest.db')) as sink:
+        sink.create_table(TABLE, ALL_TABLES[TABLE])
+        for table in read_batches(stores, TABLE, COLUMNS, 3):
+            sink.append_rows(TABLE, COLUMNS, table_rows(table))
+        yield sink
+
+
+def test_loaded_table_matches_its_file(sink, stores):
+    result = reconcile_table(sink, TABLE, stores)
+    assert result['match']
+    assert result['local_rows'] == result['table_rows'] == 8
+
+
+def test_bisect_locates_divergent_rows(sink, stores):
+    sink.query(f"UPDATE {TABLE} SET STORE_NAME = 'Renommée' WHERE STORE_ID = 'ST3002'")
+    sink.query(f"DELETE FROM {TABLE} WHERE STORE_ID = 'ST3005'")
+    sink.connection.commit()
+
+    result = reconcile_table(sink, TABLE, stores, bisect=True, bucket_width=2)
+    assert not result['match']
+    assert result['diff']['different'] == ['ST3002']
+    assert result['diff']['missing_in_table'] == ['ST3005']
+    assert result['diff']['unexpected_in_table'] == []
@@ -0,0 +1,39 @@
+"""Profil d'un run Snowflake à partir de QUERY_HISTORY, sur un curseur factice"""
+
+import datetime
+
+from snowflake_check_data import fetch_run_queries, summarize_run
+
+START = datetime.datetime(2024, 3, 1, 10, 0, 0)
+
+
+class FakeCursor:
+    def __init__(self, history):
+        self.rows = []
+        for index, (query_type, text) in enumerate(history):
+            start = START + datetime.timedelta(seconds=index)
+            end = start + datetime.timedelta(milliseconds=500)
+            self.rows.append((f"q{index}", query_type, text, 'SUCCESS', start, end, 500, 0, 50, 400, 1, 10))
+
+    def execute(self, query, params=None):
+        pass
+
+    def fetchall(self):
+        return self.rows
+
+
+def test_run_queries_include_transactions_deletes_and_alters():
+    history = [
+        ('BEGIN_TRANSACTION', 'BEGIN'),
+        ('ALTER_WAREHOUSE', 'ALTER WAREHOUSE INGEST SET WAREHOUSE_SIZE = LARGE'),
+        ('ALTER_TABLE_ADD_COLUMN', 'ALTER TABLE PRODUCTS_STAGING ADD COLUMN _LOAD_FILE VARCHAR'),
+        ('DELETE', 'DELETE FROM SALES_DATA t USING SALES_STAGING s WHERE t.SALE_ID = s.SALE_ID'),
+        ('INSERT', 'INSERT INTO SALES_DATA (SALE_ID) VALUES (%s)'),
+        ('COMMIT', 'COMMIT'),
+        ('GRANT', 'GRANT SELECT ON TABLE SALES_DATA TO ROLE REPORTING'),
+    ]
+    queries = fetch_run_queries(FakeCursor(history), 'ingest-run')
+
+    assert [q['query_type'] for q in queries] == [query_type for query_type, _ in history[:-1]]
+    assert [q['table'] for q in queries][2:5] == ['PRODUCTS_STAGING', 'SALES_DATA', 'SALES_DATA']
+    assert summarize_run(queries) is not None
@@ -0,0 +1,55 @@
+"""Rechargements complets par table fantôme et échange, sur SQLite"""
+
+import pytest
+
+import shadow_tables
+from sinks import SQLiteSink
+
+TABLE = 'ITEMS'
+
+
+@pytest.fixture
+def sink(tmp_path):
+    with SQLiteSink(str(tmp_path / 'ingest.db')) as sink:
+        load(sink, TABLE, 4)
+        yield sink
+
+
+def load(sink, table_name, rows):
+    sink.create_table(table_name, [('ID', 'INTEGER')], replace=True)
+    sink.append_rows(table_name, ['ID'], [(i,) for i in range(rows)])
+
+
+def reload(sink, rows, keep_versions=2):
+    load(sink, shadow_tables.shadow_name(TABLE), rows)
+    return shadow_tables.publish(sink, TABLE, rows, keep_versions)
+
+
+def test_publish_keeps_previous_versions_and_rolls_back(sink):
+    first = reload(sink, 5)
+    assert sink.row_count(TABLE) == 5
+    assert sink.row_count(first) == 4
+    assert shadow_tables.shadow_name(TABLE) not in sink.list_tables(TABLE)
+
+    # Deux publications dans la même seconde : versions distinctes, les plus anciennes purgées
+    second = reload(sink, 6)
+    third = reload(sink, 7)
+    assert shadow_tables.versions(sink, TABLE) == [second, third]
+
+    assert shadow_tables.rollback(sink, TABLE) == third
+    assert sink.row_count(TABLE) == 6
+    # Un second rollback annule le premier
+    shadow_tables.rollback(sink, TABLE)
+    assert sink.row_count(TABLE) == 7
+
+
+def test_invalid_shadow_is_not_published(sink):
+    load(sink, shadow_tables.shadow_name(TABLE), 3)
+    with pytest.raises(RuntimeError, match='3 lignes chargées, 5 attendues'):
+        shadow_tables.publish(sink, TABLE, 5)
+    with pytest.raises(RuntimeError, match='rechargement non publié'):
+        shadow_tables.publish(sink, TABLE, 3, min_ratio=0.9)
+
+    shadow_tables.discard(sink, TABLE)
+    assert sink.row_count(TABLE) == 4
+    assert sink.list_tables(TABLE) == [TABLE]
@@ -0,0 +1,24 @@
+"""Requêtes du sink Snowflake, sur une connexion factice"""
+
+from sinks import SnowflakeSink
+
+
+class FakeSnowflake:
+    def __init__(self):
+        self.queries = []
+
+    def execute_query(self, query):
+        self.queries.append(' '.join(query.split()))
+        return [(1, 2)]
+
+
+def test_merge_keeps_last_loaded_duplicate():
+    sf = FakeSnowflake()
+    sink = SnowflakeSink(sf)
+    sink.create_staging_table('PRODUCTS_STAGING', 'PRODUCTS')
+    assert 'PRODUCTS_STAGING' in sink.staging_tables
+    assert sf.queries[1] == "ALTER TABLE PRODUCTS_STAGING ADD COLUMN _LOAD_FILE VARCHAR, _LOAD_ROW NUMBER"
+
+    assert sink.merge_table('PRODUCTS_STAGING', 'PRODUCTS', ['PRODUCT_ID'], ['PRODUCT_ID', 'NAME']) == (1, 2)
+    assert ("QUALIFY ROW_NUMBER() OVER (PARTITION BY PRODUCT_ID ORDER BY _LOAD_FILE DESC, _LOAD_ROW DESC) = 1"
+            in sf.queries[-1])
@@ -0,0 +1,56 @@
+"""Transactions groupées du binding server, sur une connexion factice"""
+
+import pytest
+
+from snowflake_config import SnowflakeConnection
+
+
+class FakeCursor:
+    def __init__(self, statements):
+        self.statements = statements
+        self.sfqid = None
+        self.rowcount = 0
+
+    def execute(self, query):
+        self.statements.append(query)
+
+    def executemany(self, query, data):
+        self.statements.append('INSERT')
+        self.rowcount = len(data)
+
+    def fetchall(self):
+        return []
+
+    def close(self):
+        self.statements.append('CLOSE CURSOR')
+
+
+class FakeConnection:
+    _paramstyle = 'qmark'
+
+    def __init__(self):
+        self.statements = []
+
+    def cursor(self):
+        return FakeCursor(self.statements)
+
+    def close(self):
+        self.statements.append('CLOSE')
+
+
+def test_clean_exit_commits_pending_batches():
+    connection = FakeConnection()
+    with SnowflakeConnection(connection, binding='server', commit_every=10) as sf:
+        sf.execute_batch("INSERT INTO T VALUES (?)", [(1,), (2,)])
+    assert connection.statements == ['BEGIN', 'INSERT', 'COMMIT', 'CLOSE CURSOR', 'CLOSE']
+
+
+def test_exception_rolls_back_pending_batches():
+    connection = FakeConnection()
+    with pytest.raises(RuntimeError):
+        with SnowflakeConnection(connection, binding='server', commit_every=10) as sf:
+            sf.execute_batch("INSERT INTO T VALUES (?)", [(1,)])
+            sf.execute_batch("INSERT INTO T VALUES (?)", [(2,)])
+            raise RuntimeError("chargement interrompu")
+    assert connection.statements == ['BEGIN', 'INSERT', 'INSERT', 'ROLLBACK', 'CLOSE CURSOR', 'CLOSE']
+    assert sf.pending_batches == 0
@@ -0,0 +1,53 @@
+"""Ingester Snowpipe sur le sink SQLite (chemin par défaut, sans --trace)"""
+
+import os
+import json
+import sqlite3
+
+import pytest
+
+pytest.importorskip('pyarrow')
+
+import tracing
+from ingester_snowpipe import process_any_data_type
+
+PRODUCTS = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'products.json')
+
+
+@pytest.fixture
+def products(tmp_path):
+    path = tmp_path / 'products.json'
+    with open(PRODUCTS) as source:
+        path.write_text(''.join(line for _, line in zip(range(25), source)))
+    return str(path)
+
+
+def test_append_without_tracing(tmp_path, monkeypatch, products):
+    db_path = str(tmp_path / 'ingest.db')
+    monkeypatch.setenv('INGEST_SQLITE_PATH', db_path)
+    monkeypatch.chdir(tmp_path)
+    assert tracing._tracer is None
+
+    # Plusieurs batches : l'échec se produisait après le premier
+    assert process_any_data_type(products, 'products', 10, sink_kind='sqlite') == 25
+
+    with sqlite3.connect(db_path) as conn:
+        assert conn.execute("SELECT COUNT(*) FROM PRODUCTS_DATA_SNOWPIPE").fetchone()[0] == 25
+
+
+def test_upsert_keeps_last_duplicate(tmp_path, monkeypatch, products):
+    db_path = str(tmp_path / 'ingest.db')
+    monkeypatch.setenv('INGEST_SQLITE_PATH', db_path)
+    monkeypatch.chdir(tmp_path)
+    with open(products) as f:
+        first = json.loads(f.readline())
+    with open(products, 'a') as f:
+        # Même PRODUCT_ID renvoyé plus loin dans le fichier, dans un autre batch
+        f.write(json.dumps(dict(first, name='Version corrigée')) + '\n')
+
+    assert process_any_data_type(products, 'products', 10, sink_kind='sqlite', mode='upsert') == 26
+
+    with sqlite3.connect(db_path) as conn:
+        assert conn.execute("SELECT COUNT(*) FROM PRODUCTS_DATA_SNOWPIPE").fetchone()[0] == 25
+        assert conn.execute("SELECT NAME FROM PRODUCTS_DATA_SNOWPIPE WHERE PRODUCT_ID = ?",
+                            (first['product_id'],)).fetchone()[0] == 'Version corrigée'
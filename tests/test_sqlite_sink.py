@@ -0,0 +1,43 @@
+"""Sink SQLite local : fidélité des valeurs et parité avec Snowflake"""
+
+import datetime
+import sqlite3
+from decimal import Decimal
+
+from sinks import SQLiteSink
+
+COLUMNS = [('ID', 'VARCHAR(10)'), ('AMOUNT', 'DECIMAL(38,18)'), ('DAY', 'DATE')]
+
+
+def test_values_converted_locally(tmp_path):
+    with SQLiteSink(str(tmp_path / 'ingest.db')) as sink:
+        sink.create_table('T', COLUMNS)
+        sink.append_rows('T', ['ID', 'AMOUNT', 'DAY'], [
+            ('A', Decimal('12345678901234567.00'), datetime.date(2024, 3, 1)),
+            ('B', Decimal('10.10'), None),
+        ])
+        # Entier au-delà de 2**53 : gardé exact (un float l'arrondirait)
+        assert sink.query("SELECT AMOUNT, DAY FROM T ORDER BY ID") == [
+            (12345678901234567, '2024-03-01'), (10.1, None)]
+        assert sink.query("SELECT ID FROM T WHERE AMOUNT > ?", (Decimal('10.05'),)) == [('A',), ('B',)]
+    # Aucun adaptateur global : les autres utilisateurs de sqlite3 ne sont pas affectés
+    assert (Decimal, sqlite3.PrepareProtocol) not in sqlite3.adapters
+
+
+def test_append_rerun_keeps_duplicates_like_snowflake(tmp_path):
+    with SQLiteSink(str(tmp_path / 'ingest.db')) as sink:
+        sink.create_table('T', COLUMNS, primary_key=['ID'])
+        for _ in range(2):
+            sink.append_rows('T', ['ID', 'AMOUNT'], [('A', Decimal('1.5'))])
+        assert sink.row_count('T') == 2
+
+
+def test_merge_keeps_last_occurrence(tmp_path):
+    with SQLiteSink(str(tmp_path / 'ingest.db')) as sink:
+        sink.create_table('T', COLUMNS, primary_key=['ID'])
+        sink.append_rows('T', ['ID', 'AMOUNT'], [('A', Decimal('1')), ('B', Decimal('2'))])
+        sink.create_staging_table('T_STAGING', 'T')
+        sink.append_rows('T_STAGING', ['ID', 'AMOUNT'],
+                         [('A', Decimal('5')), ('A', Decimal('6')), ('B', Decimal('2')), ('C', Decimal('3'))])
+        assert sink.merge_table('T_STAGING', 'T', ['ID'], ['ID', 'AMOUNT']) == (1, 1)
+        assert sink.query("SELECT ID, AMOUNT FROM T ORDER BY ID") == [('A', 6), ('B', 2), ('C', 3)]
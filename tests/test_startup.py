@@ -0,0 +1,10 @@
+"""Imports paresseux : aucune dépendance lourde chargée au démarrage des CLI"""
+
+import pytest
+
+from bench_startup import CLI_RUNS, heavy_imports
+
+
+@pytest.mark.parametrize('script, args', CLI_RUNS, ids=[' '.join([s, *a]) for s, a in CLI_RUNS])
+def test_cli_starts_without_heavy_imports(script, args):
+    assert heavy_imports(script, args) == []
@@ -0,0 +1,53 @@
+"""Micro-batches du mode continu (streaming.py)"""
+
+import io
+
+import pytest
+
+from streaming import MicroBatchStream
+
+
+class FailingSink:
+    def __init__(self):
+        self.calls = []
+
+    def append_rows(self, table_name, columns, batch):
+        self.calls.append(list(batch))
+        raise RuntimeError("sink indisponible")
+
+
+class RecordingSink:
+    def __init__(self):
+        self.calls = []
+
+    def append_rows(self, table_name, columns, batch):
+        self.calls.append(list(batch))
+
+
+@pytest.fixture
+def stdin(monkeypatch):
+    # EOF de stdin : fin du flux et flush final des lignes en attente
+    monkeypatch.setattr('sys.stdin', io.StringIO(''.join(f'{{"id": {i}}}\n' for i in range(3))))
+
+
+def test_failed_flush_is_not_sent_again(stdin):
+    sink = FailingSink()
+    stream = MicroBatchStream(sink, 'T', ['ID'], lambda record: (record['id'],), max_rows=2)
+    with pytest.raises(RuntimeError):
+        stream.run('-')
+    assert sink.calls == [[(0,), (1,)]]
+
+
+def test_final_flush_sends_remaining_rows(stdin):
+    sink = RecordingSink()
+    stream = MicroBatchStream(sink, 'T', ['ID'], lambda record: (record['id'],), max_rows=2, max_latency_ms=60_000)
+    assert stream.run('-') == 3
+    assert sink.calls == [[(0,), (1,)], [(2,)]]
+
+
+def test_reader_error_is_raised(tmp_path):
+    sink = RecordingSink()
+    stream = MicroBatchStream(sink, 'T', ['ID'], lambda record: (record['id'],))
+    with pytest.raises(RuntimeError, match='absent.json'):
+        stream.run(str(tmp_path / 'absent.json'))
+    assert sink.calls == []
@@ -0,0 +1,70 @@
+"""Synthèse des ventes maintenue pendant l'ingestion (summaries.py)"""
+
+import io
+import json
+import sqlite3
+from decimal import Decimal
+
+import pytest
+
+from ingester_direct import MultiTableIngester
+from sinks import SQLiteSink
+from summaries import SalesSummary
+from table_schemas import insert_columns
+
+
+def sale(sale_id, amount, quantity=1, day='2024-03-01', store='ST3001'):
+    return {'sale_id': sale_id, 'sale_date': day, 'customer_id': 'C1001', 'product_id': 'P2001',
+            'product_name': 'Chanel Jupe Vintage', 'quantity': quantity, 'unit_price': amount,
+            'total_amount': amount, 'channel': 'Boutique', 'store_id': store, 'country': 'France'}
+
+
+@pytest.fixture
+def sales_file(tmp_path):
+    path = tmp_path / 'sales.json'
+    records = [sale('S1', 10.1), sale('S2', 20.2, quantity=2), sale('S3', 5.0, store='ST3002')]
+    path.write_text(''.join(json.dumps(record) + '\n' for record in records))
+    return str(path)
+
+
+def summary_rows(db_path):
+    with sqlite3.connect(db_path) as conn:
+        return conn.execute("SELECT STORE_ID, SALES_COUNT, TOTAL_AMOUNT, TOTAL_QUANTITY "
+                            "FROM SALES_DAILY_SUMMARY ORDER BY STORE_ID").fetchall()
+
+
+def test_add_groups_rows_with_exact_amounts():
+    columns = insert_columns('SALES_DATA')
+    summary = SalesSummary(columns)
+    rows = [tuple(sale(f"S{i}", 0.1)[column.lower()] for column in columns) for i in range(3)]
+    summary.add(rows)
+    assert summary.rows() == [('2024-03-01', 'ST3001', 'Boutique', 'France', 3, Decimal('0.3'), 3)]
+
+
+def test_batch_runs_accumulate_into_summary(tmp_path, sales_file):
+    db_path = str(tmp_path / 'ingest.db')
+    for _ in range(2):
+        # Chaque run recrée SALES_DATA mais complète la synthèse existante
+        ingester = MultiTableIngester(batch_size=2, sink=SQLiteSink(db_path))
+        with ingester.sink:
+            ingester.setup_tables()
+            assert ingester.ingest_sales_data(sales_file) == 3
+    assert summary_rows(db_path) == [('ST3001', 4, 60.6, 6), ('ST3002', 2, 10.0, 2)]
+
+
+def test_stream_counts_flushed_rows(tmp_path, monkeypatch):
+    db_path = str(tmp_path / 'ingest.db')
+    lines = [json.dumps(sale(f"S{i}", 1.0)) + '\n' for i in range(5)]
+    monkeypatch.setattr('sys.stdin', io.StringIO(''.join(lines)))
+    ingester = MultiTableIngester(batch_size=2, sink=SQLiteSink(db_path))
+    merges = []
+    merge_into = SalesSummary.merge_into
+    monkeypatch.setattr(SalesSummary, 'merge_into',
+                        lambda self, sink, target_table=None: merges.append(len(self.groups)) or merge_into(self, sink, target_table))
+    with ingester.sink:
+        ingester.setup_tables(replace=False)
+        ingester.stream('sales', '-', summary_interval=0)
+
+    # Ajout à chaque flush (2 + 2 + 1 lignes), puis un dernier appel sans agrégat en attente
+    assert merges == [1, 1, 1, 0]
+    assert summary_rows(db_path) == [('ST3001', 5, 5.0, 5)]
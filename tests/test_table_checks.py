@@ -0,0 +1,73 @@
+"""Vérification des tables Snowflake : métadonnées puis requêtes asynchrones (connexion factice)"""
+
+from snowflake_check_data import fetch_table_metadata, run_async_queries
+
+
+class FakeCursor:
+    def __init__(self, conn):
+        self.conn = conn
+        self.sfqid = None
+        self.rows = None
+
+    def execute(self, sql, params=None):
+        self.conn.executed.append(sql)
+        self.rows = self.conn.metadata
+
+    def execute_async(self, sql):
+        if 'BROKEN' in sql:
+            raise RuntimeError('SQL compilation error')
+        self.sfqid = f"q{len(self.conn.queries)}"
+        self.conn.queries[self.sfqid] = sql
+
+    def get_results_from_sfqid(self, query_id):
+        self.rows = [(self.conn.queries[query_id],)]
+
+    def fetchall(self):
+        return self.rows
+
+    def close(self):
+        pass
+
+
+class FakeConnection:
+    def __init__(self, metadata=None):
+        self.metadata = metadata
+        self.queries = {}
+        self.executed = []
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def get_query_status_throw_if_error(self, query_id):
+        if 'FAILING' in self.queries[query_id]:
+            raise RuntimeError('division by zero')
+        return 'RUNNING' if 'SLOW' in self.queries[query_id] else 'SUCCESS'
+
+    def is_still_running(self, status):
+        return status == 'RUNNING'
+
+
+def test_queries_collected_together_with_errors_and_timeouts():
+    conn = FakeConnection()
+    results = run_async_queries(conn, {
+        'count': 'SELECT COUNT(*) FROM SALES_DATA',
+        'broken': 'SELECT * FROM BROKEN',
+        'failing': 'SELECT 1/0 AS FAILING',
+        'slow': 'SELECT SLOW FROM SALES_DATA',
+    }, timeout=0.05, poll_interval=0.01)
+
+    assert results['count'] == [('SELECT COUNT(*) FROM SALES_DATA',)]
+    assert isinstance(results['broken'], RuntimeError)
+    assert str(results['failing']) == 'division by zero'
+    # Requête trop longue : annulée côté serveur et signalée
+    assert isinstance(results['slow'], TimeoutError)
+    assert conn.executed == ["SELECT SYSTEM$CANCEL_QUERY('q2')"]
+
+
+def test_metadata_row_count_only_trusted_for_tables():
+    conn = FakeConnection(metadata=[('SALES_DATA', 'BASE TABLE', 1050, 4096, 17),
+                                    ('SALES_VIEW', 'VIEW', 0, None, 17)])
+    metadata = fetch_table_metadata(conn.cursor(), ['SALES_DATA', 'SALES_VIEW'])
+    assert metadata['SALES_DATA'] == {'row_count': 1050, 'bytes': 4096, 'columns': 17}
+    # Vue : pas de row_count fiable, un COUNT(*) sera nécessaire
+    assert metadata['SALES_VIEW']['row_count'] is None
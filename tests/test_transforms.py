@@ -0,0 +1,55 @@
+"""Transformation déclarative des batches : champs alternatifs, adresses et types cibles"""
+
+import datetime
+from decimal import Decimal
+
+import pytest
+
+pa = pytest.importorskip('pyarrow')
+
+from arrow_schemas import arrow_schema
+from table_schemas import insert_columns
+from transforms import table_rows, transform_batch, transform_table
+
+STORES = 'STORES_DATA_SNOWPIPE'
+PROMOTIONS = 'PROMOTIONS_DATA_SNOWPIPE'
+
+
+def test_store_fallbacks_and_addresses():
+    records = [
+        {'store_id': 'ST3001', 'store_name': 'Rivoli', 'name': 'ignoré', 'address': '1 rue de Rivoli',
+         'store_size_sqm': 120.5},
+        {'store_id': 'ST3002', 'store_name': '', 'name': 'Marais',
+         'address': {'street': '2 rue des Archives', 'city': 'Paris', 'country': 'France'}, 'square_meters': 80},
+        {'store_id': 'ST3003', 'address': {'city': 'Lyon'}, 'store_size_sqm': 0, 'opening_date': '2020-05-04',
+         'is_active': True},
+    ]
+    columns = ['STORE_ID', 'STORE_NAME', 'ADDRESS', 'STORE_SIZE_SQM', 'OPENING_DATE', 'IS_ACTIVE']
+    table = transform_batch(records, STORES, columns)
+
+    assert table.schema == arrow_schema(STORES, columns)
+    assert table_rows(table) == [
+        ('ST3001', 'Rivoli', '1 rue de Rivoli', Decimal('120.50'), None, None),
+        # '' et 0 comptent comme absents : champ alternatif, puis valeur par défaut
+        ('ST3002', 'Marais', '2 rue des Archives, Paris, France', Decimal('80.00'), None, None),
+        ('ST3003', '', 'Lyon', Decimal('0.00'), datetime.date(2020, 5, 4), True),
+    ]
+
+
+def test_promotion_created_date_falls_back_to_start_date():
+    records = [
+        {'promotion_id': 'PR1', 'name': 'Soldes', 'start_date': '2024-01-10', 'created_date': '2024-01-01'},
+        {'promotion_id': 'PR2', 'name': 'Flash', 'start_date': '2024-02-10'},
+    ]
+    table = transform_batch(records, PROMOTIONS, ['PROMOTION_ID', 'CREATED_DATE'])
+    assert table.column('CREATED_DATE').to_pylist() == [datetime.date(2024, 1, 1), datetime.date(2024, 2, 10)]
+
+
+def test_columnar_batch_transformed_like_json():
+    columns = insert_columns(PROMOTIONS)
+    records = [{'promotion_id': 'PR1', 'name': 'Soldes', 'discount_value': 15.5, 'type': 'Percentage',
+                'start_date': '2024-01-10', 'is_active': True}]
+    # Même batch lu d'un fichier colonnaire : champs sous leur nom JSON ou leur nom de colonne
+    columnar = pa.table({'PROMOTION_ID': ['PR1'], 'name': ['Soldes'], 'discount_value': [15.5],
+                         'type': ['Percentage'], 'start_date': ['2024-01-10'], 'is_active': [True]})
+    assert transform_table(columnar, PROMOTIONS, columns) == transform_batch(records, PROMOTIONS, columns)
@@ -0,0 +1,70 @@
+"""Dimensionnement du warehouse : resize puis restauration, y compris après un échec"""
+
+import json
+
+import pytest
+
+from warehouse_policy import LocalWarehouseControl, WarehousePolicy
+
+TIERS = [(10, 'XSMALL'), (None, 'MEDIUM')]
+
+
+@pytest.fixture
+def input_file(tmp_path):
+    path = tmp_path / 'sales.json'
+    path.write_text(''.join(json.dumps({'sale_id': f"S{i}"}) + '\n' for i in range(50)))
+    return str(path)
+
+
+def test_resize_then_restore(tmp_path, input_file):
+    control = LocalWarehouseControl(str(tmp_path / 'commands.json'))
+    with WarehousePolicy(control, 'resize', tiers=TIERS).apply([input_file], 'sales') as sizing:
+        assert control.size('INGEST') == 'MEDIUM'
+    sizing.restore()  # idempotent
+
+    assert control.size('INGEST') == 'XSMALL'
+    assert [(c['warehouse'], c['size']) for c in control.commands] == [('INGEST', 'MEDIUM'), ('INGEST', 'XSMALL')]
+
+
+def test_restore_after_failed_load(tmp_path, input_file):
+    log_path = str(tmp_path / 'commands.json')
+    control = LocalWarehouseControl(log_path)
+    with pytest.raises(RuntimeError):
+        with WarehousePolicy(control, 'resize', tiers=TIERS).apply([input_file], 'sales'):
+            raise RuntimeError("chargement en échec")
+
+    assert [c['size'] for c in control.commands] == ['MEDIUM', 'XSMALL']
+    # Le journal rejoué par le run suivant retrouve la taille d'origine
+    assert LocalWarehouseControl(log_path).size('INGEST') == 'XSMALL'
+
+
+def test_select_exposes_tier_warehouse(tmp_path, input_file):
+    control = LocalWarehouseControl(str(tmp_path / 'commands.json'))
+    policy = WarehousePolicy(control, 'select', tiers=TIERS, tier_warehouses={'XSMALL': 'INGEST', 'MEDIUM': 'INGEST_M'})
+    with policy.apply([input_file], 'sales') as sizing:
+        assert sizing.warehouse == 'INGEST_M'
+    assert control.current() == 'INGEST'
+
+
+def test_snowpipe_sizes_once_per_run(tmp_path, monkeypatch):
+    pytest.importorskip('pyarrow')
+    import ingester_snowpipe
+
+    log_path = tmp_path / 'commands.json'
+    # Warehouse laissé en LARGE : les petits fichiers du run le font descendre en XSMALL
+    log_path.write_text(json.dumps({'command': 'seed', 'warehouse': 'INGEST', 'size': 'LARGE'}) + '\n')
+    monkeypatch.setenv('INGEST_WAREHOUSE_LOG', str(log_path))
+    monkeypatch.setenv('INGEST_SQLITE_PATH', str(tmp_path / 'ingest.db'))
+    monkeypatch.chdir(tmp_path)
+    # Premier fichier en échec : le run continue et la taille d'origine est remise à la fin
+    products = tmp_path / 'products.json'
+    products.write_text('{"product_id": "P1"\n')
+    stores = tmp_path / 'stores.json'
+    stores.write_text(json.dumps({'store_id': 'ST1', 'store_name': 'Paris'}) + '\n')
+    monkeypatch.setattr('sys.argv', ['ingester_snowpipe.py', '--sink', 'sqlite', '--warehouse-policy', 'resize',
+                                     '--products', str(products), '--stores', str(stores)])
+
+    ingester_snowpipe.main()
+
+    sizes = [json.loads(line)['size'] for line in log_path.read_text().splitlines()]
+    assert sizes == ['LARGE', 'XSMALL', 'LARGE']
@@ -0,0 +1,187 @@
+"""
+Traces d'un run d'ingestion : un span par run, par table et par batch, avec des
+spans enfants parse / encode / PUT / COPY / INSERT.
+
+Chaque span de run, de table ou de batch porte un tag <run_tag>/<table>/<batch>
+posé comme QUERY_TAG de la session Snowflake avant ses requêtes : les query IDs
+renvoyés sont enregistrés sur le span, et `snowflake_check_data.py --profile-run
+<run_tag>` (LIKE '<run_tag>%') retrouve toujours toutes les requêtes du run.
+
+Les spans sont exportés au format Chrome Trace Event (JSON), lisible dans
+chrome://tracing ou https://ui.perfetto.dev. Sans tracer actif (pas de --trace),
+toutes les fonctions sont des no-op et le QUERY_TAG reste celui du run.
+"""
+
+import os
+import json
+import time
+import threading
+
+DEFAULT_TRACE_DIR = 'traces'
+
+_tracer = None
+_local = threading.local()
+
+
+class Span:
+    def __init__(self, tracer, name, category, tag, args):
+        self.tracer = tracer
+        self.name = name
+        self.category = category
+        self.tag = tag
+        self.args = args
+        self.query_ids = []
+        self.start = time.perf_counter()
+
+    def end(self, **args):
+        """Clore le span (les spans d'un thread se ferment dans l'ordre inverse d'ouverture)"""
+        self.args.update(args)
+        stack = _stack()
+        if stack and stack[-1] is self:
+            stack.pop()
+        self.tracer.record(self, time.perf_counter())
+
+    def discard(self):
+        """Abandonner un span ouvert sans l'enregistrer (ex. batch vide en fin de fichier)"""
+        stack = _stack()
+        if stack and stack[-1] is self:
+            stack.pop()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if exc_type is not None:
+            self.args['error'] = str(exc_val)
+        self.end()
+
+
+class _NoSpan:
+    """Span factice quand aucun tracer n'est actif"""
+
+    tag = None
+
+    @property
+    def args(self):
+        # Dictionnaire jetable : les attributs posés sur un span factice sont ignorés
+        return {}
+
+    def end(self, **args):
+        pass
+
+    def discard(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        pass
+
+
+_NO_SPAN = _NoSpan()
+
+
+class Tracer:
+    def __init__(self, run_tag, path):
+        self.run_tag = run_tag
+        self.path = path
+        self.origin = time.perf_counter()
+        self.pid = os.getpid()
+        self.events = []
+        self.lock = threading.Lock()
+
+    def record(self, span, end):
+        args = dict(span.args)
+        args['query_tag'] = span.tag
+        if span.query_ids:
+            args['query_ids'] = span.query_ids
+        event = {
+            'name': span.name,
+            'cat': span.category,
+            'ph': 'X',
+            'ts': round((span.start - self.origin) * 1e6),
+            'dur': round((end - span.start) * 1e6),
+            'pid': self.pid,
+            'tid': threading.get_ident(),
+            'args': args,
+        }
+        with self.lock:
+            self.events.append(event)
+
+    def export(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self.lock:
+            events = sorted(self.events, key=lambda event: event['ts'])
+        with open(self.path, 'w') as f:
+            json.dump({
+                'traceEvents': events,
+                'displayTimeUnit': 'ms',
+                'otherData': {'run_tag': self.run_tag},
+            }, f)
+        return self.path
+
+
+def _stack():
+    if not hasattr(_local, 'stack'):
+        _local.stack = []
+    return _local.stack
+
+
+def start_run(run_tag, path=None):
+    """Activer le traçage du process ; retourne le span du run (à clore par finish_run)"""
+    global _tracer
+    _tracer = Tracer(run_tag, path or os.path.join(DEFAULT_TRACE_DIR, f"{run_tag}.json"))
+    span = Span(_tracer, run_tag, 'run', run_tag, {})
+    _stack().append(span)
+    return span
+
+
+def finish_run(span):
+    """Clore le span du run et écrire le fichier de trace ; retourne son chemin"""
+    global _tracer
+    if _tracer is None:
+        return None
+    span.end()
+    tracer, _tracer = _tracer, None
+    path = tracer.export()
+    print(f"🧵 Trace du run: {path} ({len(tracer.events)} spans, chrome://tracing ou ui.perfetto.dev)")
+    return path
+
+
+def begin(name, category='step', tag=None, **args):
+    """Ouvrir un span enfant du span courant du thread
+
+    tag : segment ajouté au tag du parent (<run_tag>/<table>/<batch>), qui devient le
+    QUERY_TAG des requêtes émises sous ce span ; sans tag, celui du parent est conservé.
+    """
+    if _tracer is None:
+        return _NO_SPAN
+    parent_tag = current_tag()
+    span = Span(_tracer, name, category, f"{parent_tag}/{tag}" if tag is not None else parent_tag, args)
+    _stack().append(span)
+    return span
+
+
+def span(name, category='step', tag=None, **args):
+    """Span utilisable en context manager (with tracing.span('COPY'): ...)"""
+    return begin(name, category, tag, **args)
+
+
+def current_tag():
+    """Tag du span courant du thread (tag du run hors span), None sans tracer actif"""
+    if _tracer is None:
+        return None
+    stack = _stack()
+    return stack[-1].tag if stack else _tracer.run_tag
+
+
+def record_query(query_id):
+    """Rattacher un query ID Snowflake au span courant du thread"""
+    if _tracer is None or not query_id:
+        return
+    stack = _stack()
+    if stack:
+        stack[-1].query_ids.append(query_id)
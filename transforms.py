@@ -0,0 +1,201 @@
+"""
+Étape de transformation déclarative, appliquée par batch sur des colonnes Arrow.
+
+Chaque table cible peut déclarer une spec colonne -> expression dans TRANSFORMS ;
+une colonne sans entrée est lue dans le champ JSON du même nom en minuscules.
+Expressions disponibles :
+    'champ'                                         champ JSON tel quel
+    {'text': 'champ'}                               valeurs chaîne du champ seulement
+    {'format': [champs], 'from': 'champ', 'sep': s} champs d'un objet JSON joints par sep
+    {'coalesce': [expr, ...], 'default': v}         première valeur non vide (NULL, '' ou 0,
+                                                    comme l'ancien `a or b`), sinon default
+    {'compute': 'kernel', 'args': [expr, ...]}      colonne dérivée par un kernel pyarrow.compute
+    {'literal': v}                                  constante
+Le résultat de chaque colonne est casté vers son type Arrow cible (arrow_schemas.py).
+Aucun branchement par ligne : toutes les opérations sont des kernels vectorisés.
+"""
+
+import json
+
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from arrow_schemas import arrow_schema
+from columnar_input import input_format, load_units
+
+TRANSFORMS = {
+    'STORES_DATA_SNOWPIPE': {
+        'STORE_NAME': {'coalesce': ['store_name', 'name'], 'default': ''},
+        # address : chaîne (souvent du JSON sérialisé) telle quelle, ou objet mis en forme
+        'ADDRESS': {'coalesce': [
+            {'text': 'address'},
+            {'format': ['street', 'city', 'country'], 'from': 'address', 'sep': ', '},
+        ], 'default': ''},
+        'STORE_SIZE_SQM': {'coalesce': ['store_size_sqm', 'square_meters'], 'default': 0},
+    },
+    'PROMOTIONS_DATA_SNOWPIPE': {
+        'DISCOUNT_TYPE': {'coalesce': ['discount_type', 'type'], 'default': ''},
+        'CREATED_DATE': {'coalesce': ['created_date', 'start_date']},
+    },
+}
+
+
+class _Columns:
+    """Champs JSON d'un batch extraits en colonnes Arrow (une seule fois par champ)"""
+
+    def __init__(self, records):
+        self.records = records
+        self.cache = {}
+
+    def __len__(self):
+        return len(self.records)
+
+    def get(self, name):
+        if name not in self.cache:
+            values = [record.get(name) for record in self.records]
+            try:
+                self.cache[name] = pa.array(values)
+            except (pa.ArrowInvalid, pa.ArrowTypeError):
+                # Types mixtes (ex. address chaîne ou objet) : une colonne par type
+                self.cache[name] = pa.StructArray.from_arrays(
+                    [pa.array([v if isinstance(v, str) else None for v in values], pa.string()),
+                     pa.array([v if isinstance(v, dict) else None for v in values])],
+                    names=['text', 'object']
+                )
+        return self.cache[name]
+
+    def text(self, name):
+        column = self.get(name)
+        if pa.types.is_string(column.type):
+            return column
+        if pa.types.is_struct(column.type) and column.type.names == ['text', 'object']:
+            return column.field('text')
+        return pa.nulls(len(self), pa.string())
+
+    def object(self, name):
+        column = self.get(name)
+        if pa.types.is_struct(column.type) and column.type.names == ['text', 'object']:
+            column = column.field('object')
+        return column if pa.types.is_struct(column.type) else None
+
+
+class _TableColumns(_Columns):
+    """Colonnes d'une table Arrow déjà en colonnes (Parquet, Arrow IPC) : aucun passage par Python
+
+    Les champs sont cherchés sous leur nom JSON puis sous le nom de colonne cible.
+    """
+
+    def __init__(self, table):
+        self.table = table
+        self.cache = {}
+
+    def __len__(self):
+        return self.table.num_rows
+
+    def get(self, name):
+        for candidate in (name, name.upper()):
+            if candidate in self.table.column_names:
+                column = self.table.column(candidate)
+                # Une tranche d'un seul record batch : le chunk est une vue, sans copie
+                return column.chunk(0) if column.num_chunks == 1 else column.combine_chunks()
+        return pa.nulls(len(self))
+
+
+def _cast(column, target_type):
+    if target_type is None or column.type == target_type:
+        return column
+    if pa.types.is_decimal(target_type) and not pa.types.is_decimal(column.type):
+        # Même chemin que arrow_schemas._to_array pour les montants JSON (floats)
+        column = pc.cast(column, pa.float64())
+    return pc.cast(column, target_type)
+
+
+def _missing_as_null(column):
+    """'' et 0 comptent comme absents, comme dans l'ancien `record.get(a) or record.get(b)`"""
+    if pa.types.is_string(column.type):
+        return pc.if_else(pc.equal(column, ''), pa.scalar(None, column.type), column)
+    if pa.types.is_integer(column.type) or pa.types.is_floating(column.type):
+        return pc.if_else(pc.equal(column, pa.scalar(0, column.type)), pa.scalar(None, column.type), column)
+    return column
+
+
+def _format(columns, spec):
+    struct = columns.object(spec['from'])
+    if struct is None:
+        return pa.nulls(len(columns), pa.string())
+    parts = []
+    for name in spec['format']:
+        if struct.type.get_field_index(name) < 0:
+            parts.append(pa.array([''] * len(columns), pa.string()))
+        else:
+            parts.append(pc.fill_null(pc.cast(struct.field(name), pa.string()), ''))
+    joined = pc.binary_join_element_wise(*parts, spec.get('sep', ', '))
+    joined = pc.utf8_trim(joined, characters=spec.get('sep', ', '))
+    return pc.if_else(pc.is_valid(struct), joined, pa.scalar(None, pa.string()))
+
+
+def evaluate(expr, columns, target_type=None):
+    """Évaluer une expression de spec sur les colonnes d'un batch"""
+    if isinstance(expr, str):
+        return _cast(columns.get(expr), target_type)
+    if 'text' in expr:
+        return _cast(columns.text(expr['text']), target_type)
+    if 'format' in expr:
+        return _cast(_format(columns, expr), target_type)
+    if 'literal' in expr:
+        return _cast(pa.array([expr['literal']] * len(columns)), target_type)
+    if 'coalesce' in expr:
+        candidates = [_cast(_missing_as_null(evaluate(arg, columns)), target_type) for arg in expr['coalesce']]
+        if expr.get('default') is not None:
+            candidates.append(_cast(pa.array([expr['default']] * len(columns)), target_type or candidates[0].type))
+        return pc.coalesce(*candidates)
+    if 'compute' in expr:
+        args = [evaluate(arg, columns) for arg in expr['args']]
+        return _cast(pc.call_function(expr['compute'], args), target_type)
+    raise ValueError(f"Expression de transformation inconnue: {expr}")
+
+
+def _transform(batch, table_name, columns):
+    schema = arrow_schema(table_name, columns)
+    spec = TRANSFORMS.get(table_name, {})
+    arrays = [evaluate(spec.get(field.name, field.name.lower()), batch, field.type) for field in schema]
+    return pa.Table.from_arrays(arrays, schema=schema)
+
+
+def transform_batch(records, table_name, columns):
+    """Batch de records JSON -> table Arrow au schéma de table_name (colonnes dans l'ordre)"""
+    return _transform(_Columns(records), table_name, columns)
+
+
+def transform_table(table, table_name, columns):
+    """Même transformation pour une table (ou un record batch) Arrow lue d'un fichier colonnaire"""
+    if isinstance(table, pa.RecordBatch):
+        table = pa.Table.from_batches([table])
+    return _transform(_TableColumns(table), table_name, columns)
+
+
+def read_batches(path, table_name, columns, batch_size):
+    """Tables Arrow d'au plus batch_size lignes, au schéma de table_name, d'un fichier d'entrée
+
+    Lecteur commun des ingesters : NDJSON (records bruts normalisés par batch) ou fichier
+    colonnaire (Parquet, Arrow IPC) projeté en mémoire, tranché sans copie.
+    """
+    if input_format(path):
+        for unit in load_units(path, batch_size):
+            yield transform_table(unit, table_name, columns)
+        return
+    records = []
+    with open(path, 'r') as f:
+        for line in f:
+            if line.strip():
+                records.append(json.loads(line))
+                if len(records) >= batch_size:
+                    yield transform_batch(records, table_name, columns)
+                    records = []
+    if records:
+        yield transform_batch(records, table_name, columns)
+
+
+def table_rows(table):
+    """Tuples d'insertion d'une table Arrow (pour les sinks qui insèrent par lignes)"""
+    return list(zip(*[column.to_pylist() for column in table.columns]))
@@ -0,0 +1,296 @@
+"""
+Dimensionnement du warehouse autour des chargements en masse.
+
+Avant un chargement, le volume est estimé à partir des fichiers d'entrée
+(métadonnées pour Parquet / Arrow IPC, taille du fichier et longueur moyenne des
+premières lignes pour le NDJSON) et traduit en taille de warehouse par paliers
+de lignes. Deux stratégies :
+    resize : ALTER WAREHOUSE <courant> SET WAREHOUSE_SIZE, taille d'origine restaurée
+    select : USE WAREHOUSE du palier (INGEST_WAREHOUSE_TIERS=XSMALL:INGEST_XS,LARGE:INGEST_L),
+             warehouse d'origine remis en session
+
+La restauration a lieu dans un finally : un chargement en échec ne laisse pas un
+warehouse surdimensionné. Chaque décision et sa durée sont journalisées.
+
+Implémentations :
+    SnowflakeWarehouseControl : commandes exécutées sur la session Snowflake
+    LocalWarehouseControl     : stand-in du sink SQLite, qui enregistre les commandes
+                                (data/warehouse_commands.json) et simule les tailles
+"""
+
+import os
+import json
+import time
+import logging
+import datetime
+
+import tracing
+
+POLICY_MODES = ['off', 'resize', 'select']
+# Tailles dans l'ordre croissant (valeurs de ALTER WAREHOUSE ... SET WAREHOUSE_SIZE)
+WAREHOUSE_SIZES = ['XSMALL', 'SMALL', 'MEDIUM', 'LARGE', 'XLARGE', 'XXLARGE', 'XXXLARGE', 'X4LARGE']
+# (lignes au plus, taille) : le premier palier qui couvre le volume estimé
+DEFAULT_TIERS = [
+    (1_000_000, 'XSMALL'),
+    (10_000_000, 'SMALL'),
+    (50_000_000, 'MEDIUM'),
+    (200_000_000, 'LARGE'),
+    (None, 'XLARGE'),
+]
+DEFAULT_COMMAND_LOG = 'data/warehouse_commands.json'
+# Échantillon lu en tête d'un NDJSON pour estimer la longueur moyenne d'une ligne
+SAMPLE_BYTES = 1 << 20
+
+# SHOW WAREHOUSES affiche 'X-Small', '2X-Large'... : normalisés vers WAREHOUSE_SIZES
+_SHOWN_SIZES = {'2XLARGE': 'XXLARGE', '3XLARGE': 'XXXLARGE', '4XLARGE': 'X4LARGE'}
+
+
+def normalize_size(size):
+    size = size.upper().replace('-', '').replace('_', '')
+    return _SHOWN_SIZES.get(size, size)
+
+
+def estimate_volume(paths):
+    """{'files', 'bytes', 'rows', 'estimated'} des fichiers d'entrée existants
+
+    estimated : True si au moins un nombre de lignes est extrapolé (NDJSON)
+    """
+    from columnar_input import input_format, input_rows
+
+    volume = {'files': 0, 'bytes': 0, 'rows': 0, 'estimated': False}
+    for path in paths:
+        if not path or not os.path.exists(path):
+            continue
+        size = os.path.getsize(path)
+        volume['files'] += 1
+        volume['bytes'] += size
+        if input_format(path):
+            volume['rows'] += input_rows(path)
+            continue
+        with open(path, 'rb') as f:
+            sample = f.read(SAMPLE_BYTES)
+        lines = sample.count(b'\n') or (1 if sample else 0)
+        if len(sample) == size:
+            volume['rows'] += lines
+        elif lines:
+            volume['rows'] += round(size / (len(sample) / lines))
+            volume['estimated'] = True
+    return volume
+
+
+def choose_size(rows, tiers=DEFAULT_TIERS, min_size=None, max_size=None):
+    """Taille du premier palier couvrant rows, bornée par min_size / max_size"""
+    size = next(size for limit, size in tiers if limit is None or rows <= limit)
+    index = WAREHOUSE_SIZES.index(size)
+    if min_size:
+        index = max(index, WAREHOUSE_SIZES.index(min_size))
+    if max_size:
+        index = min(index, WAREHOUSE_SIZES.index(max_size))
+    return WAREHOUSE_SIZES[index]
+
+
+def parse_tier_warehouses(spec):
+    """'XSMALL:INGEST_XS,LARGE:INGEST_L' -> {'XSMALL': 'INGEST_XS', 'LARGE': 'INGEST_L'}"""
+    tiers = {}
+    for item in (spec or '').split(','):
+        if item.strip():
+            size, warehouse = item.split(':', 1)
+            tiers[normalize_size(size.strip())] = warehouse.strip()
+    return tiers
+
+
+class WarehouseControl:
+    """Interface des commandes de warehouse utilisées par la politique"""
+
+    def current(self):
+        """Warehouse de la session"""
+        raise NotImplementedError
+
+    def size(self, warehouse):
+        raise NotImplementedError
+
+    def resize(self, warehouse, size):
+        """Redimensionner et attendre que la nouvelle taille soit provisionnée"""
+        raise NotImplementedError
+
+    def use(self, warehouse):
+        raise NotImplementedError
+
+
+class SnowflakeWarehouseControl(WarehouseControl):
+    def __init__(self, sf):
+        # sf : instance de snowflake_config.SnowflakeConnection
+        self.sf = sf
+
+    def current(self):
+        return self.sf.execute_query("SELECT CURRENT_WAREHOUSE()")[0][0]
+
+    def size(self, warehouse):
+        rows = self.sf.execute_query(f"SHOW WAREHOUSES LIKE '{warehouse}'")
+        if not rows:
+            raise RuntimeError(f"Warehouse {warehouse} introuvable")
+        columns = [column[0].lower() for column in self.sf.cursor.description]
+        return normalize_size(rows[0][columns.index('size')])
+
+    def resize(self, warehouse, size):
+        self.sf.execute_query(f"ALTER WAREHOUSE {warehouse} SET WAREHOUSE_SIZE = {size} WAIT_FOR_COMPLETION = TRUE")
+
+    def use(self, warehouse):
+        self.sf.execute_query(f"USE WAREHOUSE {warehouse}")
+
+
+class LocalWarehouseControl(WarehouseControl):
+    """Stand-in hors ligne : commandes enregistrées, tailles rejouées depuis le journal"""
+
+    def __init__(self, log_path=DEFAULT_COMMAND_LOG, warehouse='INGEST', initial_size='XSMALL'):
+        self.log_path = log_path
+        self.warehouse = warehouse
+        self.sizes = {}
+        self.initial_size = initial_size
+        self.commands = []
+        # Taille laissée par les runs précédents : un oubli de restauration reste visible
+        if os.path.exists(log_path):
+            with open(log_path) as f:
+                for line in f:
+                    entry = json.loads(line)
+                    if entry.get('size'):
+                        self.sizes[entry['warehouse']] = entry['size']
+
+    def _record(self, command, warehouse, size=None):
+        entry = {'at': datetime.datetime.now().isoformat(timespec='milliseconds'),
+                 'command': command, 'warehouse': warehouse, 'size': size}
+        self.commands.append(entry)
+        directory = os.path.dirname(self.log_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(self.log_path, 'a') as f:
+            f.write(json.dumps(entry) + '\n')
+
+    def current(self):
+        return self.warehouse
+
+    def size(self, warehouse):
+        return self.sizes.get(warehouse, self.initial_size)
+
+    def resize(self, warehouse, size):
+        self._record(f"ALTER WAREHOUSE {warehouse} SET WAREHOUSE_SIZE = {size} WAIT_FOR_COMPLETION = TRUE",
+                     warehouse, size)
+        self.sizes[warehouse] = size
+
+    def use(self, warehouse):
+        self._record(f"USE WAREHOUSE {warehouse}", warehouse)
+        self.warehouse = warehouse
+
+
+def create_warehouse_control(sink, log_path=None):
+    """Commandes de warehouse du sink : session Snowflake, ou stand-in local enregistreur"""
+    if sink.kind == 'snowflake':
+        return SnowflakeWarehouseControl(sink.sf)
+    if sink.kind == 'sqlite':
+        return LocalWarehouseControl(log_path or os.getenv('INGEST_WAREHOUSE_LOG') or DEFAULT_COMMAND_LOG)
+    raise ValueError(f"Pas de contrôle de warehouse pour le sink '{sink.kind}'")
+
+
+class Sizing:
+    """Réglage appliqué pour un chargement ; restore() remet l'état d'origine (idempotent)"""
+
+    def __init__(self, control, label, undo=None, warehouse=None):
+        self.control = control
+        self.label = label
+        self.undo = undo
+        # Politique select : warehouse que les sessions de chargement doivent utiliser
+        self.warehouse = warehouse
+        self.started = time.perf_counter()
+
+    def restore(self):
+        if self.undo is None:
+            return
+        undo, self.undo = self.undo, None
+        elapsed = time.perf_counter() - self.started
+        start = time.perf_counter()
+        with tracing.span('WAREHOUSE restore'):
+            undo()
+        logging.info(f"Warehouse policy [{self.label}]: restored after {elapsed:.1f}s of load "
+                     f"(restore took {time.perf_counter() - start:.1f}s)")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.restore()
+
+
+class WarehousePolicy:
+    """Choisit et applique une taille de warehouse d'après le volume d'un chargement"""
+
+    def __init__(self, control, mode='resize', tiers=DEFAULT_TIERS, tier_warehouses=None,
+                 min_size=None, max_size=None):
+        if mode not in POLICY_MODES:
+            raise ValueError(f"Politique '{mode}' non supportée. Supportées: {POLICY_MODES}")
+        self.control = control
+        self.mode = mode
+        self.tiers = tiers
+        self.tier_warehouses = tier_warehouses or {}
+        self.min_size = min_size
+        self.max_size = max_size
+        if mode == 'select' and not self.tier_warehouses:
+            raise ValueError("Politique select: aucun warehouse par palier (INGEST_WAREHOUSE_TIERS)")
+
+    def _tier_warehouse(self, size):
+        """Warehouse du plus petit palier configuré >= size (à défaut, le plus grand)"""
+        available = sorted(self.tier_warehouses, key=WAREHOUSE_SIZES.index)
+        wanted = WAREHOUSE_SIZES.index(size)
+        tier = next((t for t in available if WAREHOUSE_SIZES.index(t) >= wanted), available[-1])
+        return tier, self.tier_warehouses[tier]
+
+    def apply(self, paths, label='load'):
+        """Dimensionner pour les fichiers paths ; retourne un Sizing à restaurer après le chargement"""
+        if self.mode == 'off':
+            return Sizing(self.control, label)
+        start = time.perf_counter()
+        volume = estimate_volume(paths)
+        target = choose_size(volume['rows'], self.tiers, self.min_size, self.max_size)
+        count = f"{'~' if volume['estimated'] else ''}{volume['rows']:,}"
+        rows = f"{count} rows"
+        estimate_ms = (time.perf_counter() - start) * 1000
+
+        with tracing.span('WAREHOUSE', mode=self.mode, rows=volume['rows'], size=target):
+            warehouse = self.control.current()
+            if self.mode == 'resize':
+                previous = self.control.size(warehouse)
+                if previous == target:
+                    logging.info(f"Warehouse policy [{label}]: {rows} in {volume['files']} file(s), "
+                                 f"{volume['bytes']:,} bytes -> {warehouse} kept at {target} "
+                                 f"(estimate {estimate_ms:.0f} ms)")
+                    return Sizing(self.control, label)
+                resize_start = time.perf_counter()
+                self.control.resize(warehouse, target)
+                logging.info(f"Warehouse policy [{label}]: {rows} in {volume['files']} file(s), "
+                             f"{volume['bytes']:,} bytes -> {warehouse} resized {previous} -> {target} "
+                             f"(estimate {estimate_ms:.0f} ms, resize {time.perf_counter() - resize_start:.1f}s)")
+                print(f"🏭 {warehouse}: {previous} -> {target} pour {count} lignes ({label})")
+                return Sizing(self.control, label, lambda: self.control.resize(warehouse, previous))
+
+            tier, selected = self._tier_warehouse(target)
+            if selected == warehouse:
+                logging.info(f"Warehouse policy [{label}]: {rows} -> {warehouse} ({tier}) already in use")
+                return Sizing(self.control, label)
+            self.control.use(selected)
+            logging.info(f"Warehouse policy [{label}]: {rows} in {volume['files']} file(s), "
+                         f"{volume['bytes']:,} bytes -> switched {warehouse} -> {selected} ({tier} tier for {target}) "
+                         f"(estimate {estimate_ms:.0f} ms)")
+            print(f"🏭 {selected} ({tier}) au lieu de {warehouse} pour {count} lignes ({label})")
+            return Sizing(self.control, label, lambda: self.control.use(warehouse), warehouse=selected)
+
+
+def resolve_mode(mode=None):
+    """Politique demandée (argument, sinon INGEST_WAREHOUSE_POLICY, sinon off)"""
+    return (mode or os.getenv('INGEST_WAREHOUSE_POLICY') or 'off').lower()
+
+
+def create_policy(sink, mode=None, min_size=None, max_size=None):
+    """Politique configurée (argument, sinon INGEST_WAREHOUSE_POLICY, sinon off)"""
+    mode = resolve_mode(mode)
+    control = create_warehouse_control(sink) if mode != 'off' else None
+    return WarehousePolicy(control, mode, tier_warehouses=parse_tier_warehouses(os.getenv('INGEST_WAREHOUSE_TIERS')),
+                           min_size=min_size, max_size=max_size)